@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from backend.api.routes import auth, users, roles, organization
+from backend.api.routes import auth, users, roles, organization, audit, jwks
 
 router = APIRouter()
 router.include_router(auth.router)
 router.include_router(users.router)
 router.include_router(roles.router)
-router.include_router(organization.router) 
+router.include_router(organization.router)
+router.include_router(audit.router)
+router.include_router(jwks.router)
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.core.audit import naive_utc
+from backend.core.dependencies import require_permission
+from backend.core.permissions import AUDIT_READ
+from backend.db.database import get_read_db
+from backend.db.models import audit_log
+from backend.settings import settings
+from backend.utils.pagination import encode_cursor, decode_cursor
+
+# Routeur de consultation du journal d'audit (lecture seule)
+router = APIRouter(prefix="/audit")
+
+
+@router.get("/", dependencies=[Depends(require_permission(AUDIT_READ))])
+async def list_audit_events(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    actor_id: Optional[int] = None,
+    action: Optional[str] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Événements du journal, du plus récent au plus ancien, par pages (`next_cursor`).
+    Sans `since`, la recherche couvre les audit_query_default_days derniers jours :
+    seules les partitions mensuelles concernées sont lues. Les événements
+    apparaissent après leur écriture par lot (au plus audit_flush_interval_seconds).
+    """
+    since = naive_utc(since) if since else datetime.utcnow() - timedelta(days=settings.audit_query_default_days)
+    conditions = [audit_log.c.occurred_at >= since]
+    if until:
+        conditions.append(audit_log.c.occurred_at < naive_utc(until))
+    if actor_id is not None:
+        conditions.append(audit_log.c.actor_id == actor_id)
+    if action:
+        conditions.append(audit_log.c.action == action)
+    if target_type:
+        conditions.append(audit_log.c.target_type == target_type)
+    if target_id:
+        conditions.append(audit_log.c.target_id == target_id)
+
+    sort_key = (audit_log.c.occurred_at, audit_log.c.id)
+    if cursor:
+        conditions.append(tuple_(*sort_key) < tuple_(*decode_cursor(cursor, datetime, int)))
+
+    result = await db.execute(
+        select(audit_log)
+        .where(*conditions)
+        .order_by(audit_log.c.occurred_at.desc(), audit_log.c.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]["occurred_at"], rows[-1]["id"])
+
+    return ORJSONResponse({"items": [dict(row) for row in rows], "next_cursor": next_cursor})
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload 
+from sqlalchemy.orm import joinedload
 from backend.db.database import get_db
 from backend.db.models import User, Role
-from backend.core.auth import verify_password, create_access_token, hash_password, generate_temp_password, decode_access_token
+from backend.core.auth import verify_and_update_password_async, password_rehashed, create_access_token, create_user_access_token, hash_password_async, generate_temp_password, decode_access_token, invalidate_principal, bump_token_version
+from backend.core.audit import log_audit_event
 from backend.core.dependencies import get_current_user
+from backend.core.rate_limit import enforce_rate_limit
+from backend.core.refresh_tokens import issue_refresh_token, rotate_refresh_token
 from backend.utils.email import (
     send_invitation_email,
     send_password_changed_email,
@@ -13,6 +16,7 @@ from backend.utils.email import (
 )
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
+from backend.settings import settings
 
 router = APIRouter(prefix="/auth")
 
@@ -35,6 +39,9 @@ class RegisterRequest(BaseModel):
     password: str
     roles: list[str] = ["employee"]
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class PasswordChangeRequest(BaseModel):
     new_password: str
 
@@ -50,44 +57,82 @@ class ResetPasswordRequest(BaseModel):
 # ============================
 
 @router.post("/login")
-async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
-    stmt = select(User).where(User.email == request.email).options(selectinload(User.roles))
+async def login(request: LoginRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
+    await enforce_rate_limit("login", http_request, request.email)
+
+    stmt = select(User).where(User.email == request.email).options(joinedload(User.roles))
     result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
+    user = result.unique().scalar_one_or_none()
 
-    if not user or not verify_password(request.password, user.hashed_password):
+    if not user:
+        await log_audit_event(http_request, "auth.login_failed", details={"email": request.email})
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update_password_async(request.password, user.hashed_password)
+    if not valid:
+        await log_audit_event(http_request, "auth.login_failed", target_type="user", target_id=user.id,
+                              details={"email": request.email})
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Hash d'un coût (ou d'un algorithme) dépassé : refait de façon transparente
+    if new_hash:
+        user.hashed_password = new_hash
+        password_rehashed.inc()
+
+    # Jeton de rafraîchissement (nouvelle famille), enregistré dans le même commit que le hash
+    refresh_token = issue_refresh_token(db, user)
+    await db.commit()
+    if new_hash:
+        invalidate_principal(user.id)
 
-    token = create_access_token({
-        "sub": str(user.id),
-        "roles": [role.name for role in user.roles]
-    })
+    token = create_user_access_token(user)
+    await log_audit_event(http_request, "auth.login", actor_id=user.id, target_type="user", target_id=user.id)
 
     # ✅ On retourne aussi s'il faut forcer un changement de mot de passe
     return {
         "access_token": token,
         "token_type": "bearer",
+        "expires_in": settings.access_token_expire_minutes * 60,
+        "refresh_token": refresh_token,
         "must_change_password": user.must_change_password
     }
 
+@router.post("/refresh")
+async def refresh(data: RefreshRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Échange un jeton de rafraîchissement contre un nouveau JWT et un nouveau jeton
+    (l'ancien est consommé). Aucun mot de passe n'est vérifié : une recherche par index.
+    """
+    result = await rotate_refresh_token(db, data.refresh_token)
+    if result.outcome == "reused":
+        # Jeton déjà consommé : toute la famille vient d'être révoquée
+        await log_audit_event(request, "auth.refresh_token_reused", target_type="user", target_id=result.user.id,
+                              details={"family_id": result.family_id})
+    if result.outcome != "rotated":
+        raise HTTPException(status_code=401, detail="Jeton de rafraîchissement invalide ou expiré")
+
+    await db.commit()
+    return {
+        "access_token": create_user_access_token(result.user),
+        "token_type": "bearer",
+        "expires_in": settings.access_token_expire_minutes * 60,
+        "refresh_token": result.token,
+    }
+
 @router.put("/change-password-on-first-login")
 async def change_password_on_first_login(
     req: PasswordChangeRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    stmt = select(User).where(User.id == current_user.id)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="Utilisateur introuvable")
-
-    user.hashed_password = hash_password(req.new_password)
+    # current_user appartient déjà à la session de la requête : pas de nouvelle lecture
+    user = current_user
+    user.hashed_password = await hash_password_async(req.new_password)
     user.must_change_password = False
-    await db.commit()
-
+    # Mise en file de l'e-mail et mise à jour du mot de passe : un seul commit
     await send_password_changed_email(db, user.email, user.first_name)
+    invalidate_principal(user.id)
+    await log_audit_event(request, "auth.password_changed", actor_id=user.id, target_type="user", target_id=user.id)
 
     return {"message": "Mot de passe mis à jour ✅"}
 
@@ -96,7 +141,7 @@ async def change_password_on_first_login(
 # ============================
 
 @router.post("/register")
-async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
+async def register(request: RegisterRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
     # Vérifie si l'email est déjà utilisé
     stmt = select(User).where(User.email == request.email)
     result = await db.execute(stmt)
@@ -116,7 +161,7 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
 
     # Génération mot de passe temporaire
     temp_password = generate_temp_password()
-    hashed_pwd = hash_password(temp_password)
+    hashed_pwd = await hash_password_async(temp_password)
 
     user = User(
         first_name=request.first_name,
@@ -130,9 +175,10 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     )
 
     db.add(user)
-    await db.commit()
-
+    # Création de l'utilisateur et mise en file de l'invitation : un seul commit
     await send_invitation_email(db, to_email=user.email, temp_password=temp_password)
+    await log_audit_event(http_request, "auth.registered", target_type="user", target_id=user.id,
+                          details={"email": user.email, "roles": [role.name for role in roles]})
 
     return {"message": "Utilisateur créé ✅ - Invitation envoyée", "email": user.email}
 
@@ -141,21 +187,14 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
 # ============================
 
 @router.get("/me")
-async def get_me(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = (
-        select(User)
-        .options(selectinload(User.roles))
-        .where(User.id == current_user.id)
-    )
-    result = await db.execute(stmt)
-    user = result.scalar_one()
-
+async def get_me(current_user: User = Depends(get_current_user)):
+    # Utilisateur et rôles déjà chargés par get_current_user
     return {
-        "id": user.id,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "email": user.email,
-        "roles": [role.name for role in user.roles],
+        "id": current_user.id,
+        "first_name": current_user.first_name,
+        "last_name": current_user.last_name,
+        "email": current_user.email,
+        "roles": [role.name for role in current_user.roles],
         "language": current_user.language,
         "date_format": current_user.date_format,
         "theme": current_user.theme
@@ -166,7 +205,9 @@ async def get_me(db: AsyncSession = Depends(get_db), current_user: User = Depend
 # ============================
 
 @router.post("/forgot-password")
-async def forgot_password(data: ForgotPasswordRequest, db: AsyncSession = Depends(get_db)):
+async def forgot_password(data: ForgotPasswordRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    await enforce_rate_limit("forgot_password", request, data.email)
+
     stmt = select(User).where(User.email == data.email)
     result = await db.execute(stmt)
     user = result.scalar_one_or_none()
@@ -181,12 +222,15 @@ async def forgot_password(data: ForgotPasswordRequest, db: AsyncSession = Depend
     )
 
     await send_reset_password_email(db, to_email=user.email, reset_token=token)
+    await log_audit_event(request, "auth.password_reset_requested", target_type="user", target_id=user.id)
     return {"message": "Email de réinitialisation envoyé ✅"}
 
 @router.post("/reset-password")
-async def reset_password(data: ResetPasswordRequest, db: AsyncSession = Depends(get_db)):
+async def reset_password(data: ResetPasswordRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    await enforce_rate_limit("reset_password", request)
+
     try:
-        payload = decode_access_token(data.token)
+        payload = await decode_access_token(data.token)
         user_id = int(payload.get("sub"))
     except Exception:
         raise HTTPException(status_code=400, detail="Token invalide ou expiré")
@@ -198,7 +242,10 @@ async def reset_password(data: ResetPasswordRequest, db: AsyncSession = Depends(
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
-    user.hashed_password = hash_password(data.new_password)
+    user.hashed_password = await hash_password_async(data.new_password)
+    bump_token_version(user)  # déconnecte les sessions existantes
     await db.commit()
+    invalidate_principal(user.id)
+    await log_audit_event(request, "auth.password_reset", actor_id=user.id, target_type="user", target_id=user.id)
 
     return {"message": "Mot de passe réinitialisé avec succès ✅"}
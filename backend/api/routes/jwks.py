@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Request, Response
+
+from backend.api.routes.organization import etag_matches
+from backend.core.signing_keys import keyring
+from backend.settings import settings
+
+# Clés publiques de signature des JWT (public, sans authentification)
+router = APIRouter()
+
+
+@router.get("/.well-known/jwks.json")
+async def get_jwks(request: Request):
+    """
+    Jeu de clés publiques (RFC 7517) : un service vérifie nos tokens localement,
+    en choisissant la clé d'après le `kid` de l'en-tête. Les clés remplacées
+    restent publiées tant que des tokens signés avec elles peuvent être valides.
+    """
+    document = keyring.document()
+    headers = {"ETag": document.etag, "Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}"}
+    if etag_matches(request.headers.get("if-none-match"), document.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=document.body, media_type="application/jwk-set+json", headers=headers)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from backend.db.database import get_db
+from backend.db.database import get_db, get_read_db
 from backend.db.models import Organization, User
-from backend.core.dependencies import get_current_user
+from backend.core.audit import log_audit_event
+from backend.core.dependencies import require_permission
+from backend.core.permissions import ORGANIZATION_MANAGE
+from backend.core.organization import invalidate_organization, get_public_organization
 from pydantic import BaseModel
 from typing import Optional
 
@@ -22,36 +25,67 @@ class OrganizationUpdate(BaseModel):
     default_from_email: Optional[str] = None
     logo_url: Optional[str] = None
 
-# Endpoint pour récupérer les informations de l'organisation
+# Champs de configuration renvoyés aux administrateurs : jamais le mot de passe SMTP
+SETTINGS_FIELDS = tuple(field for field in OrganizationUpdate.__fields__ if field != "smtp_password")
+
+def settings_view(org: Organization) -> dict:
+    return {"id": org.id, **{field: getattr(org, field) for field in SETTINGS_FIELDS}}
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Comparaison faible (RFC 9110) entre l'en-tête If-None-Match et l'ETag courant."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+# Endpoint pour récupérer les informations publiques de l'organisation (nom, logo)
 @router.get("/organization")
-async def get_organization(db: AsyncSession = Depends(get_db)):
+async def get_organization(request: Request, db: AsyncSession = Depends(get_read_db)):
     """
-    Récupère les informations de l'organisation.
+    Récupère les informations publiques de l'organisation.
     Limité à la première organisation trouvée (dans le cas d'une seule organisation dans la base).
+    La réponse est servie depuis la mémoire ; un client qui renvoie l'ETag reçoit un 304 sans corps.
     """
+    snapshot = await get_public_organization(db)
+
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Organisation non trouvée")
+
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+# Endpoint pour récupérer la configuration complète (SMTP inclus, sauf mot de passe)
+# Réservé à la permission organization.manage : alimente le formulaire d'édition
+@router.get("/organization/settings")
+async def get_organization_settings(
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_permission(ORGANIZATION_MANAGE))
+):
     result = await db.execute(select(Organization).limit(1))
     org = result.scalar_one_or_none()
 
     if not org:
         raise HTTPException(status_code=404, detail="Organisation non trouvée")
 
-    return org
+    return settings_view(org)
 
 # Endpoint pour mettre à jour les informations de l'organisation
 @router.put("/organization")
 async def update_organization(
     data: OrganizationUpdate,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: User = Depends(require_permission(ORGANIZATION_MANAGE))
 ):
     """
     Met à jour les informations de l'organisation.
-    Seuls les utilisateurs avec le rôle 'super_admin' peuvent accéder à cette route.
+    Réservé aux rôles disposant de la permission 'organization.manage'.
     """
-    # Vérifie que l'utilisateur connecté a le rôle 'super_admin'
-    if "super_admin" not in [role.name for role in user.roles]:
-        raise HTTPException(status_code=403, detail="Accès interdit : rôle super_admin requis")
-
     # Récupère l'organisation (en supposant qu'il n'y en a qu'une seule)
     result = await db.execute(select(Organization).limit(1))
     org = result.scalar_one_or_none()
@@ -60,11 +94,19 @@ async def update_organization(
         raise HTTPException(status_code=404, detail="Organisation non trouvée")
 
     # Met à jour uniquement les champs fournis dans la requête
-    for field, value in data.dict(exclude_unset=True).items():
+    changes = data.dict(exclude_unset=True)
+    for field, value in changes.items():
         setattr(org, field, value)
 
     # Enregistre les modifications dans la base de données
     await db.commit()
-    await db.refresh(org)
+    invalidate_organization()
+
+    # Le mot de passe SMTP n'est jamais journalisé : seul le fait qu'il ait changé l'est
+    await log_audit_event(request, "organization.updated", actor_id=user.id, target_type="organization",
+                          target_id=org.id, details={
+                              "fields": sorted(changes),
+                              "values": {field: value for field, value in changes.items() if field != "smtp_password"},
+                          })
 
-    return org
+    return settings_view(org)
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from backend.db.database import get_db
-from backend.db.models import Role
-from pydantic import BaseModel
+from sqlalchemy import delete, insert, update, true
+from backend.db.database import get_db, get_read_db, insert_or_ignore
+from backend.db.models import Role, User, user_roles, role_permissions
+from backend.core.audit import log_audit_event
+from backend.core.auth import invalidate_all_principals, invalidate_principals
+from backend.core.dependencies import require_permission
+from backend.core.permissions import ROLES_MANAGE, USERS_READ, permissions, permission_table
+from pydantic import BaseModel, conlist
 
 
 # Routeur dédié à la gestion des rôles utilisateurs
@@ -12,9 +17,24 @@ router = APIRouter(prefix="/roles")
 class RoleBase(BaseModel):
     name: str
 
+# Liste d'utilisateurs pour l'ajout / le retrait en masse d'un rôle
+class RoleMembersRequest(BaseModel):
+    user_ids: conlist(int, min_items=1, max_items=10_000)
+
+# Permissions attribuées à un rôle (codes du registre, ex. "users.read")
+class RolePermissionsRequest(BaseModel):
+    permissions: list[str]
+
+# Modification groupée : rôles ajoutés et retirés pour un ensemble d'utilisateurs
+class RoleMembershipDiffRequest(BaseModel):
+    user_ids: conlist(int, min_items=1, max_items=10_000)
+    add_role_ids: list[int] = []
+    remove_role_ids: list[int] = []
+
 # Endpoint pour récupérer la liste de tous les rôles disponibles
-@router.get("/")
-async def get_roles(db: AsyncSession = Depends(get_db)):
+# Noms des rôles nécessaires pour afficher et filtrer les utilisateurs
+@router.get("/", dependencies=[Depends(require_permission(USERS_READ))])
+async def get_roles(db: AsyncSession = Depends(get_read_db)):
     """
     Retourne tous les rôles existants dans la base de données.
     Chaque rôle est renvoyé sous forme de dictionnaire contenant son ID et son nom.
@@ -29,29 +49,226 @@ async def get_roles(db: AsyncSession = Depends(get_db)):
     return [{"id": r.id, "name": r.name} for r in roles]
 
 @router.post("/")
-async def create_role(role: RoleBase, db: AsyncSession = Depends(get_db)):
+async def create_role(
+    role: RoleBase,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(ROLES_MANAGE)),
+):
     new_role = Role(name=role.name)
     db.add(new_role)
     await db.commit()
+    invalidate_all_principals()
+    permission_table.invalidate()
+    await log_audit_event(request, "role.created", actor_id=current_user.id,
+                          target_type="role", target_id=new_role.id, details={"name": role.name})
     return {"message": "Rôle ajouté ✅"}
 
 @router.put("/{role_id}")
-async def update_role(role_id: int, updated: RoleBase, db: AsyncSession = Depends(get_db)):
+async def update_role(
+    role_id: int,
+    updated: RoleBase,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(ROLES_MANAGE)),
+):
     role = await db.get(Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Rôle non trouvé")
 
+    previous_name = role.name
     role.name = updated.name
     await db.commit()
+    invalidate_all_principals()
+    permission_table.invalidate()
+    await log_audit_event(request, "role.renamed", actor_id=current_user.id, target_type="role",
+                          target_id=role_id, details={"from": previous_name, "to": updated.name})
     return {"message": "Rôle mis à jour ✅"}
 
 @router.delete("/{role_id}")
-async def delete_role(role_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_role(
+    role_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(ROLES_MANAGE)),
+):
     role = await db.get(Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Rôle non trouvé")
 
+    name = role.name
     await db.delete(role)
     await db.commit()
+    invalidate_all_principals()
+    permission_table.invalidate()
+    await log_audit_event(request, "role.deleted", actor_id=current_user.id,
+                          target_type="role", target_id=role_id, details={"name": name})
     return {"message": "Rôle supprimé ✅"}
 
+
+# ============================
+# 👥 ATTRIBUTION DES RÔLES EN MASSE
+# ============================
+
+async def _revoke_changed_users(db: AsyncSession, user_ids: set[int]):
+    """Révoque les tokens des utilisateurs dont les rôles ont changé (une seule requête)."""
+    if user_ids:
+        await db.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(token_version=User.token_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+async def _add_members(db: AsyncSession, user_ids: list[int], role_ids: list[int]) -> set[int]:
+    # INSERT ... SELECT ... ON CONFLICT DO NOTHING : les utilisateurs inexistants sont ignorés
+    stmt = (
+        insert_or_ignore(db, user_roles)
+        .from_select(
+            ["user_id", "role_id"],
+            # Produit cartésien volontaire : chaque utilisateur × chaque rôle demandé
+            select(User.id, Role.id)
+            .join(Role, true())
+            .where(User.id.in_(user_ids), Role.id.in_(role_ids)),
+        )
+        .returning(user_roles.c.user_id)
+    )
+    result = await db.execute(stmt)
+    return set(result.scalars().all())
+
+async def _remove_members(db: AsyncSession, user_ids: list[int], role_ids: list[int]) -> set[int]:
+    stmt = (
+        delete(user_roles)
+        .where(user_roles.c.user_id.in_(user_ids), user_roles.c.role_id.in_(role_ids))
+        .returning(user_roles.c.user_id)
+    )
+    result = await db.execute(stmt)
+    return set(result.scalars().all())
+
+async def _get_role_or_404(db: AsyncSession, role_id: int) -> Role:
+    role = await db.get(Role, role_id)
+    if not role:
+        raise HTTPException(status_code=404, detail="Rôle non trouvé")
+    return role
+
+@router.post("/{role_id}/members")
+async def add_role_members(
+    role_id: int,
+    data: RoleMembersRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(ROLES_MANAGE)),
+):
+    """Attribue le rôle à tous les utilisateurs donnés, en une seule requête."""
+    await _get_role_or_404(db, role_id)
+
+    changed = await _add_members(db, data.user_ids, [role_id])
+    await _revoke_changed_users(db, changed)
+    await db.commit()
+    invalidate_principals(changed)
+    if changed:
+        await log_audit_event(request, "role.members_added", actor_id=current_user.id,
+                              target_type="role", target_id=role_id, details={"user_ids": sorted(changed)})
+
+    return {"message": "Rôle attribué ✅", "added": len(changed)}
+
+@router.delete("/{role_id}/members")
+async def remove_role_members(
+    role_id: int,
+    data: RoleMembersRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(ROLES_MANAGE)),
+):
+    """Retire le rôle à tous les utilisateurs donnés, en une seule requête."""
+    await _get_role_or_404(db, role_id)
+
+    changed = await _remove_members(db, data.user_ids, [role_id])
+    await _revoke_changed_users(db, changed)
+    await db.commit()
+    invalidate_principals(changed)
+    if changed:
+        await log_audit_event(request, "role.members_removed", actor_id=current_user.id,
+                              target_type="role", target_id=role_id, details={"user_ids": sorted(changed)})
+
+    return {"message": "Rôle retiré ✅", "removed": len(changed)}
+
+@router.post("/members/diff")
+async def apply_role_membership_diff(
+    data: RoleMembershipDiffRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(ROLES_MANAGE)),
+):
+    """
+    Ajoute `add_role_ids` et retire `remove_role_ids` pour tous les utilisateurs donnés,
+    dans une seule transaction (un INSERT et un DELETE ensemblistes).
+    """
+    if set(data.add_role_ids) & set(data.remove_role_ids):
+        raise HTTPException(status_code=400, detail="Un rôle ne peut pas être à la fois ajouté et retiré")
+
+    added = await _add_members(db, data.user_ids, data.add_role_ids) if data.add_role_ids else set()
+    removed = await _remove_members(db, data.user_ids, data.remove_role_ids) if data.remove_role_ids else set()
+
+    changed = added | removed
+    await _revoke_changed_users(db, changed)
+    await db.commit()
+    invalidate_principals(changed)
+    if changed:
+        await log_audit_event(request, "role.members_changed", actor_id=current_user.id, details={
+            "add_role_ids": data.add_role_ids, "remove_role_ids": data.remove_role_ids,
+            "added_user_ids": sorted(added), "removed_user_ids": sorted(removed),
+        })
+
+    return {"message": "Rôles mis à jour ✅", "users_changed": len(changed)}
+
+
+# ============================
+# 🔑 PERMISSIONS DES RÔLES
+# ============================
+
+@router.get("/permissions", dependencies=[Depends(require_permission(ROLES_MANAGE))])
+async def list_permissions():
+    """Liste toutes les permissions connues de l'application."""
+    return permissions.items()
+
+@router.get("/{role_id}/permissions", dependencies=[Depends(require_permission(ROLES_MANAGE))])
+async def get_role_permissions(role_id: int, db: AsyncSession = Depends(get_read_db)):
+    await _get_role_or_404(db, role_id)
+    result = await db.execute(
+        select(role_permissions.c.permission)
+        .where(role_permissions.c.role_id == role_id)
+        .order_by(role_permissions.c.permission)
+    )
+    return {"role_id": role_id, "permissions": result.scalars().all()}
+
+@router.put("/{role_id}/permissions")
+async def set_role_permissions(
+    role_id: int,
+    data: RolePermissionsRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(ROLES_MANAGE)),
+):
+    """Remplace l'ensemble des permissions du rôle, puis recompile la table en mémoire."""
+    await _get_role_or_404(db, role_id)
+
+    unknown = [code for code in data.permissions if code not in permissions]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Permissions inconnues : {', '.join(unknown)}")
+
+    previous = await db.execute(
+        delete(role_permissions)
+        .where(role_permissions.c.role_id == role_id)
+        .returning(role_permissions.c.permission)
+    )
+    previous_codes = sorted(previous.scalars().all())
+    codes = list(dict.fromkeys(data.permissions))
+    if codes:
+        await db.execute(insert(role_permissions), [{"role_id": role_id, "permission": code} for code in codes])
+    await db.commit()
+    permission_table.invalidate()
+    await log_audit_event(request, "role.permissions_updated", actor_id=current_user.id,
+                          target_type="role", target_id=role_id, details={"from": previous_codes, "to": codes})
+
+    return {"message": "Permissions mises à jour ✅", "permissions": codes}
@@ -1,18 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+from itertools import product
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import delete
-from sqlalchemy.orm import selectinload, joinedload
-from backend.db.database import get_db
-from backend.db.models import User, Role, user_roles
-from backend.core.auth import hash_password
-from pydantic import BaseModel
+from sqlalchemy import and_, delete, exists, func, insert, or_, tuple_, union, update
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from backend.db.database import get_db, get_read_db, ReadSessionLocal, insert_or_ignore
+from backend.db.models import User, Role, RefreshToken, user_roles, USER_SEARCH_TEXT
+from backend.core.auth import (
+    hash_password_async, hash_passwords_async, generate_temp_password,
+    invalidate_principal, bump_token_version,
+)
+from pydantic import BaseModel, EmailStr, ValidationError, validator
 from datetime import datetime, date
-from backend.core.dependencies import has_role, get_current_user
+from backend.core.audit import log_audit_event
+from backend.core.dependencies import require_permission, get_current_user
+from backend.core.permissions import USERS_READ, USERS_WRITE, USERS_DELETE, USERS_EXPORT
 from typing import List, Optional
 from backend.utils.email import (
     send_password_changed_email,
+    send_invitation_emails,
+)
+from backend.utils.pagination import encode_cursor, decode_cursor, escape_like, count_rows
+from backend.utils.search import (
+    TRIGRAM_MIN_LENGTH, EXPANDED_TERMS, search_terms, trigram_search_available, plan_with_values,
+    contains_condition, prefix_condition, byte_order, prefix_range,
 )
+from backend.utils.export import EXPORT_MEDIA_TYPES, encode_stream, gzip_stream, accepts_gzip
+from backend.settings import settings
 
 # Routeur principal pour la gestion des utilisateurs
 router = APIRouter(prefix="/users")
@@ -88,17 +107,470 @@ class UserOutWithRoles(BaseModel):
         orm_mode = True
 
 
+# Champs sélectionnables via ?fields= (les rôles sont chargés à part, seulement si demandés)
+USER_LIST_COLUMNS = {
+    "id": User.id,
+    "first_name": User.first_name,
+    "last_name": User.last_name,
+    "email": User.email,
+    "birth_date": User.birth_date,
+    "created_at": User.created_at,
+    "is_active": User.is_active,
+    "language": User.language,
+    "date_format": User.date_format,
+    "theme": User.theme,
+}
+DEFAULT_USER_LIST_FIELDS = ["id", "first_name", "last_name", "email", "birth_date", "is_active", "roles"]
+
+
+def parse_fields(fields: Optional[str]) -> list[str]:
+    if not fields:
+        return DEFAULT_USER_LIST_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in USER_LIST_COLUMNS and f != "roles"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Champs inconnus : {', '.join(unknown)}")
+    return requested
+
+
+async def load_role_map(db: AsyncSession, user_ids: list[int]) -> dict[int, list[dict]]:
+    """Rôles d'une page d'utilisateurs, en une seule requête."""
+    role_map: dict[int, list[dict]] = {user_id: [] for user_id in user_ids}
+    if not user_ids:
+        return role_map
+    result = await db.execute(
+        select(user_roles.c.user_id, Role.id, Role.name)
+        .join(Role, Role.id == user_roles.c.role_id)
+        .where(user_roles.c.user_id.in_(user_ids))
+        .order_by(user_roles.c.user_id, Role.id)
+    )
+    for user_id, role_id, role_name in result.all():
+        role_map[user_id].append({"id": role_id, "name": role_name})
+    return role_map
+
+
 # --------------------------------------------- #
-# Endpoint : liste de tous les utilisateurs     #
+# Endpoint : liste paginée des utilisateurs     #
 # --------------------------------------------- #
-@router.get("/", response_model=List[UserOutWithRoles])
+@router.get("/")
 async def list_users(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", regex="^(id|created_at)$"),
+    is_active: Optional[bool] = None,
+    role: Optional[str] = None,
+    email_prefix: Optional[str] = None,
+    fields: Optional[str] = None,
+    total: Optional[str] = Query(None, regex="^(exact|estimate)$"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_permission(USERS_READ))
+):
+    """
+    Liste les utilisateurs par pages (pagination par curseur sur `id` ou `created_at`).
+    Passer `next_cursor` dans `cursor` pour obtenir la page suivante.
+    """
+    selected = parse_fields(fields)
+    with_roles = "roles" in selected
+    columns = [name for name in selected if name != "roles"]
+
+    # Colonnes nécessaires au curseur, même si non demandées (ajoutées après les colonnes demandées)
+    query_columns = list(dict.fromkeys(columns + ["id"] + (["created_at"] if sort == "created_at" else [])))
+    id_index = query_columns.index("id")
+
+    # Filtres côté serveur
+    conditions = []
+    if is_active is not None:
+        conditions.append(User.is_active == is_active)
+    if email_prefix:
+        conditions.append(func.lower(User.email).like(escape_like(email_prefix.lower()) + "%", escape="\\"))
+    if role:
+        conditions.append(
+            exists()
+            .where(user_roles.c.user_id == User.id)
+            .where(user_roles.c.role_id == Role.id)
+            .where(Role.name == role)
+        )
+
+    stmt = select(*(USER_LIST_COLUMNS[name] for name in query_columns)).where(*conditions)
+    sort_key = (User.created_at, User.id) if sort == "created_at" else (User.id,)
+
+    count = None
+    if total:
+        count = await count_rows(db, stmt, estimate=(total == "estimate"))
+
+    if cursor:
+        values = decode_cursor(cursor, *((datetime, int) if sort == "created_at" else (int,)))
+        stmt = stmt.where(tuple_(*sort_key) > tuple_(*values))
+
+    result = await db.execute(stmt.order_by(*sort_key).limit(limit + 1))
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    role_map = await load_role_map(db, [row[id_index] for row in rows]) if with_roles else {}
+
+    # Projection directe des tuples en dicts : les colonnes demandées sont en tête de la requête,
+    # zip s'arrête donc avant les colonnes techniques du curseur
+    if with_roles:
+        items = [{**dict(zip(columns, row)), "roles": role_map[row[id_index]]} for row in rows]
+    else:
+        items = [dict(zip(columns, row)) for row in rows]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id) if sort == "created_at" else encode_cursor(last.id)
+
+    # Réponse construite directement : évite le passage par jsonable_encoder sur chaque ligne
+    return ORJSONResponse({
+        "items": items,
+        "next_cursor": next_cursor,
+        "total": count[0] if count else None,
+        "total_is_estimate": count[1] if count else False,
+    })
+
+
+# Colonnes de l'export annuaire (les rôles sont agrégés en SQL)
+EXPORT_COLUMNS = [
+    "id", "first_name", "last_name", "email", "birth_date", "created_at",
+    "is_active", "language", "date_format", "theme", "roles",
+]
+EXPORT_BATCH_SIZE = 1000
+ROLE_SEPARATOR = "\x1f"
+
+
+def roles_aggregate(dialect_name: str):
+    """Liste des noms de rôles par utilisateur, calculée par la base."""
+    if dialect_name == "postgresql":
+        return func.array_remove(func.array_agg(aggregate_order_by(Role.name, Role.name)), None)
+    return func.group_concat(Role.name, ROLE_SEPARATOR)
+
+
+async def stream_user_rows(is_active: Optional[bool]):
+    # Session dédiée (réplique si configurée) : elle doit rester ouverte pendant tout le flux
+    async with ReadSessionLocal() as db:
+        dialect_name = db.get_bind().dialect.name
+        stmt = (
+            select(*(USER_LIST_COLUMNS[name] for name in EXPORT_COLUMNS if name != "roles"),
+                   roles_aggregate(dialect_name).label("roles"))
+            .outerjoin(user_roles, user_roles.c.user_id == User.id)
+            .outerjoin(Role, Role.id == user_roles.c.role_id)
+            .group_by(User.id)
+            .order_by(User.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        if is_active is not None:
+            stmt = stmt.where(User.is_active == is_active)
+
+        result = await db.stream(stmt)
+        async for partition in result.partitions(EXPORT_BATCH_SIZE):
+            batch = []
+            for row in partition:
+                item = dict(zip(EXPORT_COLUMNS, row))
+                roles = item["roles"]
+                if isinstance(roles, str):
+                    item["roles"] = roles.split(ROLE_SEPARATOR)
+                elif roles is None:
+                    item["roles"] = []
+                batch.append(item)
+            yield batch
+
+
+# --------------------------------------------------------- #
+# Endpoint : export de l'annuaire complet (NDJSON ou CSV)   #
+# --------------------------------------------------------- #
+@router.get("/export")
+async def export_users(
+    request: Request,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    is_active: Optional[bool] = None,
+    current_user: User = Depends(require_permission(USERS_EXPORT))
+):
+    """
+    Exporte tous les utilisateurs avec leurs rôles, en flux (curseur côté serveur) :
+    la mémoire reste constante quel que soit le nombre d'utilisateurs.
+    Compressé en gzip à la volée si le client envoie `Accept-Encoding: gzip`.
+    """
+    body = encode_stream(stream_user_rows(is_active), format, EXPORT_COLUMNS)
+    headers = {"Content-Disposition": f'attachment; filename="users.{format}"'}
+
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+# Ligne d'import d'utilisateurs (JSON ou CSV)
+class ImportUserRow(BaseModel):
+    first_name: str
+    last_name: str
+    email: EmailStr
+    birth_date: Optional[date] = None
+    roles: list[str] = ["employee"]
+
+    @validator("birth_date", pre=True)
+    def empty_birth_date(cls, value):
+        return value or None
+
+    @validator("roles", pre=True)
+    def split_roles(cls, value):
+        # CSV : rôles séparés par « | » (même format que l'export)
+        if isinstance(value, str):
+            return [name.strip() for name in value.split("|") if name.strip()] or ["employee"]
+        return value
+
+
+# ~250 ms de hachage par ligne avec un seul lot en vol (2 workers par défaut) :
+# 100 lignes tiennent en une trentaine de secondes, dans le délai d'une requête normale
+MAX_IMPORT_ROWS = 100
+IMPORT_CHUNK_SIZE = 500
+
+
+def parse_import_body(body: bytes, content_type: str) -> list[dict]:
+    try:
+        if "csv" in content_type:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            return [dict(row) for row in reader]
+        data = json.loads(body)
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        raise HTTPException(status_code=400, detail="Fichier d'import illisible")
+
+    rows = data.get("users") if isinstance(data, dict) else data
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Format attendu : liste d'utilisateurs")
+    return rows
+
+
+# ------------------------------------------------------------ #
+# Endpoint : import d'utilisateurs en masse (JSON ou CSV)      #
+# ------------------------------------------------------------ #
+@router.post("/import")
+async def import_users(
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(has_role(["super_admin"]))  # Restreint aux super_admins
+    current_user: User = Depends(require_permission(USERS_WRITE))
+):
+    """
+    Crée des utilisateurs en lot à partir d'un corps JSON (`[...]` ou `{"users": [...]}`)
+    ou CSV (`Content-Type: text/csv`, colonnes first_name,last_name,email,birth_date,roles).
+    Chaque utilisateur reçoit un mot de passe temporaire et une invitation (mise en file).
+    Retourne un rapport ligne par ligne. Le hachage des mots de passe temporaires
+    dure environ password_hash_target_ms par utilisateur, réparti sur le pool en
+    laissant un worker aux connexions : au-delà de MAX_IMPORT_ROWS lignes, découper
+    le fichier en plusieurs imports.
+    """
+    raw_rows = parse_import_body(await request.body(), request.headers.get("content-type", ""))
+    if len(raw_rows) > MAX_IMPORT_ROWS:
+        raise HTTPException(status_code=413, detail=f"Maximum {MAX_IMPORT_ROWS} utilisateurs par import")
+
+    report: list[dict] = []
+    candidates: list[tuple[int, ImportUserRow]] = []
+    seen: set[str] = set()
+
+    # 1. Validation et doublons internes au fichier
+    for index, raw in enumerate(raw_rows, start=1):
+        try:
+            row = ImportUserRow.parse_obj(raw)
+        except ValidationError as e:
+            report.append({"row": index, "email": raw.get("email") if isinstance(raw, dict) else None,
+                           "status": "error", "detail": "; ".join(err["msg"] for err in e.errors())})
+            continue
+        email = row.email.lower()
+        if email in seen:
+            report.append({"row": index, "email": row.email, "status": "error", "detail": "Email en double dans le fichier"})
+            continue
+        seen.add(email)
+        candidates.append((index, row))
+
+    # 2. Emails déjà utilisés : une seule requête ensembliste
+    existing: set[str] = set()
+    if seen:
+        result = await db.execute(select(func.lower(User.email)).where(func.lower(User.email).in_(seen)))
+        existing = set(result.scalars().all())
+
+    # 3. Résolution des rôles : une seule requête
+    role_names = {name for _, row in candidates for name in row.roles}
+    role_ids: dict[str, int] = {}
+    if role_names:
+        result = await db.execute(select(Role.name, Role.id).where(Role.name.in_(role_names)))
+        role_ids = dict(result.all())
+
+    to_create: list[tuple[int, ImportUserRow]] = []
+    for index, row in candidates:
+        unknown = [name for name in row.roles if name not in role_ids]
+        if row.email.lower() in existing:
+            report.append({"row": index, "email": row.email, "status": "skipped", "detail": "Email déjà utilisé"})
+        elif unknown:
+            report.append({"row": index, "email": row.email, "status": "error", "detail": f"Rôles inconnus : {', '.join(unknown)}"})
+        else:
+            to_create.append((index, row))
+
+    # 4. Mots de passe temporaires hachés en parallèle sur le pool. La transaction de
+    #    lecture est close d'abord : la connexion retourne au pool pendant le hachage
+    await db.commit()
+    temp_passwords = [generate_temp_password() for _ in to_create]
+    hashed_passwords = await hash_passwords_async(temp_passwords)
+
+    # 5. Insertion par lots : utilisateurs, rôles et invitations dans la même transaction
+    for start in range(0, len(to_create), IMPORT_CHUNK_SIZE):
+        chunk = to_create[start:start + IMPORT_CHUNK_SIZE]
+        passwords = temp_passwords[start:start + IMPORT_CHUNK_SIZE]
+        hashes = hashed_passwords[start:start + IMPORT_CHUNK_SIZE]
+
+        result = await db.execute(
+            insert_or_ignore(db, User.__table__).returning(User.id, User.email),
+            [
+                {
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "email": row.email,
+                    "birth_date": row.birth_date,
+                    "hashed_password": hashed,
+                    "is_active": True,
+                    "must_change_password": True,
+                    "created_at": datetime.utcnow(),
+                }
+                for (_, row), hashed in zip(chunk, hashes)
+            ],
+        )
+        created_ids = {email.lower(): user_id for user_id, email in result.all()}
+
+        links = [
+            {"user_id": created_ids[row.email.lower()], "role_id": role_ids[name]}
+            for _, row in chunk if row.email.lower() in created_ids
+            for name in dict.fromkeys(row.roles)
+        ]
+        if links:
+            await db.execute(insert(user_roles), links)
+
+        invitations = []
+        for (index, row), temp_password in zip(chunk, passwords):
+            user_id = created_ids.get(row.email.lower())
+            if user_id is None:
+                # Créé entre-temps par une autre requête (ON CONFLICT DO NOTHING)
+                report.append({"row": index, "email": row.email, "status": "skipped", "detail": "Email déjà utilisé"})
+                continue
+            invitations.append((row.email, temp_password))
+            report.append({"row": index, "email": row.email, "status": "created", "id": user_id})
+
+        await send_invitation_emails(db, invitations)  # commit du lot
+
+    report.sort(key=lambda entry: entry["row"])
+    summary = {status: sum(1 for entry in report if entry["status"] == status) for status in ("created", "skipped", "error")}
+    # Un seul événement par import, quel que soit le nombre de lignes
+    if summary["created"]:
+        await log_audit_event(request, "user.imported", actor_id=current_user.id, details={
+            **summary, "user_ids": [entry["id"] for entry in report if entry["status"] == "created"],
+        })
+    return {"summary": summary, "rows": report}
+
+
+SEARCH_COLUMNS = ["id", "first_name", "last_name", "email", "is_active"]
+
+
+# ------------------------------------------------------------ #
+# Endpoint : recherche d'utilisateurs (prénom, nom, email)     #
+# ------------------------------------------------------------ #
+@router.get("/search")
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_permission(USERS_READ))
 ):
-    result = await db.execute(select(User).options(joinedload(User.roles)))
-    users = result.unique().scalars().all()
-    return users
+    """
+    Recherche classée sur le prénom, le nom et l'email, par pages (`next_cursor`).
+    `mode` indique le chemin utilisé : "trigram" (sous-chaînes, classement par
+    similarité) ou "prefix" (préfixes, ordre alphabétique nom puis prénom).
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Recherche vide")
+
+    dialect_name = db.get_bind().dialect.name
+    trigram = any(len(term) >= TRIGRAM_MIN_LENGTH for term in terms) and await trigram_search_available(db)
+    columns = [USER_LIST_COLUMNS[name] for name in SEARCH_COLUMNS]
+
+    # Toutes les correspondances sont classées : le curseur est appliqué dans le parcours,
+    # avant la limite, et chaque page reprend exactement après la précédente.
+    # Les colonnes affichées et la clé de tri sont lues dans ce même parcours.
+    if trigram:
+        conditions = [contains_condition(USER_SEARCH_TEXT, term) for term in terms]
+        score = func.word_similarity(" ".join(terms), USER_SEARCH_TEXT)
+        stmt = select(*columns, score.label("score")).where(*conditions).order_by(score.desc(), User.id)
+        if cursor:
+            values = decode_cursor(cursor, float, int)
+            stmt = stmt.where(or_(score < values[0], and_(score == values[0], User.id > values[1])))
+    else:
+        # Chaque terme doit préfixer le nom, le prénom ou l'email : une branche par
+        # attribution d'un champ à chacun des EXPANDED_TERMS premiers termes, les suivants
+        # filtrent. Les conditions sur le nom et le prénom portent sur les colonnes de
+        # l'index de tri (nom, prénom, id), qui fournit les lignes dans l'ordre ; celles
+        # sur l'email passent par son index. Chaque branche est triée et arrêtée à
+        # limit + 1 lignes ; l'union (sans doublons) est ensuite triée.
+        last_name_key = byte_order(func.lower(User.last_name), dialect_name)
+        first_name_key = byte_order(func.lower(User.first_name), dialect_name)
+        sort_key = (last_name_key, first_name_key, User.id)
+
+        # Par terme : nom, prénom (aussi exprimé pour l'index du prénom, préféré quand peu
+        # de lignes correspondent), email
+        term_fields = [
+            (
+                prefix_range(last_name_key, term),
+                and_(
+                    prefix_range(first_name_key, term),
+                    prefix_condition(func.lower(User.first_name), term, dialect_name),
+                ),
+                prefix_condition(func.lower(User.email), term, dialect_name),
+            )
+            for term in terms
+        ]
+        expanded, remaining = term_fields[:EXPANDED_TERMS], term_fields[EXPANDED_TERMS:]
+        filters = [or_(*fields) for fields in remaining]
+        if cursor:
+            # >= (nom, prénom, id + 1) plutôt que > (nom, prénom, id) : mêmes lignes, mais
+            # PostgreSQL estime la comparaison sur sa première colonne seule, et « >= nom »
+            # compte les lignes restantes de ce nom (« > » n'en compte aucune pour le dernier)
+            last_name, first_name, user_id = decode_cursor(cursor, str, str, int)
+            filters.append(tuple_(*sort_key) >= tuple_(last_name, first_name, user_id + 1))
+
+        branches = []
+        for conditions in product(*expanded):
+            branch = (
+                select(*columns, last_name_key.label("last_name_key"), first_name_key.label("first_name_key"))
+                .where(*conditions, *filters)
+                .order_by(*sort_key)
+                .limit(limit + 1)
+            )
+            branches.append(select(branch.subquery()))
+        matches = union(*branches).subquery()
+        stmt = select(matches).order_by(
+            byte_order(matches.c.last_name_key, dialect_name),
+            byte_order(matches.c.first_name_key, dialect_name),
+            matches.c.id,
+        )
+
+    stmt = stmt.limit(limit + 1)
+    await plan_with_values(db, stmt)
+    rows = (await db.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        # Colonnes techniques après les colonnes affichées : score, ou (nom, prénom) en minuscules
+        extra = list(last[len(SEARCH_COLUMNS):])
+        next_cursor = encode_cursor(*extra, last.id)
+
+    return ORJSONResponse({
+        "items": [dict(zip(SEARCH_COLUMNS, row)) for row in rows],
+        "next_cursor": next_cursor,
+        "mode": "trigram" if trigram else "prefix",
+    })
 
 
 # ---------------------------------------------------- #
@@ -107,14 +579,16 @@ async def list_users(
 @router.put("/me")
 async def update_profile(
     data: UpdateProfileRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Vérifie qu'aucun autre utilisateur ne possède cet email
-    stmt = select(User).where(User.email == data.email, User.id != current_user.id)
-    result = await db.execute(stmt)
-    if result.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail="Cet email est déjà utilisé.")
+    # Vérifie qu'aucun autre utilisateur ne possède cet email (seulement s'il change)
+    if data.email != current_user.email:
+        stmt = select(User.id).where(User.email == data.email, User.id != current_user.id)
+        result = await db.execute(stmt)
+        if result.first():
+            raise HTTPException(status_code=400, detail="Cet email est déjà utilisé.")
 
     # Mise à jour des champs
     current_user.first_name = data.first_name
@@ -128,7 +602,7 @@ async def update_profile(
             raise HTTPException(status_code=400, detail="Date de naissance invalide")
 
     if data.password:
-        current_user.hashed_password = hash_password(data.password)
+        current_user.hashed_password = await hash_password_async(data.password)
         await send_password_changed_email(db, current_user.email, current_user.first_name)
 
     if data.theme:
@@ -141,6 +615,9 @@ async def update_profile(
         current_user.date_format = data.date_format
 
     await db.commit()
+    invalidate_principal(current_user.id)
+    await log_audit_event(request, "user.profile_updated", actor_id=current_user.id, target_type="user",
+                          target_id=current_user.id, details={"password_changed": bool(data.password)})
     return {"message": "Profil mis à jour avec succès ✅"}
 
 
@@ -148,7 +625,11 @@ async def update_profile(
 # Endpoint : récupérer les détails d'un utilisateur    #
 # ---------------------------------------------------- #
 @router.get("/{user_id}")
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_permission(USERS_READ))
+):
     result = await db.execute(
         select(User).options(joinedload(User.roles)).where(User.id == user_id)
     )
@@ -178,18 +659,15 @@ async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
 async def update_user(
     user_id: int,
     data: UpdateUserRequest,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_permission(USERS_WRITE))
 ):
-    # Vérifie que l'utilisateur connecté est super admin
-    if not any(role.name == "super_admin" for role in current_user.roles):
-        raise HTTPException(status_code=403, detail="Accès refusé")
-
-    # Récupère l'utilisateur avec ses rôles
+    # Récupère l'utilisateur avec ses rôles (une seule requête)
     result = await db.execute(
-        select(User).options(selectinload(User.roles)).where(User.id == user_id)
+        select(User).options(joinedload(User.roles)).where(User.id == user_id)
     )
-    user = result.scalar_one_or_none()
+    user = result.unique().scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
@@ -202,11 +680,12 @@ async def update_user(
 
     # Mise à jour du mot de passe
     if data.password:
-        user.hashed_password = hash_password(data.password)
+        user.hashed_password = await hash_password_async(data.password)
         await send_password_changed_email(db, user.email, user.first_name)
 
     # Mise à jour des rôles
-    if data.roles:
+    previous_roles = {role.name for role in user.roles}
+    if data.roles and set(data.roles) != previous_roles:
         roles_result = await db.execute(select(Role).where(Role.name.in_(data.roles)))
         roles = roles_result.scalars().all()
         user.roles.clear()
@@ -216,29 +695,47 @@ async def update_user(
     for key, value in data.dict(exclude_unset=True, exclude={"birth_date", "password", "roles"}).items():
         setattr(user, key, value)
 
+    # Rôles, mot de passe ou désactivation : les tokens existants sont révoqués
+    current_roles = {role.name for role in user.roles}
+    if current_roles != previous_roles or data.password or user.is_active is False:
+        bump_token_version(user)
+
     await db.commit()
-    await db.refresh(user)
+    invalidate_principal(user_id)
+
+    details = {"fields": sorted(data.dict(exclude_unset=True, exclude={"password", "roles"})),
+               "password_changed": bool(data.password)}
+    if current_roles != previous_roles:
+        details["roles"] = {"from": sorted(previous_roles), "to": sorted(current_roles)}
+    await log_audit_event(request, "user.updated", actor_id=current_user.id,
+                          target_type="user", target_id=user_id, details=details)
     return {"message": "Utilisateur mis à jour ✅"}
 
 
 # --------------------------------------------------- #
 # Endpoint : suppression d’un utilisateur (super admin)
 # --------------------------------------------------- #
-@router.delete("/{user_id}", dependencies=[Depends(has_role(["super_admin"]))])
-async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
-    # Vérifie l'existence de l'utilisateur
-    user_result = await db.execute(select(User).where(User.id == user_id))
-    user = user_result.scalar_one_or_none()
+@router.delete("/{user_id}")
+async def delete_user(
+    user_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(require_permission(USERS_DELETE)),
+):
+    # Supprime les liens de rôle, les jetons de rafraîchissement puis l'utilisateur, sans le charger au préalable
+    await db.execute(delete(user_roles).where(user_roles.c.user_id == user_id))
+    await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id).execution_options(synchronize_session=False))
+    result = await db.execute(delete(User).where(User.id == user_id).returning(User.email))
+    email = result.scalar_one_or_none()
 
-    if not user:
+    if email is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
-    # Supprime les liens de rôle
-    await db.execute(delete(user_roles).where(user_roles.c.user_id == user_id))
-
-    # Supprime l'utilisateur
-    await db.delete(user)
     await db.commit()
+    invalidate_principal(user_id)
+    await log_audit_event(request, "user.deleted", actor_id=current_user.id,
+                          target_type="user", target_id=user_id, details={"email": email})
     return {"message": "Utilisateur supprimé avec succès ✅"}
 
 
@@ -248,15 +745,15 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
 @router.put("/reactivate/{user_id}")
 async def reactivate_user(
     user_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(has_role(["super_admin"]))
+    current_user: User = Depends(require_permission(USERS_WRITE))
 ):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-
-    if not user:
+    result = await db.execute(update(User).where(User.id == user_id).values(is_active=True).returning(User.id))
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
-    user.is_active = True
     await db.commit()
+    invalidate_principal(user_id)
+    await log_audit_event(request, "user.reactivated", actor_id=current_user.id, target_type="user", target_id=user_id)
     return {"message": "Utilisateur réactivé ✅"}
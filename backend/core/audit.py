@@ -0,0 +1,306 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+from typing import NamedTuple, Optional
+
+import orjson
+from fastapi import Request
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from backend.core.metrics import registry
+from backend.core.rate_limit import client_ip
+from backend.db.database import engine
+from backend.db.models import audit_log
+from backend.settings import settings
+
+
+# ============================
+# 🔍 JOURNAL D'AUDIT (ÉCRITURES PAR LOTS)
+# ============================
+# Les endpoints n'écrivent pas en base : ils déposent l'événement dans un tampon
+# borné en mémoire (quelques microsecondes). Une tâche de fond vide le tampon par
+# lots, dès que audit_batch_size événements attendent ou au plus tard toutes les
+# audit_flush_interval_seconds : COPY sous PostgreSQL (asyncpg), INSERT multi-lignes
+# ailleurs.
+#
+# Contre-pression bornée : tampon plein (base lente ou indisponible), l'appelant
+# attend au plus audit_backpressure_timeout_ms qu'un lot soit écrit, puis
+# l'événement est abandonné et compté (elstudio_audit_events_total{outcome="dropped"}).
+# Un lot n'est retiré du tampon qu'une fois écrit : en cas d'erreur, il est retenté.
+
+AUDIT_COLUMNS = ("occurred_at", "actor_id", "action", "target_type", "target_id", "ip", "details")
+PARTITION_PREFIX = "audit_log_p"
+
+audit_events = registry.counter(
+    "elstudio_audit_events_total", "Événements du journal d'audit", ("outcome",))
+audit_flush_duration = registry.histogram(
+    "elstudio_audit_flush_seconds", "Durée d'écriture d'un lot du journal d'audit")
+audit_flush_size = registry.histogram(
+    "elstudio_audit_flush_events", "Événements par lot écrit", (), (1, 10, 50, 100, 250, 500, 1000, 5000))
+
+
+class AuditEvent(NamedTuple):
+    occurred_at: datetime  # UTC, sans fuseau (comme les autres colonnes DateTime)
+    actor_id: Optional[int]
+    action: str
+    target_type: Optional[str] = None
+    target_id: Optional[str] = None
+    ip: Optional[str] = None
+    details: Optional[dict] = None
+
+
+# ============================
+# 🗓️ PARTITIONS MENSUELLES (POSTGRESQL)
+# ============================
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def shift_month(start: datetime, months: int) -> datetime:
+    index = start.year * 12 + start.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{start:%Y%m}"
+
+
+async def create_partition(conn: AsyncConnection, start: datetime) -> bool:
+    """Crée la partition du mois ; False si la partition par défaut contient déjà des lignes de ce mois."""
+    try:
+        async with conn.begin_nested():
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF audit_log "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{shift_month(start, 1):%Y-%m-%d}')"
+            ))
+        return True
+    except Exception as e:
+        print(f"⚠ Partition {partition_name(start)} non créée (lignes conservées dans audit_log_default) :", e)
+        return False
+
+
+async def drop_expired_partitions(conn: AsyncConnection, retention_months: int, now: datetime) -> list[str]:
+    """Supprime les partitions antérieures à la rétention : un DROP TABLE, sans DELETE ni VACUUM."""
+    if retention_months <= 0:
+        return []
+    cutoff = partition_name(shift_month(month_start(now), -retention_months))
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST('audit_log' AS regclass)"
+    ))
+    expired = sorted(
+        name for name in result.scalars()
+        if name.startswith(PARTITION_PREFIX) and name < cutoff
+    )
+    for name in expired:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    return expired
+
+
+# ============================
+# 📝 TAMPON ET ÉCRITURE EN ARRIÈRE-PLAN
+# ============================
+
+class AuditJournal:
+    def __init__(
+        self,
+        db_engine=engine,
+        capacity: int = settings.audit_buffer_size,
+        batch_size: int = settings.audit_batch_size,
+        flush_interval: float = settings.audit_flush_interval_seconds,
+        backpressure_timeout: float = settings.audit_backpressure_timeout_ms / 1000,
+    ):
+        self.engine = db_engine
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure_timeout = backpressure_timeout
+
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self._buffer: deque[AuditEvent] = deque()
+        self._wake = asyncio.Event()  # lot complet ou arrêt demandé
+        self._space = asyncio.Event()  # un lot vient d'être retiré du tampon
+        self._partitions: set[datetime] = set()  # mois dont la partition existe
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._buffer)
+
+    # -- Cycle de vie
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Écrit les événements restants puis arrête la tâche."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    # -- Enregistrement (appelé par les endpoints)
+
+    async def record(self, event: AuditEvent):
+        # Journal arrêté (scripts, tests via ASGITransport sans événement de démarrage) : rien à faire
+        if self._task is None:
+            return
+
+        if len(self._buffer) >= self.capacity:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.backpressure_timeout
+            while len(self._buffer) >= self.capacity:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.dropped += 1
+                    audit_events.inc("dropped")
+                    return
+                self._space.clear()
+                try:
+                    await asyncio.wait_for(self._space.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        self._buffer.append(event)
+        audit_events.inc("recorded")
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    # -- Écriture
+
+    async def run(self):
+        retry_delay = 1.0
+        while True:
+            if len(self._buffer) < self.batch_size and not self._stopping:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            if not self._buffer:
+                if self._stopping:
+                    return
+                continue
+
+            try:
+                await self.flush_batch()
+                retry_delay = 1.0
+            except Exception as e:
+                self.failed_flushes += 1
+                print("❌ Erreur d'écriture du journal d'audit:", e)
+                if self._stopping:
+                    # Arrêt avec une base indisponible : on ne bloque pas l'extinction
+                    self.dropped += len(self._buffer)
+                    audit_events.inc("dropped", amount=len(self._buffer))
+                    self._buffer.clear()
+                    return
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30.0)
+
+    async def flush_batch(self) -> int:
+        """Écrit le plus ancien lot du tampon ; il n'en est retiré qu'après succès."""
+        batch = list(islice(self._buffer, self.batch_size))
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        await self._write(batch)
+        for _ in batch:
+            self._buffer.popleft()
+        self._space.set()
+
+        self.written += len(batch)
+        audit_events.inc("written", amount=len(batch))
+        audit_flush_duration.observe(time.perf_counter() - started)
+        audit_flush_size.observe(len(batch))
+        return len(batch)
+
+    async def _write(self, batch: list[AuditEvent]):
+        async with self.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                await self._ensure_partitions(conn, {month_start(event.occurred_at) for event in batch})
+                if conn.dialect.driver == "asyncpg":
+                    raw = await conn.get_raw_connection()
+                    # COPY vers la table mère : PostgreSQL route chaque ligne vers sa partition
+                    await raw.driver_connection.copy_records_to_table(
+                        "audit_log",
+                        records=[
+                            (*event[:-1], orjson.dumps(event.details).decode() if event.details is not None else None)
+                            for event in batch
+                        ],
+                        columns=AUDIT_COLUMNS,
+                    )
+                    return
+            await conn.execute(insert(audit_log).values([event._asdict() for event in batch]))
+            await conn.commit()
+
+    async def _ensure_partitions(self, conn: AsyncConnection, months: set[datetime]):
+        missing = months - self._partitions
+        if not missing:
+            return
+        # Le mois suivant est créé en même temps : le changement de mois ne passe pas par la partition par défaut
+        wanted = sorted(missing | {shift_month(month, 1) for month in missing})
+        # Plusieurs workers peuvent arriver ici en même temps
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('audit_log_partitions'))"))
+        for month in wanted:
+            await create_partition(conn, month)
+        expired = await drop_expired_partitions(conn, settings.audit_retention_months, datetime.utcnow())
+        await conn.commit()
+        self._partitions.update(wanted)
+        if expired:
+            print(f"✔ Journal d'audit : partitions expirées supprimées ({', '.join(expired)})")
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+audit_journal = AuditJournal()
+
+registry.callback("elstudio_audit_buffer_depth", "Événements d'audit en attente d'écriture",
+                  (), lambda: [(audit_journal.depth,)])
+
+
+async def log_audit_event(
+    request: Optional[Request],
+    action: str,
+    *,
+    actor_id: Optional[int] = None,
+    target_type: Optional[str] = None,
+    target_id=None,
+    details: Optional[dict] = None,
+):
+    """À appeler après le commit : seules les modifications effectivement enregistrées sont journalisées."""
+    await audit_journal.record(AuditEvent(
+        occurred_at=datetime.utcnow(),
+        actor_id=actor_id,
+        action=action,
+        target_type=target_type,
+        target_id=str(target_id) if target_id is not None else None,
+        ip=client_ip(request) if request is not None else None,
+        details=details,
+    ))
+
+
+def naive_utc(moment: datetime) -> datetime:
+    """Les horodatages du journal sont stockés en UTC sans fuseau."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
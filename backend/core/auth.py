@@ -1,27 +1,47 @@
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from backend.db.database import get_db
-from backend.db.models import User
-from sqlalchemy.orm import selectinload
+from backend.db.database import get_db, PRIMARY
+from backend.db.models import User, Role
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+import asyncio
+from pydantic import BaseModel
 import secrets
 import string
-from jose import JWTError, jwt
-from backend.core.config import SECRET_KEY, ALGORITHM
+from concurrent.futures import ProcessPoolExecutor
+from backend.settings import settings
+from backend.core.cache import TTLCache
+from backend.core.metrics import registry, password_hash_duration, password_hash_rejected
+from backend.core.invalidation import invalidation_bus
+from backend.core.hashing import HashParams, build_context, calibrate_bcrypt, calibrate_argon2, measure as measure_hash
+from backend.core.jwks import KeySetVerifier
+from backend.core.signing_keys import keyring
+import time
 
 
-# -- Config JWT
-SECRET_KEY = "supersecret"  # à sécuriser en prod
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# -- Config JWT : signature asymétrique (core/signing_keys.py), vérification par le JWKS publié
+# (/.well-known/jwks.json), le même que celui utilisé par les autres services
+token_verifier = KeySetVerifier(
+    lambda: keyring.jwks(refresh=True),
+    refresh_interval=settings.jwt_keys_reload_seconds,
+    min_refetch_interval=1.0,
+)
 
 
-# -- Hashing password
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# -- Hashing password (coût par défaut de passlib jusqu'au calibrage du démarrage)
+hash_params = HashParams(settings.password_hash_scheme)
+pwd_context = build_context(hash_params)
+
+def configure_password_hashing(params: HashParams):
+    """Applique les paramètres de hachage (aussi utilisé comme initializer des workers du pool)."""
+    global hash_params, pwd_context
+    hash_params = params
+    pwd_context = build_context(params)
 
 def hash_password(password: str):
     return pwd_context.hash(password)
@@ -29,14 +49,140 @@ def hash_password(password: str):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password, hashed_password) -> tuple[bool, str | None]:
+    """Vérifie le mot de passe ; renvoie aussi un nouveau hash si l'ancien est trop faible."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def calibrate_password_hashing():
+    """
+    Choisit le coût de hachage pour viser settings.password_hash_target_ms sur cette
+    machine (ou applique password_hash_cost s'il est fixé). À appeler au démarrage.
+    """
+    scheme = settings.password_hash_scheme
+    target = settings.password_hash_target_ms / 1000
+    if settings.password_hash_cost is not None:
+        params = HashParams(scheme, settings.password_hash_cost,
+                            *((settings.argon2_memory_kib, settings.argon2_parallelism) if scheme == "argon2" else ()))
+        params = params._replace(measured_seconds=measure_hash(params, samples=1))
+    elif scheme == "argon2":
+        params = calibrate_argon2(target, settings.argon2_memory_kib, settings.argon2_parallelism,
+                                  settings.argon2_min_time_cost, settings.argon2_max_time_cost)
+    else:
+        params = calibrate_bcrypt(target, settings.bcrypt_min_rounds, settings.bcrypt_max_rounds)
+
+    # Les workers existants gardent l'ancien contexte : ils seront recréés au prochain hachage
+    shutdown_hash_pool()
+    configure_password_hashing(params)
+    print(f"🔐 Hachage des mots de passe : {params.scheme}, coût {params.cost} ({params.measured_seconds * 1000:.0f} ms)")
+    return params
+
+# -- Hachage asynchrone : bcrypt bloque ~250 ms par appel, on le déporte
+# dans un pool de processus borné pour ne pas figer la boucle d'événements.
+_hash_executor: ProcessPoolExecutor | None = None
+_hash_slots: asyncio.Semaphore | None = None
+
+def _get_hash_executor():
+    global _hash_executor
+    if _hash_executor is None and settings.hash_pool_workers > 0:
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=settings.hash_pool_workers,
+            initializer=configure_password_hashing,
+            initargs=(hash_params,),
+        )
+    return _hash_executor
+
+async def _run_hash_job(func, *args, wait: bool = False):
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(
+            max(settings.hash_pool_workers, 1) + settings.hash_pool_queue_size
+        )
+
+    # File pleine : on rejette plutôt que d'accumuler des requêtes en attente
+    # (un traitement par lot déjà engagé attend sa place au lieu d'échouer à mi-parcours)
+    if _hash_slots.locked() and not wait:
+        password_hash_rejected.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serveur surchargé, veuillez réessayer",
+            headers={"Retry-After": "1"},
+        )
+
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(_get_hash_executor(), func, *args)
+        finally:
+            password_hash_duration.observe(time.perf_counter() - started, _HASH_OPERATIONS.get(func, func.__name__))
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash_job(hash_password, password)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password, hashed_password) -> tuple[bool, str | None]:
+    return await _run_hash_job(verify_and_update_password, plain_password, hashed_password)
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [hash_password(password) for password in passwords]
+
+async def hash_passwords_async(passwords: list[str]) -> list[str]:
+    """
+    Hache un lot de mots de passe par petites tranches (hash_batch_chunk_size).
+    Au plus hash_pool_workers - 1 tranches sont en cours à la fois : un worker
+    reste disponible pour les connexions, qui s'intercalent aussi entre deux
+    tranches au lieu d'attendre la fin du lot.
+    """
+    if not passwords:
+        return []
+    size = settings.hash_batch_chunk_size
+    in_flight = asyncio.Semaphore(max(settings.hash_pool_workers - 1, 1))
+
+    async def hash_chunk(chunk: list[str]) -> list[str]:
+        async with in_flight:
+            return await _run_hash_job(_hash_many, chunk, wait=True)
+
+    results = await asyncio.gather(*(hash_chunk(passwords[i:i + size]) for i in range(0, len(passwords), size)))
+    return [hashed for chunk in results for hashed in chunk]
+
+# Étiquette de la métrique elstudio_password_hash_seconds
+_HASH_OPERATIONS = {
+    hash_password: "hash",
+    verify_password: "verify",
+    verify_and_update_password: "verify",
+    _hash_many: "hash_batch",
+}
+
+password_rehashed = registry.counter(
+    "elstudio_password_rehash_total", "Hashes refaits à la connexion (coût ou algorithme obsolète)")
+
+def _hash_params_metrics():
+    for name in ("cost", "memory_kib", "parallelism"):
+        value = getattr(hash_params, name)
+        if value is not None:
+            yield hash_params.scheme, name, value
+
+registry.callback("elstudio_password_hash_parameter", "Paramètres de hachage retenus au démarrage",
+                  ("scheme", "parameter"), _hash_params_metrics)
+registry.callback("elstudio_password_hash_calibrated_seconds", "Latence d'un hash mesurée au démarrage",
+                  ("scheme",), lambda: [(hash_params.scheme, hash_params.measured_seconds)]
+                  if hash_params.measured_seconds is not None else [])
+
+def shutdown_hash_pool():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
 def generate_temp_password(length=12):
     chars = string.ascii_letters + string.digits
     return ''.join(secrets.choice(chars) for _ in range(length))
 
-def decode_access_token(token: str):
+async def decode_access_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return await token_verifier.decode_async(token)
     except JWTError:
         raise HTTPException(status_code=401, detail="Token invalide ou expiré")
 
@@ -44,13 +190,101 @@ def decode_access_token(token: str):
 # -- JWT Token
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    key = keyring.active
+    return jwt.encode(to_encode, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+def create_user_access_token(user: User) -> str:
+    """JWT d'accès d'un utilisateur (rôles chargés) : connexion et rafraîchissement."""
+    return create_access_token({
+        "sub": str(user.id),
+        "roles": [role.name for role in user.roles],
+        "ver": user.token_version or 0,
+    })
 
 # -- Sécurité : récupération de l'utilisateur courant
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# -- Cache des utilisateurs authentifiés (colonnes + rôles), par (ID, token)
+principal_cache = TTLCache(
+    max_size=settings.principal_cache_max_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+
+# Incrémenté à chaque éviction : un chargement commencé avant n'est pas mis en cache
+_principal_generation = 0
+
+def _evict_principals(user_ids):
+    global _principal_generation
+    _principal_generation += 1
+    if user_ids is None:
+        principal_cache.clear()
+        _token_versions.clear()
+        return
+    for user_id in user_ids:
+        principal_cache.invalidate_tag(int(user_id))
+        _token_versions.pop(int(user_id), None)
+
+# Évictions reçues des autres workers
+invalidation_bus.register("principals", _evict_principals)
+
+def invalidate_principal(user_id: int):
+    """À appeler après toute modification d'un utilisateur ou de ses rôles."""
+    invalidate_principals([user_id])
+
+def invalidate_principals(user_ids):
+    """Invalidation groupée, après une modification en masse des rôles."""
+    user_ids = [int(user_id) for user_id in user_ids]
+    _evict_principals(user_ids)
+    invalidation_bus.publish("principals", user_ids)
+
+def invalidate_all_principals():
+    """À appeler après toute modification des rôles (nom, suppression)."""
+    _evict_principals(None)
+    invalidation_bus.publish("principals")
+
+# -- Versions de token : ID utilisateur -> token_version (révocation)
+_token_versions: dict[int, int] = {}
+
+def bump_token_version(user: User):
+    """Révoque tous les tokens déjà émis pour cet utilisateur (effectif au commit)."""
+    user.token_version = (user.token_version or 0) + 1
+
+async def get_token_version(db: AsyncSession, user_id: int) -> int | None:
+    version = _token_versions.get(user_id)
+    if version is None:
+        generation = _principal_generation
+        # Révocation : jamais lue sur la réplique
+        result = await db.execute(select(User.token_version).where(User.id == user_id).execution_options(**PRIMARY))
+        version = result.scalar_one_or_none()
+        if version is None:
+            return None
+        if generation == _principal_generation:
+            _token_versions[user_id] = version
+    return version
+
+def _principal_snapshot(user: User) -> dict:
+    return {
+        "columns": {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs},
+        "roles": [(role.id, role.name) for role in user.roles],
+    }
+
+async def _principal_from_snapshot(db: AsyncSession, snapshot: dict) -> User:
+    # Reconstruit un utilisateur « propre » (sans historique) puis le rattache
+    # à la session sans requête : les handlers peuvent le modifier et committer.
+    user = User(**snapshot["columns"])
+    make_transient_to_detached(user)
+
+    roles = []
+    for role_id, role_name in snapshot["roles"]:
+        role = Role(id=role_id, name=role_name)
+        make_transient_to_detached(role)
+        roles.append(role)
+    set_committed_value(user, "roles", roles)
+
+    return await db.merge(user, load=False)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
@@ -61,21 +295,60 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = await token_verifier.decode_async(token)
         user_id: int = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
+    cache_key = (int(user_id), token)
+    snapshot = principal_cache.get(cache_key)
+    if snapshot is not None:
+        if snapshot["columns"]["token_version"] != payload.get("ver", 0):
+            raise credentials_exception
+        return await _principal_from_snapshot(db, snapshot)
+
+    generation = _principal_generation
     result = await db.execute(
         select(User)
-        .options(selectinload(User.roles))  # ⬅️ on précharge les rôles ici
+        .options(joinedload(User.roles))  # ⬅️ rôles chargés dans la même requête
         .where(User.id == int(user_id))
+        .execution_options(**PRIMARY)
+    )
+    user = result.unique().scalar_one_or_none()
+
+    if user is None or (user.token_version or 0) != payload.get("ver", 0):
+        raise credentials_exception
+
+    if generation == _principal_generation:
+        principal_cache.set(cache_key, _principal_snapshot(user), tag=user.id)
+    return user
+
+# -- Autorisation sans état : rôles lus dans le token, version vérifiée en mémoire
+class TokenPrincipal(BaseModel):
+    id: int
+    roles: list[str]
+    token_version: int
+
+async def get_token_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> TokenPrincipal:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token invalide ou manquant",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    user = result.scalar_one_or_none()
+    try:
+        payload = await token_verifier.decode_async(token)
+        user_id = int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise credentials_exception
 
-    if user is None:
+    token_version = payload.get("ver", 0)
+    # Aucune requête une fois la version en cache (elle est évincée à chaque révocation)
+    if await get_token_version(db, user_id) != token_version:
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    return TokenPrincipal(id=user_id, roles=payload.get("roles", []), token_version=token_version)
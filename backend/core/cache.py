@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    Cache mémoire LRU avec durée de vie par entrée.
+
+    Chaque entrée peut être rattachée à un « tag » (ex. l'ID d'un utilisateur)
+    pour invalider d'un coup toutes les entrées qui le concernent.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any, Hashable]] = OrderedDict()
+        self._tags: dict[Hashable, set[Hashable]] = {}
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value, tag = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tag: Hashable = None):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+            self._data[key] = (time.monotonic() + self.ttl, value, tag)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+
+            # Éviction des entrées les moins récemment utilisées
+            while len(self._data) > self.max_size:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable):
+        with self._lock:
+            for key in self._tags.pop(tag, set()):
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+    def _remove(self, key: Hashable):
+        _, _, tag = self._data.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -1,14 +1,40 @@
 from fastapi import Depends, HTTPException, status
-from backend.core.auth import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.core.auth import get_current_user, get_token_principal, TokenPrincipal
+from backend.core.permissions import permissions, permission_table
+from backend.db.database import get_db
 from backend.db.models import User
+from backend.settings import settings
 
-def has_role(required_roles: list[str]):
-    async def checker(current_user: User = Depends(get_current_user)):
-        user_roles = [role.name for role in current_user.roles]
-        if not any(role in user_roles for role in required_roles):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Vous n'avez pas les autorisations requises"
-            )
+def require_permission(*codes: str):
+    """
+    Exige toutes les permissions données. Le masque requis est calculé une fois
+    ici ; à chaque requête, la vérification est un simple ET binaire.
+    """
+    required = permissions.mask(codes)
+
+    def forbidden():
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Vous n'avez pas les autorisations requises"
+        )
+
+    if settings.stateless_authz:
+        async def claims_checker(
+            principal: TokenPrincipal = Depends(get_token_principal),
+            db: AsyncSession = Depends(get_db),
+        ):
+            if await permission_table.mask_for(db, principal.roles) & required != required:
+                raise forbidden()
+            return principal
+        return claims_checker
+
+    async def checker(
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db),
+    ):
+        role_names = [role.name for role in current_user.roles]
+        if await permission_table.mask_for(db, role_names) & required != required:
+            raise forbidden()
         return current_user
-    return checker
\ No newline at end of file
+    return checker
@@ -0,0 +1,76 @@
+import math
+import statistics
+import time
+from typing import NamedTuple, Optional
+
+from passlib.context import CryptContext
+
+
+# ============================
+# 🧂 PARAMÈTRES DE HACHAGE ET CALIBRAGE
+# ============================
+# Le coût du hachage (rounds bcrypt ou time_cost argon2) est choisi au démarrage
+# pour atteindre une latence cible sur la machine courante. Les hashes existants
+# de coût inférieur (ou d'un autre algorithme) sont refaits à la connexion
+# suivante via verify_and_update : le coût ne fait que monter, jamais descendre.
+
+class HashParams(NamedTuple):
+    scheme: str  # "bcrypt" ou "argon2"
+    cost: Optional[int] = None  # rounds (bcrypt) ou time_cost (argon2) ; None = défaut passlib
+    memory_kib: Optional[int] = None  # argon2 uniquement
+    parallelism: Optional[int] = None  # argon2 uniquement
+    measured_seconds: Optional[float] = None  # latence mesurée d'un hash à ce coût
+
+
+def build_context(params: HashParams) -> CryptContext:
+    if params.scheme == "argon2":
+        options = {}
+        if params.cost is not None:
+            options.update(argon2__rounds=params.cost, argon2__min_rounds=params.cost)
+        if params.memory_kib is not None:
+            options["argon2__memory_cost"] = params.memory_kib
+        if params.parallelism is not None:
+            options["argon2__parallelism"] = params.parallelism
+        # Les anciens hashes bcrypt restent vérifiables et sont migrés à la connexion
+        return CryptContext(schemes=["argon2", "bcrypt"], deprecated=["bcrypt"], **options)
+
+    if params.scheme != "bcrypt":
+        raise ValueError(f"Algorithme de hachage inconnu : {params.scheme}")
+    options = {}
+    if params.cost is not None:
+        options.update(bcrypt__rounds=params.cost, bcrypt__min_rounds=params.cost)
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", **options)
+
+
+def measure(params: HashParams, samples: int = 3) -> float:
+    """Latence médiane (en secondes) d'un hash avec ces paramètres."""
+    context = build_context(params)
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def calibrate_bcrypt(target_seconds: float, min_rounds: int, max_rounds: int) -> HashParams:
+    # Le coût double à chaque round : une mesure au plancher suffit pour extrapoler
+    base = measure(HashParams("bcrypt", min_rounds))
+    extra = math.floor(math.log2(target_seconds / base)) if base < target_seconds else 0
+    rounds = max(min_rounds, min(max_rounds, min_rounds + extra))
+    params = HashParams("bcrypt", rounds)
+    return params._replace(measured_seconds=base if rounds == min_rounds else measure(params, samples=1))
+
+
+def calibrate_argon2(target_seconds: float, memory_kib: int, parallelism: int,
+                     min_time_cost: int, max_time_cost: int) -> HashParams:
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 nécessite le paquet argon2-cffi")
+
+    # Mémoire et parallélisme fixés ; le temps croît linéairement avec time_cost
+    base = measure(HashParams("argon2", min_time_cost, memory_kib, parallelism))
+    time_cost = max(min_time_cost, min(max_time_cost, math.floor(min_time_cost * target_seconds / base)))
+    params = HashParams("argon2", time_cost, memory_kib, parallelism)
+    return params._replace(measured_seconds=base if time_cost == min_time_cost else measure(params, samples=1))
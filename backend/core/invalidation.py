@@ -0,0 +1,159 @@
+import asyncio
+import json
+import uuid
+from typing import Callable, Optional
+
+from backend.core.metrics import registry
+from backend.settings import settings
+
+
+# ============================
+# 📣 BUS D'INVALIDATION ENTRE WORKERS (POSTGRES LISTEN/NOTIFY)
+# ============================
+# Chaque worker garde des caches en mémoire (utilisateurs, table des permissions,
+# organisation). Une invalidation locale est aussi publiée par NOTIFY ; tous les
+# workers écoutent le canal et évincent les entrées correspondantes.
+#
+# Délai de convergence borné :
+#   - en fonctionnement normal, la durée d'un aller-retour NOTIFY (quelques ms) ;
+#   - si la connexion d'écoute tombe ou ne répond plus (sondée toutes les
+#     invalidation_keepalive_seconds), tous les caches locaux sont vidés à la
+#     reconnexion, puisque des messages ont pu être perdus.
+#
+# Remplissage d'un cache après un défaut, mêmes règles partout :
+#   - lecture sur la base principale (PRIMARY) : une réplique en retard
+#     remettrait en cache une valeur déjà invalidée (permission retirée, token
+#     révoqué, organisation modifiée) ;
+#   - compteur de version relevé avant la lecture et comparé avant l'écriture :
+#     une invalidation reçue pendant la requête rend le résultat obsolète, il
+#     est alors retourné sans être mis en cache.
+
+CHANNEL = "elstudio_invalidation"
+MAX_IDS_PER_MESSAGE = 500  # NOTIFY limite la charge utile à 8000 octets
+ALL = "all"
+
+invalidation_messages = registry.counter(
+    "elstudio_invalidation_messages_total", "Messages du bus d'invalidation", ("direction",))
+
+
+class InvalidationBus:
+    def __init__(self):
+        self.instance_id = uuid.uuid4().hex
+        self._handlers: dict[str, Callable[[Optional[list]], None]] = {}
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.connected = asyncio.Event()
+
+    def register(self, kind: str, handler: Callable[[Optional[list]], None]):
+        """`handler(ids)` évince localement ; ids=None signifie « tout le cache »."""
+        self._handlers[kind] = handler
+
+    def publish(self, kind: str, ids: Optional[list] = None):
+        """Non bloquant : appelé après le commit par les fonctions d'invalidation locales."""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((kind, list(ids) if ids is not None else None))
+        except asyncio.QueueFull:
+            # Trop de retard : un seul message « tout invalider » remplace le détail
+            self._drain()
+            self._queue.put_nowait((ALL, None))
+
+    def start(self, engine):
+        if self._task is not None or not settings.invalidation_bus_enabled:
+            return
+        # Un seul processus avec SQLite : rien à diffuser
+        if engine.dialect.name != "postgresql" or engine.dialect.driver != "asyncpg":
+            return
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._queue = asyncio.Queue(maxsize=settings.invalidation_queue_size)
+        self._task = asyncio.create_task(self._run(dsn))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+
+    def _drain(self):
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    def _apply(self, kind: str, ids: Optional[list]):
+        if kind == ALL:
+            for handler in self._handlers.values():
+                handler(None)
+            return
+        handler = self._handlers.get(kind)
+        if handler is not None:
+            handler(ids)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") == self.instance_id:
+            return  # déjà appliqué localement avant la publication
+        invalidation_messages.inc("received")
+        self._apply(message.get("kind"), message.get("ids"))
+
+    async def _send(self, connection, kind: str, ids: Optional[list]):
+        chunks = [None] if ids is None else [
+            ids[i:i + MAX_IDS_PER_MESSAGE] for i in range(0, len(ids), MAX_IDS_PER_MESSAGE)
+        ]
+        for chunk in chunks:
+            payload = json.dumps({"origin": self.instance_id, "kind": kind, "ids": chunk})
+            await connection.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+            invalidation_messages.inc("published")
+
+    async def _run(self, dsn: str):
+        import asyncpg
+
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(CHANNEL, self._on_notify)
+                # Messages peut-être manqués pendant la déconnexion : on repart de zéro
+                self._apply(ALL, None)
+                self.connected.set()
+                delay = 1.0
+
+                while True:
+                    try:
+                        kind, ids = await asyncio.wait_for(
+                            self._queue.get(), timeout=settings.invalidation_keepalive_seconds
+                        )
+                    except asyncio.TimeoutError:
+                        # Connexion d'écoute silencieuse : on vérifie qu'elle répond encore
+                        await asyncio.wait_for(connection.fetchval("SELECT 1"), timeout=5)
+                        continue
+                    try:
+                        await self._send(connection, kind, ids)
+                    except Exception:
+                        self.publish(kind, ids)  # renvoyé après reconnexion
+                        raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("❌ Bus d'invalidation déconnecté :", e)
+                self.connected.clear()
+                self._apply(ALL, None)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                if connection is not None:
+                    try:
+                        await asyncio.wait_for(connection.close(), timeout=5)
+                    except Exception:
+                        connection.terminate()
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import time
+import urllib.request
+from typing import Callable, Optional
+
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+
+
+# ============================
+# ✅ VÉRIFICATION DES JWT PAR JEU DE CLÉS PUBLIQUES (JWKS)
+# ============================
+# Utilisable par tout module ou service qui doit vérifier nos tokens sans
+# connaître de secret ni rappeler l'API : il suffit du JWKS publié sur
+# /.well-known/jwks.json. Les clés publiques sont analysées une seule fois
+# par kid ; le jeu de clés n'est relu que périodiquement ou quand un token
+# porte un kid inconnu (rotation), au plus une fois par min_refetch_interval.
+# decode() relit le jeu de clés dans le thread appelant (fetch bloquant) ; depuis
+# une boucle asyncio, decode_async() le relit dans un thread, une relecture à la fois.
+
+class KeySetVerifier:
+    def __init__(
+        self,
+        fetch: Callable[[], dict],
+        refresh_interval: float = 300.0,
+        min_refetch_interval: float = 10.0,
+    ):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self._keys: dict[str, tuple[str, Key]] = {}  # kid -> (algorithme, clé publique analysée)
+        self._fetched_at = float("-inf")
+        self._refresh_lock = asyncio.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 5.0, **options) -> "KeySetVerifier":
+        """Vérificateur alimenté par un JWKS distant (ex. https://api/.well-known/jwks.json)."""
+        def fetch():
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return json.load(response)
+        return cls(fetch, **options)
+
+    def refresh(self):
+        keys = {}
+        for entry in self.fetch().get("keys", []):
+            kid, algorithm = entry.get("kid"), entry.get("alg")
+            if not kid or not algorithm or entry.get("use", "sig") != "sig":
+                continue
+            cached = self._keys.get(kid)
+            keys[kid] = cached if cached is not None else (algorithm, jwk.construct(entry, algorithm))
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def _needs_refresh(self, kid: Optional[str]) -> bool:
+        age = time.monotonic() - self._fetched_at
+        return age >= self.refresh_interval or (kid not in self._keys and age >= self.min_refetch_interval)
+
+    def key_for(self, kid: Optional[str]) -> Optional[tuple[str, Key]]:
+        if self._needs_refresh(kid):
+            self.refresh()
+        return self._keys.get(kid)
+
+    async def key_for_async(self, kid: Optional[str]) -> Optional[tuple[str, Key]]:
+        if self._needs_refresh(kid):
+            async with self._refresh_lock:
+                # Une autre coroutine a pu relire le jeu de clés pendant l'attente
+                if self._needs_refresh(kid):
+                    await asyncio.to_thread(self.refresh)
+        return self._keys.get(kid)
+
+    def decode(self, token: str, **options) -> dict:
+        """Vérifie signature et expiration ; lève JWTError si le token n'est pas valide."""
+        kid = jwt.get_unverified_header(token).get("kid")
+        return self._verify(token, self.key_for(kid), options)
+
+    async def decode_async(self, token: str, **options) -> dict:
+        """Comme decode(), sans bloquer la boucle pendant une relecture du jeu de clés."""
+        kid = jwt.get_unverified_header(token).get("kid")
+        return self._verify(token, await self.key_for_async(kid), options)
+
+    def _verify(self, token: str, entry: Optional[tuple[str, Key]], options: dict) -> dict:
+        if entry is None:
+            raise JWTError("Clé de signature inconnue")
+        algorithm, key = entry
+        # Algorithme imposé par la clé, jamais par l'en-tête du token
+        return jwt.decode(token, key, algorithms=[algorithm], **options)
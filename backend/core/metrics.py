@@ -0,0 +1,239 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event
+
+
+# ============================
+# 📈 MÉTRIQUES (FORMAT TEXTE PROMETHEUS)
+# ============================
+# Registre minimal en mémoire : quelques compteurs et histogrammes à étiquettes,
+# rendus au format texte Prometheus par GET /metrics. Chaque observation coûte
+# une recherche dichotomique et quelques additions sous verrou : assez peu pour
+# rester activé en production.
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Response ajoute le charset
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # Par jeu d'étiquettes : [compteurs par seau (+Inf en dernier), somme]
+        self._series: dict[tuple, list] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for label_values, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}"
+
+
+class CallbackMetric:
+    """
+    Valeurs lues au moment de la collecte (taille d'un pool, compteurs d'un worker...).
+    `collect` renvoie des tuples (valeurs des étiquettes..., valeur).
+    """
+
+    def __init__(self, name: str, help_text: str, labels: tuple,
+                 collect: Callable[[], Iterable[tuple]], metric_type: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.metric_type}"
+        for *label_values, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labels, tuple(label_values))} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def callback(self, name: str, help_text: str, labels: tuple, collect,
+                 metric_type: str = "gauge") -> CallbackMetric:
+        metric = CallbackMetric(name, help_text, labels, collect, metric_type)
+        self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "elstudio_http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status"))
+http_duration = registry.histogram(
+    "elstudio_http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route"))
+request_statements = registry.histogram(
+    "elstudio_http_request_db_statements", "Requêtes SQL exécutées par requête HTTP", ("route",), COUNT_BUCKETS)
+request_db_time = registry.histogram(
+    "elstudio_http_request_db_seconds", "Temps passé en base par requête HTTP", ("route",))
+db_statement_duration = registry.histogram(
+    "elstudio_db_statement_duration_seconds", "Durée des requêtes SQL", ("engine",))
+pool_checkout_wait = registry.histogram(
+    "elstudio_db_pool_checkout_seconds", "Attente pour obtenir une connexion du pool (ouverture incluse)", ("engine",))
+password_hash_duration = registry.histogram(
+    "elstudio_password_hash_seconds", "Durée des calculs bcrypt, file d'attente incluse", ("operation",))
+password_hash_rejected = registry.counter(
+    "elstudio_password_hash_rejected_total", "Calculs bcrypt refusés (file pleine, réponse 503)")
+smtp_send_duration = registry.histogram(
+    "elstudio_smtp_send_seconds", "Durée d'envoi d'un message SMTP", ("outcome",))
+
+
+# ============================
+# ⏱️ STATISTIQUES PAR REQUÊTE HTTP
+# ============================
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+# Objet partagé entre le middleware et la tâche de l'endpoint (le contexte est copié,
+# pas l'objet) : les événements SQLAlchemy l'incrémentent directement
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def instrument_engine(async_engine, name: str):
+    """Compte les requêtes SQL et leur durée (globale et par requête HTTP)."""
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        db_statement_duration.observe(elapsed, name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+
+def route_label(scope) -> str:
+    """Gabarit de la route (ex. /users/{user_id}) pour borner le nombre de séries."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : durée, nombre de requêtes SQL et temps en base par route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = route_label(scope)
+            method = scope["method"]
+            http_requests.inc(method, route, status_code)
+            http_duration.observe(elapsed, method, route)
+            request_statements.observe(stats.statements, route)
+            request_db_time.observe(stats.db_seconds, route)
@@ -0,0 +1,92 @@
+import hashlib
+import json
+from typing import NamedTuple
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from backend.core.invalidation import invalidation_bus
+from backend.db.database import PRIMARY
+from backend.db.models import Organization
+
+# ================================
+# 🏢 CACHE DE L'ORGANISATION
+# ================================
+# La ligne Organization change rarement (PUT /organization) mais est lue à chaque
+# envoi d'e-mail : on en garde une copie détachée en mémoire.
+
+_cached_org: Organization | None = None
+_version = 0
+
+# Champs exposés publiquement (GET /organization) : jamais la configuration SMTP
+PUBLIC_FIELDS = ("id", "name", "logo_url")
+
+
+class PublicOrganization(NamedTuple):
+    version: int
+    body: bytes
+    etag: str
+
+
+_public_snapshot: PublicOrganization | None = None
+
+
+def _detached_copy(org: Organization) -> Organization:
+    # Copie transitoire, indépendante de toute session : partageable entre requêtes et threads
+    return Organization(**{attr.key: getattr(org, attr.key) for attr in inspect(Organization).column_attrs})
+
+
+async def get_cached_organization(db: AsyncSession) -> Organization | None:
+    """Retourne l'organisation (lecture seule), sans requête une fois en cache."""
+    global _cached_org
+    if _cached_org is not None:
+        return _cached_org
+
+    version = _version
+    # Même règle que les autres caches invalidables : lecture sur la base principale
+    result = await db.execute(select(Organization).limit(1).execution_options(**PRIMARY))
+    org = result.scalar_one_or_none()
+    if org is None:
+        return None
+
+    copy = _detached_copy(org)
+    if version == _version:
+        _cached_org = copy
+    return copy
+
+
+async def get_public_organization(db: AsyncSession) -> PublicOrganization | None:
+    """Vue publique sérialisée une seule fois par version, avec son ETag fort."""
+    global _public_snapshot
+    snapshot = _public_snapshot
+    if snapshot is not None and snapshot.version == _version:
+        return snapshot
+
+    version = _version
+    org = await get_cached_organization(db)
+    if org is None:
+        return None
+
+    body = json.dumps(
+        {field: getattr(org, field) for field in PUBLIC_FIELDS},
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+    snapshot = PublicOrganization(version, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+    if version == _version:
+        _public_snapshot = snapshot
+    return snapshot
+
+
+def _evict_organization(ids=None):
+    global _cached_org, _public_snapshot, _version
+    _version += 1
+    _cached_org = None
+    _public_snapshot = None
+
+
+invalidation_bus.register("organization", _evict_organization)
+
+
+def invalidate_organization():
+    """À appeler après toute modification de l'organisation (propagé aux autres workers)."""
+    _evict_organization()
+    invalidation_bus.publish("organization")
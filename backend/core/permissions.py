@@ -0,0 +1,119 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from backend.core.invalidation import invalidation_bus
+from backend.db.database import PRIMARY
+from backend.db.models import Role, role_permissions
+
+# ================================
+# 🔑 REGISTRE DES PERMISSIONS
+# ================================
+# Chaque permission reçoit un bit à l'enregistrement. Les modules métiers (RH,
+# comptabilité...) enregistrent les leurs au chargement ; en base, seules les
+# chaînes (ex. "users.read") sont stockées, jamais les positions de bits.
+
+SUPERUSER_ROLE = "super_admin"  # possède implicitement toutes les permissions
+
+
+class PermissionRegistry:
+    def __init__(self):
+        self._bits: dict[str, int] = {}
+        self._descriptions: dict[str, str] = {}
+
+    def register(self, code: str, description: str) -> str:
+        if code not in self._bits:
+            self._bits[code] = 1 << len(self._bits)
+            self._descriptions[code] = description
+        return code
+
+    def mask(self, codes) -> int:
+        mask = 0
+        for code in codes:
+            bit = self._bits.get(code)
+            if bit is None:
+                raise KeyError(f"Permission inconnue : {code}")
+            mask |= bit
+        return mask
+
+    def codes(self, mask: int) -> list[str]:
+        return [code for code, bit in self._bits.items() if mask & bit]
+
+    @property
+    def all_mask(self) -> int:
+        return (1 << len(self._bits)) - 1
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._bits
+
+    def items(self) -> list[dict]:
+        return [{"code": code, "description": self._descriptions[code]} for code in self._bits]
+
+
+permissions = PermissionRegistry()
+
+USERS_READ = permissions.register("users.read", "Consulter les utilisateurs")
+USERS_WRITE = permissions.register("users.write", "Créer, modifier et réactiver des utilisateurs")
+USERS_DELETE = permissions.register("users.delete", "Supprimer définitivement des utilisateurs")
+USERS_EXPORT = permissions.register("users.export", "Exporter l'annuaire des utilisateurs")
+ROLES_MANAGE = permissions.register("roles.manage", "Gérer les rôles, leurs membres et leurs permissions")
+ORGANIZATION_MANAGE = permissions.register("organization.manage", "Modifier l'organisation et sa configuration SMTP")
+SYSTEM_STATS = permissions.register("system.stats", "Consulter les statistiques internes")
+AUDIT_READ = permissions.register("audit.read", "Consulter le journal d'audit")
+
+
+# ================================
+# 🧮 TABLE COMPILÉE RÔLE -> BITSET
+# ================================
+
+class RolePermissionTable:
+    """
+    Table en mémoire : nom de rôle -> bitset des permissions.
+    Reconstruite uniquement après une modification des rôles ou de leurs
+    permissions ; une vérification coûte ensuite un OU par rôle et un ET.
+    """
+
+    def __init__(self):
+        self._masks: dict[str, int] | None = None
+        self._version = 0
+
+    async def load(self, db: AsyncSession) -> dict[str, int]:
+        version = self._version
+        # Relue sur la base principale (voir core/invalidation.py)
+        result = await db.execute(
+            select(Role.name, role_permissions.c.permission)
+            .outerjoin(role_permissions, role_permissions.c.role_id == Role.id)
+            .execution_options(**PRIMARY)
+        )
+
+        masks: dict[str, int] = {}
+        for role_name, code in result.all():
+            mask = masks.setdefault(role_name, 0)
+            # Permission retirée du code mais encore en base : ignorée
+            if code is not None and code in permissions:
+                masks[role_name] = mask | permissions.mask([code])
+        masks[SUPERUSER_ROLE] = permissions.all_mask
+
+        if version == self._version:
+            self._masks = masks
+        return masks
+
+    async def mask_for(self, db: AsyncSession, role_names) -> int:
+        masks = self._masks
+        if masks is None:
+            masks = await self.load(db)
+        mask = 0
+        for name in role_names:
+            mask |= masks.get(name, 0)
+        return mask
+
+    def invalidate(self):
+        """À appeler après toute modification des rôles ou de leurs permissions."""
+        self._evict()
+        invalidation_bus.publish("permissions")
+
+    def _evict(self, ids=None):
+        self._version += 1
+        self._masks = None
+
+
+permission_table = RolePermissionTable()
+invalidation_bus.register("permissions", permission_table._evict)
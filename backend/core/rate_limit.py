@@ -0,0 +1,131 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from backend.core.metrics import registry
+from backend.settings import settings
+
+
+# ============================
+# 🚦 LIMITATION DE DÉBIT (SEAU À JETONS)
+# ============================
+# Chaque client (IP) et chaque adresse e-mail visée dispose d'un seau de `burst`
+# jetons, rechargé de `per_minute` jetons par minute. Une requête consomme un
+# jeton ; seau vide → 429, avant toute requête SQL ou tout calcul bcrypt.
+
+rate_limit_rejected = registry.counter(
+    "elstudio_rate_limit_rejected_total", "Requêtes refusées par le limiteur de débit", ("endpoint", "key"))
+
+
+class RateLimitBackend(ABC):
+    """
+    Stockage des seaux. Un backend partagé entre workers (ex. Redis via un script
+    Lua) doit rendre `take` atomique pour une même clé.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, burst: int, rate_per_second: float) -> float:
+        """Consomme un jeton ; retourne 0 si accepté, sinon le délai (s) avant le prochain jeton."""
+
+
+def _refill(state: Optional[tuple], now: float, burst: int, rate: float) -> tuple[float, float]:
+    """Nouvel état (jetons, horodatage) après consommation éventuelle, et délai d'attente."""
+    tokens = burst if state is None else min(burst, state[0] + (now - state[1]) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Seaux propres au processus (un worker = un jeu de seaux), bornés en nombre de clés."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, burst: int, rate_per_second: float) -> float:
+        # Aucun await ici : l'opération est atomique pour la boucle d'événements
+        state, wait = _refill(self._buckets.get(key), time.monotonic(), burst, rate_per_second)
+        self._buckets[key] = state
+        self._buckets.move_to_end(key)
+        # Un seau évincé repart plein : on ne perd que de la sévérité, jamais de la disponibilité
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class LocalSharedRateLimitBackend(RateLimitBackend):
+    """
+    Doublure locale d'un backend partagé : même contrat qu'un stockage distant
+    (horloge murale, expiration des clés, accès sérialisé), mais en mémoire.
+    Plusieurs limiteurs peuvent partager une même instance pour simuler plusieurs workers.
+    """
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[tuple[float, float], float]] = {}
+        self._lock = asyncio.Lock()
+
+    async def take(self, key: str, burst: int, rate_per_second: float) -> float:
+        async with self._lock:
+            now = time.time()
+            entry = self._buckets.get(key)
+            # Comme un EXPIRE côté serveur : un seau plein n'a plus besoin d'être stocké
+            if entry is not None and entry[1] <= now:
+                entry = None
+            state, wait = _refill(entry[0] if entry else None, now, burst, rate_per_second)
+            self._buckets[key] = (state, now + burst / rate_per_second)
+            return wait
+
+
+def _create_backend(name: str) -> RateLimitBackend:
+    if name == "memory":
+        return InMemoryRateLimitBackend(settings.rate_limit_max_keys)
+    if name == "local_shared":
+        return LocalSharedRateLimitBackend()
+    raise ValueError(f"Backend de limitation inconnu : {name}")
+
+
+_backend: RateLimitBackend = _create_backend(settings.rate_limit_backend)
+
+
+def set_rate_limit_backend(backend: RateLimitBackend):
+    """Branche un autre backend (ex. partagé entre workers) au démarrage."""
+    global _backend
+    _backend = backend
+
+
+def client_ip(request: Request) -> str:
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def _check(endpoint: str, kind: str, value: str, burst: int, per_minute: float):
+    wait = await _backend.take(f"{endpoint}:{kind}:{value}", burst, per_minute / 60)
+    if wait > 0:
+        rate_limit_rejected.inc(endpoint, kind)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de tentatives, veuillez réessayer plus tard",
+            headers={"Retry-After": str(max(1, int(wait + 0.999)))},
+        )
+
+
+async def enforce_rate_limit(endpoint: str, request: Request, email: Optional[str] = None):
+    """
+    À appeler en tout début d'endpoint : seau par IP, puis par e-mail visé si fourni.
+    Lève une 429 (avec Retry-After) si l'un des deux est vide.
+    """
+    if not settings.rate_limit_enabled:
+        return
+    await _check(endpoint, "ip", client_ip(request),
+                 settings.rate_limit_ip_burst, settings.rate_limit_ip_per_minute)
+    if email:
+        await _check(endpoint, "email", email.strip().lower(),
+                     settings.rate_limit_email_burst, settings.rate_limit_email_per_minute)
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from backend.core.metrics import registry
+from backend.db.database import SessionLocal
+from backend.db.models import RefreshToken, User
+from backend.settings import settings
+
+
+# ============================
+# 🔄 JETONS DE RAFRAÎCHISSEMENT (ROTATION)
+# ============================
+# /auth/login émet un jeton opaque (256 bits aléatoires) en plus du JWT. POST
+# /auth/refresh l'échange contre un nouveau JWT et un nouveau jeton : une
+# recherche par index unique sur son empreinte SHA-256, sans bcrypt. Le jeton
+# présenté est consommé ; s'il revient (copie volée, ou client qui rejoue un
+# ancien jeton), toute la famille issue de la même connexion est révoquée.
+# Un changement de users.token_version (mot de passe, rôles, désactivation)
+# invalide aussi les jetons déjà émis.
+
+refresh_tokens_total = registry.counter(
+    "elstudio_refresh_tokens_total", "Jetons de rafraîchissement par issue", ("outcome",))
+
+
+class RefreshResult(NamedTuple):
+    outcome: str  # "rotated" | "invalid" | "reused"
+    user: Optional[User] = None
+    token: Optional[str] = None  # nouveau jeton en clair (rotated)
+    family_id: Optional[str] = None
+
+
+def hash_refresh_token(token: str) -> str:
+    # Jeton aléatoire de 256 bits : une empreinte rapide suffit, pas besoin de bcrypt
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: AsyncSession, user: User, family_id: Optional[str] = None) -> str:
+    """Ajoute un jeton à la session (écrit au prochain commit) et renvoie sa valeur en clair."""
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    db.add(RefreshToken(
+        user_id=user.id,
+        family_id=family_id or uuid.uuid4().hex,
+        token_hash=hash_refresh_token(token),
+        token_version=user.token_version or 0,
+        created_at=now,
+        expires_at=now + timedelta(days=settings.refresh_token_expire_days),
+    ))
+    refresh_tokens_total.inc("issued")
+    return token
+
+
+async def revoke_refresh_family(db: AsyncSession, family_id: str, now: datetime):
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> RefreshResult:
+    """
+    Consomme le jeton et en émet un nouveau dans la même famille (commit à la charge
+    de l'appelant). Réutilisation détectée : la famille est révoquée et committée.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(RefreshToken, User)
+        .join(User, User.id == RefreshToken.user_id)
+        .options(joinedload(User.roles))
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+    )
+    row = result.unique().first()
+    if row is None:
+        refresh_tokens_total.inc("invalid")
+        return RefreshResult("invalid")
+
+    stored, user = row
+    if stored.revoked_at is not None or stored.expires_at <= now or stored.token_version != (user.token_version or 0):
+        refresh_tokens_total.inc("invalid")
+        return RefreshResult("invalid")
+
+    # Consommation conditionnelle : de deux requêtes concurrentes avec le même jeton,
+    # une seule le consomme, l'autre est traitée comme une réutilisation
+    consumed = None
+    if stored.used_at is None:
+        consumed = (await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == stored.id, RefreshToken.used_at.is_(None))
+            .values(used_at=now)
+            .returning(RefreshToken.id)
+            .execution_options(synchronize_session=False)
+        )).first()
+
+    if consumed is None:
+        await revoke_refresh_family(db, stored.family_id, now)
+        await db.commit()
+        refresh_tokens_total.inc("reused")
+        return RefreshResult("reused", user=user, family_id=stored.family_id)
+
+    refresh_tokens_total.inc("rotated")
+    return RefreshResult("rotated", user=user, token=issue_refresh_token(db, user, stored.family_id),
+                         family_id=stored.family_id)
+
+
+async def prune_expired_refresh_tokens(db: AsyncSession, now: datetime, batch_size: int) -> int:
+    """Supprime au plus batch_size jetons expirés (transactions courtes) ; renvoie le nombre supprimé."""
+    expired = select(RefreshToken.id).where(RefreshToken.expires_at < now).limit(batch_size)
+    result = await db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.id.in_(expired.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+# ============================
+# 🧹 PURGE PÉRIODIQUE DES JETONS EXPIRÉS
+# ============================
+
+class RefreshTokenPruner:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        interval: float = settings.refresh_token_prune_interval_seconds,
+        batch_size: int = settings.refresh_token_prune_batch_size,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self.pruned = 0
+        self.last_run: Optional[datetime] = None
+        self._wake = asyncio.Event()  # arrêt demandé
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    # -- Cycle de vie
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wake.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                await self.prune_once()
+            except Exception as e:
+                print("❌ Erreur de purge des jetons de rafraîchissement:", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def prune_once(self) -> int:
+        total = 0
+        async with self.session_factory() as db:
+            while not self._stopping:
+                deleted = await prune_expired_refresh_tokens(db, datetime.utcnow(), self.batch_size)
+                total += deleted
+                if deleted < self.batch_size:
+                    break
+        self.pruned += total
+        self.last_run = datetime.utcnow()
+        if total:
+            refresh_tokens_total.inc("pruned", amount=total)
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "pruned": self.pruned,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+        }
+
+
+refresh_token_pruner = RefreshTokenPruner()
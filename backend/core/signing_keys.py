@@ -0,0 +1,200 @@
+"""
+Clés de signature des JWT (asymétriques, avec rotation).
+
+Chaque clé privée est un fichier PEM `<kid>.pem` dans settings.jwt_keys_dir,
+partagé par tous les workers. Le kid commence par la date de création : la clé
+la plus récente signe, les autres restent publiées (GET /.well-known/jwks.json)
+pour vérifier les tokens déjà émis, jusqu'à leur retrait.
+
+Usage (depuis la racine du dépôt) :
+    python -m backend.core.signing_keys --list
+    python -m backend.core.signing_keys --rotate   # nouvelle clé active, retrait des clés périmées
+"""
+import argparse
+import hashlib
+import json
+import os
+import secrets
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from jose.backends.base import Key
+
+from backend.settings import settings
+
+SUPPORTED_ALGORITHMS = ("RS256", "ES256")
+KID_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class SigningKey(NamedTuple):
+    kid: str
+    algorithm: str
+    private_key: Key  # analysée une seule fois : signer ne relit pas le PEM
+    public_jwk: dict
+    created_at: datetime
+
+
+class KeySetDocument(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def algorithm_of(private_key) -> str:
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return "RS256"
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and private_key.curve.name == "secp256r1":
+        return "ES256"
+    raise ValueError(f"Type de clé non pris en charge : {type(private_key).__name__}")
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=settings.jwt_rsa_key_size)
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    raise ValueError(f"Algorithme de signature non pris en charge : {algorithm} ({', '.join(SUPPORTED_ALGORITHMS)})")
+
+
+def write_new_key(directory: Path, algorithm: str, now: Optional[datetime] = None) -> str:
+    """Crée une clé privée `<kid>.pem` (lisible par le seul propriétaire) ; renvoie son kid."""
+    now = now or datetime.utcnow()
+    kid = f"{now:{KID_TIME_FORMAT}}-{secrets.token_hex(3)}"
+    pem = generate_private_key(algorithm).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    )
+    directory.mkdir(parents=True, exist_ok=True)
+    # Écrit sous un nom temporaire puis renommé : un worker ne lit jamais un fichier incomplet
+    temporary = directory / f".{kid}.tmp"
+    fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(pem)
+    os.replace(temporary, directory / f"{kid}.pem")
+    return kid
+
+
+def load_key(path: Path) -> SigningKey:
+    pem = path.read_bytes()
+    algorithm = algorithm_of(serialization.load_pem_private_key(pem, password=None))
+    private_key = jwk.construct(pem, algorithm)
+    kid = path.stem
+    return SigningKey(
+        kid=kid,
+        algorithm=algorithm,
+        private_key=private_key,
+        public_jwk={**private_key.public_key().to_dict(), "kid": kid, "use": "sig"},
+        created_at=datetime.strptime(kid.split("-", 1)[0], KID_TIME_FORMAT),
+    )
+
+
+# ============================
+# 🔑 TROUSSEAU DE CLÉS (PAR WORKER)
+# ============================
+
+class KeyRing:
+    """
+    Clés chargées depuis le répertoire partagé. Le répertoire est relu au plus
+    toutes les reload_interval secondes (ou à la demande, kid inconnu) : une
+    rotation faite par un autre processus est prise en compte sans redémarrage.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.jwt_keys_dir,
+        algorithm: str = settings.jwt_algorithm,
+        reload_interval: float = settings.jwt_keys_reload_seconds,
+    ):
+        self.directory = Path(directory)
+        self.algorithm = algorithm
+        self.reload_interval = reload_interval
+        self._keys: dict[str, SigningKey] = {}  # kid -> clé, du plus ancien au plus récent
+        self._document: KeySetDocument | None = None
+        self._checked_at = float("-inf")
+
+    def load(self, create_if_missing: bool = False):
+        """Relit le répertoire : les fichiers déjà analysés ne le sont pas à nouveau."""
+        paths = sorted(self.directory.glob("*.pem")) if self.directory.is_dir() else []
+        if not paths and create_if_missing:
+            print(f"🔑 Aucune clé de signature dans {self.directory} : génération d'une clé {self.algorithm}")
+            write_new_key(self.directory, self.algorithm)
+            paths = sorted(self.directory.glob("*.pem"))
+
+        keys = {}
+        for path in paths:
+            keys[path.stem] = self._keys.get(path.stem) or load_key(path)
+        if list(keys) != list(self._keys):
+            self._keys = keys
+            self._document = None
+        self._checked_at = time.monotonic()
+
+    def refresh(self, force: bool = False):
+        if force or time.monotonic() - self._checked_at >= self.reload_interval:
+            self.load()
+
+    @property
+    def keys(self) -> list[SigningKey]:
+        return list(self._keys.values())
+
+    @property
+    def active(self) -> SigningKey:
+        """Clé de signature courante (la plus récente)."""
+        self.refresh()
+        if not self._keys:
+            self.load(create_if_missing=True)
+        return next(reversed(self._keys.values()))
+
+    def jwks(self, refresh: bool = False) -> dict:
+        self.refresh(force=refresh)
+        return {"keys": [key.public_jwk for key in self._keys.values()]}
+
+    def document(self) -> KeySetDocument:
+        """JWKS sérialisé une seule fois par jeu de clés, avec son ETag fort."""
+        self.refresh()
+        document = self._document
+        if document is None:
+            body = json.dumps({"keys": [key.public_jwk for key in self._keys.values()]},
+                              separators=(",", ":")).encode("utf-8")
+            document = self._document = KeySetDocument(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        return document
+
+    def rotate(self, now: Optional[datetime] = None) -> tuple[str, list[str]]:
+        """
+        Crée la nouvelle clé active et retire les clés remplacées depuis plus de
+        jwt_key_retirement_minutes (aucun token encore valide ne peut en dépendre).
+        """
+        now = now or datetime.utcnow()
+        self.load()
+        kid = write_new_key(self.directory, self.algorithm, now)
+
+        retired = []
+        cutoff = now - timedelta(minutes=settings.jwt_key_retirement_minutes)
+        keys = list(self._keys.values())
+        for key, successor in zip(keys, keys[1:]):
+            if successor.created_at <= cutoff:
+                (self.directory / f"{key.kid}.pem").unlink(missing_ok=True)
+                retired.append(key.kid)
+        self.load()
+        return kid, retired
+
+
+keyring = KeyRing()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clés de signature des JWT")
+    parser.add_argument("--rotate", action="store_true", help="crée une nouvelle clé active")
+    parser.add_argument("--list", action="store_true", help="liste les clés publiées")
+    args = parser.parse_args()
+    if args.rotate:
+        kid, retired = keyring.rotate()
+        print(f"✔ Nouvelle clé active : {kid}")
+        for old in retired:
+            print(f"✔ Clé retirée : {old}")
+    else:
+        keyring.load()
+        for key in keyring.keys:
+            print(f"{key.kid}  {key.algorithm}  créée le {key.created_at:%Y-%m-%d %H:%M:%S}")
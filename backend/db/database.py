@@ -1,12 +1,115 @@
+import time
+from fastapi import Depends
+from sqlalchemy import Select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from backend.core.metrics import registry, instrument_engine, pool_checkout_wait
 from backend.settings import settings
 
 DATABASE_URL = settings.database_url
+DATABASE_REPLICA_URL = settings.database_replica_url
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool qui mesure l'attente de chaque checkout (métrique elstudio_db_pool_checkout_seconds)."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            # pool_logging_name sert d'étiquette ("primary" / "replica") et survit à recreate()
+            pool_checkout_wait.observe(time.perf_counter() - started, getattr(self, "logging_name", "primary"))
+
+def engine_options(url: str, metrics_name: str = "primary") -> dict:
+    """Paramètres du moteur (pool, cache de requêtes préparées) issus des settings."""
+    options = {"echo": settings.database_echo}
+    if url.startswith("sqlite"):
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_logging_name=metrics_name,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+        pool_pre_ping=settings.database_pool_pre_ping,
+    )
+    if "+asyncpg" in url:
+        options["connect_args"] = {"prepared_statement_cache_size": settings.database_statement_cache_size}
+    return options
+
+engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+instrument_engine(engine, "primary")
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
-async def get_db():
-    async with SessionLocal() as session:
-        yield session
\ No newline at end of file
+# Réplique en lecture : à défaut, les lectures passent par la base principale
+read_engine = (
+    create_async_engine(DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL, "replica"))
+    if DATABASE_REPLICA_URL else engine
+)
+if read_engine is not engine:
+    instrument_engine(read_engine, "replica")
+ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
+
+def _pool_stats():
+    engines = {"primary": engine, "replica": read_engine} if read_engine is not engine else {"primary": engine}
+    for name, async_engine in engines.items():
+        pool = async_engine.sync_engine.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            yield name, "size", pool.size()
+            yield name, "checked_out", pool.checkedout()
+            yield name, "idle", pool.checkedin()
+            yield name, "overflow", max(pool.overflow(), 0)
+
+registry.callback("elstudio_db_pool_connections", "État du pool de connexions", ("engine", "state"), _pool_stats)
+
+# ================================
+# 🔄 UNE SESSION PAR REQUÊTE HTTP
+# ================================
+# get_db, get_read_db et toutes les dépendances (authentification, permissions)
+# reçoivent la même session : un seul objet User par identité, une seule
+# connexion empruntée au pool par requête (sauf lectures envoyées à la réplique).
+
+# Option d'exécution forçant la base principale (ex. vérification de révocation des tokens)
+PRIMARY = {"primary": True}
+
+class RoutingSession(Session):
+    """
+    Les SELECT d'un endpoint en lecture seule (get_read_db) partent vers la réplique
+    si elle est configurée ; écritures, flush et requêtes marquées PRIMARY restent
+    sur la base principale.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            read_engine is not engine
+            and self.info.get("read_only")
+            and not self._flushing
+            and isinstance(clause, Select)
+            and not clause.get_execution_options().get("primary")
+        ):
+            return read_engine.sync_engine
+        return engine.sync_engine
+
+RequestSessionLocal = sessionmaker(class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False)
+
+async def request_session():
+    # Résolue une seule fois par requête : FastAPI met en cache le résultat d'une dépendance
+    async with RequestSessionLocal() as session:
+        yield session
+
+async def get_db(session: AsyncSession = Depends(request_session)):
+    yield session
+
+async def get_read_db(session: AsyncSession = Depends(request_session)):
+    """Session de la requête, lectures vers la réplique si configurée (endpoints GET)."""
+    session.sync_session.info["read_only"] = True
+    yield session
+
+def insert_or_ignore(db: AsyncSession, table):
+    """INSERT ... ON CONFLICT DO NOTHING (PostgreSQL et SQLite)."""
+    dialect = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    return dialect.insert(table).on_conflict_do_nothing()
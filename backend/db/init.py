@@ -1,14 +1,23 @@
 import asyncio
-from db.database import engine, SessionLocal
-from db.models import Base, User
-from core.auth import hash_password
+from sqlalchemy.future import select
+from backend.db.database import engine, SessionLocal
+from backend.db.migrations import migrate
+from backend.db.models import User
+from backend.core.auth import hash_password
 
 async def init():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Schéma : tables, colonnes, contraintes et index (migrations versionnées)
+    await migrate(engine)
 
     async with SessionLocal() as session:
+        result = await session.execute(select(User).where(User.email == "admin@admin.com"))
+        if result.scalar_one_or_none():
+            print("✔ Utilisateur admin déjà présent")
+            return
+
         user = User(
+            first_name="Admin",
+            last_name="ElStudio",
             email="admin@admin.com",
             hashed_password=hash_password("admin123")
         )
@@ -0,0 +1,360 @@
+"""
+Migrations versionnées du schéma.
+
+Chaque migration est appliquée une seule fois et enregistrée dans la table
+`schema_migrations`. Les migrations « non transactionnelles » s'exécutent en
+AUTOCOMMIT : c'est obligatoire pour CREATE INDEX CONCURRENTLY, qui construit
+l'index sans bloquer les écritures sur la table.
+
+Usage :
+    python -m backend.db.migrations            # applique les migrations en attente
+    python -m backend.db.migrations --status   # liste l'état des migrations
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Callable, NamedTuple, Union
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, insert, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from backend.db.database import engine
+from backend.db.models import Base, EmailOutbox, audit_metadata
+
+Step = Union[str, Callable[[AsyncConnection], object]]
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: list[Step]
+    transactional: bool = True
+    dialects: tuple[str, ...] = ("postgresql",)
+
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+async def _create_all(conn: AsyncConnection):
+    await conn.run_sync(Base.metadata.create_all)
+
+
+def _drop_invalid_index(name: str) -> str:
+    # Un CREATE INDEX CONCURRENTLY interrompu laisse un index INVALID qu'IF NOT EXISTS ignorerait
+    return f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = '{name}' AND NOT i.indisvalid
+            ) THEN
+                EXECUTE 'DROP INDEX {name}';
+            END IF;
+        END $$;
+    """
+
+
+async def _has_primary_key(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'p'"),
+        {"table": table},
+    )
+    return result.first() is not None
+
+
+async def _create_user_roles_unique_index(conn: AsyncConnection):
+    # CONCURRENTLY est interdit dans un bloc DO : la condition est évaluée ici
+    if not await _has_primary_key(conn, "user_roles"):
+        await conn.execute(text(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS user_roles_pkey ON user_roles (user_id, role_id)"
+        ))
+
+
+async def _check_email_case_duplicates(conn: AsyncConnection):
+    # L'ancien contrôle d'unicité respectait la casse : « Bob@x » et « bob@x » ont pu coexister.
+    # Sans cette vérification, l'index unique échouerait en laissant un index INVALID, à
+    # chaque démarrage ; les doublons sont à fusionner ou renommer à la main.
+    result = await conn.execute(text(
+        "SELECT lower(email) AS email_key, string_agg(id || ' ' || email, ', ' ORDER BY id) AS users "
+        "FROM users GROUP BY lower(email) HAVING count(*) > 1 ORDER BY lower(email)"
+    ))
+    duplicates = result.all()
+    if duplicates:
+        lines = "\n".join(f"  - {row.email_key} : {row.users}" for row in duplicates)
+        raise RuntimeError(
+            f"Migration 6 impossible : {len(duplicates)} adresse(s) e-mail en double à la casse près "
+            f"(id email). Corrigez ces comptes puis relancez les migrations :\n{lines}"
+        )
+
+
+SEARCH_TRGM_INDEX = "ix_users_search_trgm"
+SEARCH_PREFIX_INDEXES = {"ix_users_first_name_lower": "first_name", "ix_users_last_name_lower": "last_name"}
+
+
+async def _create_search_indexes(conn: AsyncConnection):
+    if conn.dialect.name == "sqlite":
+        for name, column in SEARCH_PREFIX_INDEXES.items():
+            await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON users (lower({column}))"))
+        return
+
+    for name, column in SEARCH_PREFIX_INDEXES.items():
+        await conn.execute(text(_drop_invalid_index(name)))
+        await conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON users (lower({column}) text_pattern_ops)"
+        ))
+
+    # pg_trgm est une extension « contrib » : absente de certaines installations.
+    # Sans elle, /users/search reste sur le chemin par préfixe ; la migration peut
+    # être rejouée à la main après installation (DELETE FROM schema_migrations WHERE version = 8)
+    available = await conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"))
+    if available.first() is None:
+        print("⚠ pg_trgm indisponible : recherche d'utilisateurs limitée aux préfixes")
+        return
+    await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    await conn.execute(text(_drop_invalid_index(SEARCH_TRGM_INDEX)))
+    await conn.execute(text(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {SEARCH_TRGM_INDEX} ON users "
+        "USING gin ((lower(first_name || ' ' || last_name || ' ' || email)) gin_trgm_ops)"
+    ))
+
+
+SEARCH_SORT_INDEX = "ix_users_search_sort"
+
+
+async def _create_search_sort_index(conn: AsyncConnection):
+    # Clé de tri de la recherche par préfixes, en ordre octet comme les intervalles de préfixe
+    if conn.dialect.name == "sqlite":
+        await conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_SORT_INDEX} ON users (lower(last_name), lower(first_name), id)"
+        ))
+        return
+
+    await conn.execute(text(_drop_invalid_index(SEARCH_SORT_INDEX)))
+    await conn.execute(text(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {SEARCH_SORT_INDEX} ON users "
+        '(lower(last_name) COLLATE "C", lower(first_name) COLLATE "C", id)'
+    ))
+
+
+async def _create_audit_log(conn: AsyncConnection):
+    if conn.dialect.name == "sqlite":
+        await conn.run_sync(audit_metadata.create_all)
+        return
+
+    # Table mère partitionnée par mois : la clé primaire doit inclure la clé de partition.
+    # Les partitions mensuelles sont créées à l'avance par le journal (core/audit.py) ;
+    # la partition par défaut ne sert que de filet si l'une d'elles manque.
+    for statement in [
+        "CREATE SEQUENCE IF NOT EXISTS audit_log_id_seq",
+        """
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id BIGINT NOT NULL DEFAULT nextval('audit_log_id_seq'),
+            occurred_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            actor_id INTEGER,
+            action VARCHAR NOT NULL,
+            target_type VARCHAR,
+            target_id VARCHAR,
+            ip VARCHAR,
+            details JSONB,
+            PRIMARY KEY (id, occurred_at)
+        ) PARTITION BY RANGE (occurred_at)
+        """,
+        "ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id",
+        "CREATE INDEX IF NOT EXISTS ix_audit_log_occurred_at_id ON audit_log (occurred_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_audit_log_actor_occurred_at ON audit_log (actor_id, occurred_at)",
+        "CREATE INDEX IF NOT EXISTS ix_audit_log_target_occurred_at ON audit_log (target_type, target_id, occurred_at)",
+        "CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT",
+    ]:
+        await conn.execute(text(statement))
+
+
+async def _clear_finished_email_bodies(conn: AsyncConnection):
+    if conn.dialect.name == "sqlite":
+        # SQLite ne sait pas retirer un NOT NULL : la table est reconstruite depuis le modèle
+        columns = (await conn.execute(text("PRAGMA table_info(email_outbox)"))).mappings().all()
+        if any(column["name"] == "html_body" and column["notnull"] for column in columns):
+            names = ", ".join(column["name"] for column in columns)
+            await conn.execute(text("DROP INDEX IF EXISTS ix_email_outbox_status_next_attempt"))
+            await conn.execute(text("ALTER TABLE email_outbox RENAME TO email_outbox_old"))
+            await conn.run_sync(lambda sync_conn: EmailOutbox.__table__.create(sync_conn))
+            await conn.execute(text(f"INSERT INTO email_outbox ({names}) SELECT {names} FROM email_outbox_old"))
+            await conn.execute(text("DROP TABLE email_outbox_old"))
+    else:
+        await conn.execute(text("ALTER TABLE email_outbox ALTER COLUMN html_body DROP NOT NULL"))
+
+    await conn.execute(text(
+        "UPDATE email_outbox SET html_body = NULL, text_body = NULL WHERE status IN ('sent', 'failed')"
+    ))
+
+
+# ================================
+# 📜 LISTE DES MIGRATIONS (ordre croissant, ne jamais modifier une migration publiée)
+# ================================
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        1, "Schéma initial (tables manquantes)",
+        [_create_all],
+        dialects=("postgresql", "sqlite"),
+    ),
+    Migration(
+        2, "Colonnes users.token_version et email_outbox.text_body",
+        [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS text_body TEXT",
+        ],
+    ),
+    Migration(
+        3, "user_roles : suppression des doublons et lignes orphelines",
+        [
+            "DELETE FROM user_roles WHERE user_id IS NULL OR role_id IS NULL",
+            """
+            DELETE FROM user_roles a USING user_roles b
+            WHERE a.ctid > b.ctid AND a.user_id = b.user_id AND a.role_id = b.role_id
+            """,
+            "ALTER TABLE user_roles ALTER COLUMN user_id SET NOT NULL",
+            "ALTER TABLE user_roles ALTER COLUMN role_id SET NOT NULL",
+        ],
+    ),
+    Migration(
+        4, "user_roles : index unique (user_id, role_id) et index role_id",
+        [
+            _drop_invalid_index("user_roles_pkey"),
+            _drop_invalid_index("ix_user_roles_role_id"),
+            _create_user_roles_unique_index,
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_roles_role_id ON user_roles (role_id)",
+        ],
+        transactional=False,
+    ),
+    Migration(
+        5, "user_roles : clé primaire (user_id, role_id)",
+        [
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint
+                    WHERE conrelid = 'user_roles'::regclass AND contype = 'p'
+                ) THEN
+                    ALTER TABLE user_roles ADD CONSTRAINT user_roles_pkey PRIMARY KEY USING INDEX user_roles_pkey;
+                END IF;
+            END $$;
+            """,
+        ],
+    ),
+    Migration(
+        6, "users : email unique insensible à la casse et index created_at",
+        [
+            _check_email_case_duplicates,
+            _drop_invalid_index("ux_users_email_lower"),
+            _drop_invalid_index("ix_users_created_at_id"),
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_users_email_lower ON users (lower(email) text_pattern_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_at_id ON users (created_at, id)",
+        ],
+        transactional=False,
+    ),
+    Migration(
+        7, "Table role_permissions",
+        [_create_all],
+        dialects=("postgresql", "sqlite"),
+    ),
+    Migration(
+        8, "users : index de recherche (trigrammes pg_trgm et préfixes des noms)",
+        [_create_search_indexes],
+        transactional=False,
+        dialects=("postgresql", "sqlite"),
+    ),
+    Migration(
+        9, "Journal d'audit (table audit_log partitionnée par mois)",
+        [_create_audit_log],
+        dialects=("postgresql", "sqlite"),
+    ),
+    Migration(
+        10, "Table refresh_tokens (jetons de rafraîchissement)",
+        [_create_all],
+        dialects=("postgresql", "sqlite"),
+    ),
+    Migration(
+        11, "email_outbox : contenu effacé des messages envoyés ou abandonnés",
+        [_clear_finished_email_bodies],
+        dialects=("postgresql", "sqlite"),
+    ),
+    Migration(
+        12, "users : index de tri de la recherche (nom, prénom, id)",
+        [_create_search_sort_index],
+        transactional=False,
+        dialects=("postgresql", "sqlite"),
+    ),
+]
+
+
+# ================================
+# ⚙️ EXÉCUTION
+# ================================
+
+async def _applied_versions(engine: AsyncEngine) -> set[int]:
+    async with engine.begin() as conn:
+        await conn.run_sync(schema_migrations.create, checkfirst=True)
+        result = await conn.execute(select(schema_migrations.c.version))
+        return set(result.scalars().all())
+
+
+async def _run_steps(conn: AsyncConnection, steps: list[Step]):
+    for step in steps:
+        if callable(step):
+            await step(conn)
+        else:
+            await conn.execute(text(step))
+
+
+async def _record(conn: AsyncConnection, migration: Migration):
+    await conn.execute(insert(schema_migrations).values(
+        version=migration.version, description=migration.description, applied_at=datetime.utcnow(),
+    ))
+
+
+async def migrate(engine: AsyncEngine = engine) -> list[int]:
+    """Applique les migrations en attente ; retourne les versions appliquées."""
+    applied = await _applied_versions(engine)
+    dialect = engine.dialect.name
+    done = []
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+
+        # Autres bases (SQLite en développement) : le schéma des modèles suffit
+        steps = migration.steps if dialect in migration.dialects else []
+
+        if migration.transactional:
+            async with engine.begin() as conn:
+                await _run_steps(conn, steps)
+                await _record(conn, migration)
+        else:
+            autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+            async with autocommit.connect() as conn:
+                await _run_steps(conn, steps)
+                await _record(conn, migration)
+
+        print(f"✔ Migration {migration.version:04d} : {migration.description}")
+        done.append(migration.version)
+
+    return done
+
+
+async def status(engine: AsyncEngine = engine):
+    applied = await _applied_versions(engine)
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        mark = "✔" if migration.version in applied else "…"
+        print(f"{mark} {migration.version:04d} {migration.description}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrations du schéma ElStudio")
+    parser.add_argument("--status", action="store_true", help="affiche l'état sans rien appliquer")
+    args = parser.parse_args()
+    asyncio.run(status() if args.status else migrate())
@@ -1,7 +1,8 @@
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, Date,
-    Table, ForeignKey
+    Column, Integer, BigInteger, String, Boolean, DateTime, Date, JSON, MetaData,
+    Table, ForeignKey, Text, Index, func, literal_column
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -14,8 +15,22 @@ Base = declarative_base()
 user_roles = Table(
     "user_roles",
     Base.metadata,
-    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
-    Column("role_id", Integer, ForeignKey("roles.id", ondelete="CASCADE")),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("role_id", Integer, ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True),
+    # La clé primaire (user_id, role_id) couvre « rôles d'un utilisateur » ;
+    # cet index couvre « utilisateurs ayant le rôle X »
+    Index("ix_user_roles_role_id", "role_id"),
+)
+
+# ================================
+# 🔑 PERMISSIONS PAR RÔLE (codes du registre core/permissions.py)
+# ================================
+
+role_permissions = Table(
+    "role_permissions",
+    Base.metadata,
+    Column("role_id", Integer, ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True),
+    Column("permission", String, primary_key=True),
 )
 
 # ================================
@@ -47,6 +62,7 @@ class User(Base):
     
     is_active = Column(Boolean, default=True)
     must_change_password = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # incrémenté pour révoquer les tokens
 
     language = Column(String, default="fr")
     date_format = Column(String, default="DD/MM/YYYY")
@@ -54,6 +70,36 @@ class User(Base):
 
     roles = relationship("Role", secondary=user_roles, back_populates="users")
 
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
+# Unicité de l'email insensible à la casse ; text_pattern_ops sert aussi les recherches par préfixe
+Index(
+    "ux_users_email_lower",
+    func.lower(User.email).label("email_lower"),
+    unique=True,
+    postgresql_ops={"email_lower": "text_pattern_ops"},
+)
+
+# Recherche par préfixe de nom (GET /users/search, chemin portable)
+Index(
+    "ix_users_first_name_lower",
+    func.lower(User.first_name).label("first_name_lower"),
+    postgresql_ops={"first_name_lower": "text_pattern_ops"},
+)
+Index(
+    "ix_users_last_name_lower",
+    func.lower(User.last_name).label("last_name_lower"),
+    postgresql_ops={"last_name_lower": "text_pattern_ops"},
+)
+
+# Texte indexé par trigrammes (pg_trgm, migration 8) : l'expression SQL doit rester
+# identique à celle de l'index, d'où les séparateurs littéraux plutôt que des paramètres
+USER_SEARCH_TEXT = func.lower(
+    User.first_name + literal_column("' '") + User.last_name + literal_column("' '") + User.email
+)
+
 # ================================
 # 🏢 MODÈLE ORGANIZATION
 # ================================
@@ -72,3 +118,74 @@ class Organization(Base):
     smtp_use_tls = Column(Boolean, default=False)
     smtp_use_ssl = Column(Boolean, default=False)
     default_from_email = Column(String, nullable=True)
+
+# ================================
+# 📬 FILE D'ENVOI DES E-MAILS (OUTBOX)
+# ================================
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    # Contenus effacés une fois le message envoyé ou abandonné : ils contiennent
+    # des mots de passe temporaires et des liens de réinitialisation
+    html_body = Column(Text, nullable=True)
+    text_body = Column(Text, nullable=True)  # alternative texte brut
+
+    status = Column(String, nullable=False, default="pending")  # pending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+# ================================
+# 🔄 JETONS DE RAFRAÎCHISSEMENT (ROTATION)
+# ================================
+# Seule l'empreinte SHA-256 du jeton est stockée. Chaque utilisation le remplace
+# par un nouveau jeton de la même famille ; un jeton déjà utilisé qui revient
+# (vol probable) révoque toute la famille (core/refresh_tokens.py).
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(String, nullable=False, index=True)  # chaîne de rotations issue d'une connexion
+    token_hash = Column(String(64), nullable=False, unique=True)  # sha256 hexadécimal
+    token_version = Column(Integer, nullable=False)  # users.token_version à l'émission (révocation)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)  # remplacé par un nouveau jeton
+    revoked_at = Column(DateTime, nullable=True)  # famille révoquée après réutilisation
+
+# ================================
+# 🔍 JOURNAL D'AUDIT
+# ================================
+# Hors de Base.metadata : sous PostgreSQL, la table est partitionnée par mois
+# (migration 9, partitions gérées par core/audit.py), ce que create_all ne sait
+# pas faire. Pas de clé étrangère vers users : le journal survit aux suppressions.
+
+audit_metadata = MetaData()
+
+audit_log = Table(
+    "audit_log",
+    audit_metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("occurred_at", DateTime, nullable=False),
+    Column("actor_id", Integer, nullable=True),
+    Column("action", String, nullable=False),  # ex. "role.permissions_updated"
+    Column("target_type", String, nullable=True),
+    Column("target_id", String, nullable=True),
+    Column("ip", String, nullable=True),
+    Column("details", JSON().with_variant(JSONB, "postgresql"), nullable=True),
+    Index("ix_audit_log_occurred_at_id", "occurred_at", "id"),
+    Index("ix_audit_log_actor_occurred_at", "actor_id", "occurred_at"),
+    Index("ix_audit_log_target_occurred_at", "target_type", "target_id", "occurred_at"),
+)
@@ -1,15 +1,30 @@
 from fastapi import FastAPI, Depends
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from backend.api.router import router as api_router
-from backend.core.auth import get_current_user
+from backend.core.audit import audit_journal
+from backend.core.auth import get_current_user, shutdown_hash_pool, principal_cache, calibrate_password_hashing
+from backend.core.dependencies import require_permission
+from backend.core.invalidation import invalidation_bus
+from backend.core.metrics import registry, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from backend.core.permissions import SYSTEM_STATS
+from backend.core.refresh_tokens import refresh_token_pruner
+from backend.core.signing_keys import keyring
+from backend.db.database import engine
 from backend.db.models import User
+from backend.settings import settings
+from backend.utils.email import load_email_templates
+from backend.utils.email_worker import email_worker
+from backend.utils.smtp_pool import smtp_pool
 
 
 app = FastAPI(
     title="ElStudio API",
     description="API de gestion ElStudio",
-    version="1.0.0"
+    version="1.0.0",
+    # Sérialisation JSON via orjson pour toutes les réponses (bien plus rapide que json sur les grosses listes)
+    default_response_class=ORJSONResponse,
 )
 
 # ✅ Middleware CORS
@@ -21,6 +36,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ✅ Mesure des requêtes (durée, requêtes SQL, temps en base) : ajouté en dernier, donc le plus externe
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# ✅ Calibrage du hachage, clés de signature des JWT, compilation des templates d'e-mail, démarrage du worker
+# d'envoi, du journal d'audit et de la purge des jetons de rafraîchissement expirés
+@app.on_event("startup")
+async def startup_event():
+    calibrate_password_hashing()
+    keyring.load(create_if_missing=True)
+    load_email_templates()
+    invalidation_bus.start(engine)
+    if settings.email_worker_enabled:
+        email_worker.start()
+    if settings.audit_enabled:
+        audit_journal.start()
+    if settings.refresh_token_prune_enabled:
+        refresh_token_pruner.start()
+
+# ✅ Arrêt propre du worker e-mail, du journal d'audit (écriture des événements restants),
+# de la purge des jetons, du bus d'invalidation, des connexions SMTP et du pool de hachage
+@app.on_event("shutdown")
+async def shutdown_event():
+    await email_worker.stop()
+    await refresh_token_pruner.stop()
+    await audit_journal.stop()
+    await invalidation_bus.stop()
+    smtp_pool.close_all()
+    shutdown_hash_pool()
+
 # ✅ Route de test avec utilisateur connecté
 @app.get("/me")
 async def read_me(current_user: User = Depends(get_current_user)):
@@ -30,5 +75,37 @@ async def read_me(current_user: User = Depends(get_current_user)):
         "roles": [role.name for role in current_user.roles]
     }
 
+# ✅ Statistiques internes : cache des utilisateurs, file d'envoi des e-mails, journal d'audit, jetons de rafraîchissement
+@app.get("/stats", dependencies=[Depends(require_permission(SYSTEM_STATS))])
+async def internal_stats():
+    return {
+        "principals": principal_cache.stats(),
+        "email_outbox": email_worker.stats(),
+        "audit": audit_journal.stats(),
+        "refresh_tokens": refresh_token_pruner.stats(),
+    }
+
+# ✅ Métriques au format texte Prometheus
+def _principal_cache_metrics():
+    yield "hit", principal_cache.hits
+    yield "miss", principal_cache.misses
+
+def _email_outbox_metrics():
+    yield "sent", email_worker.sent
+    yield "retried", email_worker.retried
+    yield "failed", email_worker.failed
+
+registry.callback("elstudio_principal_cache_lookups_total", "Consultations du cache des utilisateurs",
+                  ("result",), _principal_cache_metrics, "counter")
+registry.callback("elstudio_email_outbox_messages_total", "Messages traités par le worker e-mail",
+                  ("outcome",), _email_outbox_metrics, "counter")
+registry.callback("elstudio_email_outbox_queue_depth", "Messages en attente d'envoi",
+                  (), lambda: [(email_worker.queue_depth,)])
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 # ✅ Ajout des routes principales
 app.include_router(api_router)
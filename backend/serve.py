@@ -0,0 +1,61 @@
+"""
+Point d'entrée de production : plusieurs workers uvicorn, sans rechargement.
+
+Les migrations sont appliquées, la clé de signature des JWT créée si besoin et
+le coût du hachage des mots de passe calibré une seule fois, avant le démarrage
+des workers : mesuré pendant que les autres workers hachent aussi, le coût
+serait sous-estimé et différent d'un worker à l'autre.
+Chaque worker garde ses caches en mémoire, synchronisés par le bus
+d'invalidation (PostgreSQL LISTEN/NOTIFY, voir backend/core/invalidation.py).
+
+Usage (depuis la racine du dépôt) :
+    python -m backend.serve                 # WEB_WORKERS workers (défaut : un par cœur)
+    WEB_WORKERS=4 WEB_PORT=8000 python -m backend.serve
+"""
+import asyncio
+import os
+
+import uvicorn
+
+from backend.settings import settings
+
+
+async def _migrate():
+    from backend.db.database import engine
+    from backend.db.migrations import migrate
+
+    await migrate(engine)
+    await engine.dispose()
+
+
+def _calibrate_password_hashing():
+    from backend.core.auth import calibrate_password_hashing
+
+    if settings.password_hash_cost is None:
+        params = calibrate_password_hashing()
+        # Transmis aux workers (nouveaux processus) par l'environnement, et à ce
+        # processus s'il sert lui-même l'application (un seul worker)
+        os.environ["PASSWORD_HASH_COST"] = str(params.cost)
+        settings.password_hash_cost = params.cost
+
+
+def main():
+    from backend.core.signing_keys import keyring
+
+    asyncio.run(_migrate())
+    # Tous les workers doivent signer avec les clés du même répertoire
+    keyring.load(create_if_missing=True)
+    _calibrate_password_hashing()
+    uvicorn.run(
+        "backend.main:app",
+        host=settings.web_host,
+        port=settings.web_port,
+        workers=settings.web_workers or os.cpu_count() or 1,
+        reload=False,
+        proxy_headers=True,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
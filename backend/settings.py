@@ -1,6 +1,104 @@
 from pydantic import BaseSettings
 
+from typing import Optional
+
 class Settings(BaseSettings):
     database_url: str = "postgresql+asyncpg://postgres:postgres@db:5432/postgres"
+    database_replica_url: Optional[str] = None  # réplique en lecture seule (GET)
+
+    # Moteur SQL
+    database_echo: bool = False  # journalise chaque requête : développement uniquement
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: float = 30.0
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    database_statement_cache_size: int = 500  # requêtes préparées par connexion (asyncpg)
+
+    # Hachage des mots de passe (bcrypt exécuté hors de la boucle d'événements)
+    hash_pool_workers: int = 2  # 0 = pool de threads par défaut au lieu de processus
+    hash_pool_queue_size: int = 64  # au-delà, les requêtes sont rejetées (503)
+    hash_batch_chunk_size: int = 16  # mots de passe par tâche lors d'un import en lot
+
+    # Coût du hachage calibré au démarrage pour viser password_hash_target_ms par hash
+    # (python -m backend.serve : une seule fois, avant de lancer les workers)
+    password_hash_scheme: str = "bcrypt"  # ou "argon2" (nécessite argon2-cffi)
+    password_hash_target_ms: float = 250
+    password_hash_cost: Optional[int] = None  # coût fixe (rounds bcrypt / time_cost argon2) : pas de calibrage
+    bcrypt_min_rounds: int = 10
+    bcrypt_max_rounds: int = 15
+    argon2_memory_kib: int = 65536
+    argon2_parallelism: int = 2
+    argon2_min_time_cost: int = 2
+    argon2_max_time_cost: int = 10
+
+    # Cache des utilisateurs authentifiés (get_current_user)
+    principal_cache_ttl_seconds: float = 60.0
+    principal_cache_max_size: int = 10_000
+
+    # Signature des JWT : clés asymétriques avec rotation (python -m backend.core.signing_keys --rotate),
+    # clés publiques sur /.well-known/jwks.json
+    jwt_algorithm: str = "RS256"  # algorithme des nouvelles clés : RS256 ou ES256
+    jwt_keys_dir: str = "keys/jwt"  # clés privées <kid>.pem partagées par tous les workers (/app/keys/jwt dans l'image)
+    jwt_rsa_key_size: int = 2048
+    jwt_keys_reload_seconds: float = 60  # relecture du répertoire : rotation prise en compte sans redémarrage
+    jwt_key_retirement_minutes: int = 120  # une clé remplacée reste publiée ce temps (> durée de vie des tokens)
+    jwks_max_age_seconds: int = 300  # Cache-Control de /.well-known/jwks.json
+
+    # Jetons d'accès (JWT) et jetons de rafraîchissement (POST /auth/refresh)
+    access_token_expire_minutes: int = 15
+    refresh_token_expire_days: int = 30
+    refresh_token_prune_enabled: bool = True  # suppression périodique des jetons expirés
+    refresh_token_prune_interval_seconds: float = 3600
+    refresh_token_prune_batch_size: int = 1000  # lignes supprimées par transaction
+
+    # Autorisation sans état : les rôles sont lus dans le token signé (pas de requête)
+    stateless_authz: bool = False
+
+    # Limitation de débit de /auth/login, /auth/forgot-password et /auth/reset-password
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" (par worker) ou "local_shared" (doublure d'un backend partagé)
+    rate_limit_max_keys: int = 100_000
+    rate_limit_ip_burst: int = 20
+    rate_limit_ip_per_minute: float = 10
+    rate_limit_email_burst: int = 5
+    rate_limit_email_per_minute: float = 2
+    rate_limit_trust_forwarded_for: bool = False  # à activer seulement derrière un proxy de confiance
+
+    # Journal d'audit (tampon en mémoire vidé par lots en arrière-plan)
+    audit_enabled: bool = True
+    audit_buffer_size: int = 10_000  # événements en attente au plus
+    audit_batch_size: int = 500  # un lot complet déclenche l'écriture sans attendre
+    audit_flush_interval_seconds: float = 1.0  # délai maximal avant écriture d'un lot incomplet
+    audit_backpressure_timeout_ms: float = 50  # attente maximale tampon plein, puis l'événement est abandonné
+    audit_retention_months: int = 12  # partitions mensuelles plus anciennes supprimées (0 = illimitée)
+    audit_query_default_days: int = 30  # fenêtre de GET /audit/ sans paramètre `since`
+
+    # Bus d'invalidation des caches entre workers (PostgreSQL LISTEN/NOTIFY)
+    invalidation_bus_enabled: bool = True
+    invalidation_queue_size: int = 10_000
+    invalidation_keepalive_seconds: float = 10
+
+    # Serveur de production (python -m backend.serve)
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: Optional[int] = None  # défaut : un worker par cœur
+
+    # Métriques Prometheus (GET /metrics) et middleware de mesure des requêtes
+    metrics_enabled: bool = True
+
+    # File d'envoi des e-mails (worker en arrière-plan)
+    email_worker_enabled: bool = True
+    email_batch_size: int = 50
+    email_poll_interval_seconds: float = 5.0
+    email_max_attempts: int = 5
+    email_retry_base_seconds: float = 30.0
+    email_claim_timeout_seconds: float = 300.0  # un lot réservé mais non traité (worker arrêté) redevient disponible
+
+    # Pool de connexions SMTP
+    smtp_pool_max_idle_per_key: int = 4
+    smtp_max_messages_per_connection: int = 100
+    smtp_idle_timeout_seconds: float = 60.0
+    smtp_health_check_after_seconds: float = 5.0
 
 settings = Settings()
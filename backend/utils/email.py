@@ -1,98 +1,135 @@
-import smtplib
+import asyncio
+import html
+import re
+from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from backend.db.models import Organization
-from jinja2 import Environment, FileSystemLoader
-import os
-import smtplib
+from backend.db.models import Organization, EmailOutbox
+from backend.utils.smtp_pool import smtp_pool
+from jinja2 import Environment, FileSystemLoader, Template
 
 
-# Config Jinja2 pour les templates
-env = Environment(loader=FileSystemLoader("backend/utils/email_templates"))
+# Config Jinja2 pour les templates (chemin absolu, indépendant du répertoire courant)
+TEMPLATES_DIR = Path(__file__).resolve().parent / "email_templates"
+env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)), auto_reload=False)
 
-async def send_invitation_email(db: AsyncSession, to_email: str, temp_password: str):
-    result = await db.execute(select(Organization).limit(1))
-    org = result.scalar_one()
+# Templates compilés une seule fois (load_email_templates au démarrage)
+_templates: dict[str, Template] = {}
 
-    template = env.get_template("invitation_email.html")
-    html_content = template.render(temp_password=temp_password)
+# Signal pour réveiller le worker d'envoi dès qu'un e-mail est mis en file
+outbox_event = asyncio.Event()
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = "Votre accès à ElStudio"
-    msg["From"] = org.default_from_email
-    msg["To"] = to_email
 
-    msg.attach(MIMEText(html_content, "html", "utf-8"))
+# ============================
+# 🧩 TEMPLATES
+# ============================
 
-    try:
-        if org.smtp_use_ssl:
-            server = smtplib.SMTP_SSL(org.smtp_host, org.smtp_port)
-        else:
-            server = smtplib.SMTP(org.smtp_host, org.smtp_port)
-            if org.smtp_use_tls:
-                server.starttls()
-        server.login(org.smtp_user, org.smtp_password)
-        server.send_message(msg)
-        server.quit()
-    except Exception as e:
-        print("❌ Erreur d’envoi de mail:", e)
+def load_email_templates():
+    """Charge et compile tous les templates d'e-mail (appelé au démarrage)."""
+    for name in env.list_templates(extensions=["html"]):
+        _templates[name] = env.get_template(name)
 
 
-async def send_password_changed_email(db: AsyncSession, to_email: str, first_name: str):
-    result = await db.execute(select(Organization).limit(1))
-    org = result.scalar_one()
+def render_template(name: str, **context) -> tuple[str, str]:
+    """Retourne le rendu HTML et sa version texte brut."""
+    template = _templates.get(name)
+    if template is None:
+        template = _templates[name] = env.get_template(name)
 
-    template = env.get_template("password_changed.html")
-    html_content = template.render(first_name=first_name)
+    html_content = template.render(**context)
+    return html_content, html_to_text(html_content)
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = "Votre mot de passe a été modifié"
-    msg["From"] = org.default_from_email
-    msg["To"] = to_email
 
-    msg.attach(MIMEText(html_content, "html", "utf-8"))
+def html_to_text(html_content: str) -> str:
+    text = re.sub(r"<a\s[^>]*href=\"([^\"]+)\"[^>]*>(.*?)</a>", _link_to_text, html_content, flags=re.S | re.I)
+    text = re.sub(r"<br\s*/?>", "\n", text, flags=re.I)
+    text = re.sub(r"</(p|div|h[1-6]|li|tr)>", "\n\n", text, flags=re.I)
+    text = re.sub(r"<(style|script)[^>]*>.*?</\1>", "", text, flags=re.S | re.I)
+    text = html.unescape(re.sub(r"<[^>]+>", "", text))
 
-    try:
-        if org.smtp_use_ssl:
-            server = smtplib.SMTP_SSL(org.smtp_host, org.smtp_port)
-        else:
-            server = smtplib.SMTP(org.smtp_host, org.smtp_port)
-            if org.smtp_use_tls:
-                server.starttls()
-        server.login(org.smtp_user, org.smtp_password)
-        server.send_message(msg)
-        server.quit()
-    except Exception as e:
-        print("❌ Erreur d’envoi de mail:", e)
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+
+def _link_to_text(match: re.Match) -> str:
+    href, label = match.group(1), re.sub(r"<[^>]+>", "", match.group(2)).strip()
+    return label if label == href else f"{label} ({href})"
+
+
+# ============================
+# 📬 MISE EN FILE (OUTBOX)
+# ============================
+
+async def enqueue_email(db: AsyncSession, to_email: str, subject: str, html_content: str, text_content: str | None = None):
+    """
+    Enregistre l'e-mail dans la table email_outbox et rend la main immédiatement.
+    L'envoi SMTP est effectué par le worker en arrière-plan (utils/email_worker.py).
+    """
+    db.add(EmailOutbox(to_email=to_email, subject=subject, html_body=html_content, text_body=text_content))
+    await db.commit()
+    outbox_event.set()
 
-async def send_reset_password_email(db: AsyncSession, to_email: str, reset_token: str):
-    result = await db.execute(select(Organization).limit(1))
-    org = result.scalar_one()
 
-    template = env.get_template("reset_password.html")
-    html_content = template.render(
+async def send_invitation_email(db: AsyncSession, to_email: str, temp_password: str):
+    html_content, text_content = render_template("invitation_email.html", temp_password=temp_password)
+
+    await enqueue_email(db, to_email, "Votre accès à ElStudio", html_content, text_content)
+
+
+async def send_invitation_emails(db: AsyncSession, invitations: list[tuple[str, str]]):
+    """
+    Met en file un lot d'invitations (e-mail, mot de passe temporaire) en un seul INSERT.
+    Le commit inclut les éventuelles écritures en attente dans la même transaction.
+    """
+    rows = []
+    for to_email, temp_password in invitations:
+        html_content, text_content = render_template("invitation_email.html", temp_password=temp_password)
+        rows.append({
+            "to_email": to_email,
+            "subject": "Votre accès à ElStudio",
+            "html_body": html_content,
+            "text_body": text_content,
+        })
+
+    if rows:
+        await db.execute(insert(EmailOutbox), rows)
+    await db.commit()
+    outbox_event.set()
+
+
+async def send_password_changed_email(db: AsyncSession, to_email: str, first_name: str):
+    html_content, text_content = render_template("password_changed.html", first_name=first_name)
+
+    await enqueue_email(db, to_email, "Votre mot de passe a été modifié", html_content, text_content)
+
+
+async def send_reset_password_email(db: AsyncSession, to_email: str, reset_token: str):
+    html_content, text_content = render_template(
+        "reset_password.html",
         reset_link=f"http://localhost:5173/reset-password?token={reset_token}"
     )
 
+    await enqueue_email(db, to_email, "Réinitialisation de votre mot de passe", html_content, text_content)
+
+
+# ============================
+# ✉️ ENVOI SMTP (utilisé par le worker)
+# ============================
+
+def build_message(org: Organization, to_email: str, subject: str, html_content: str, text_content: str | None = None):
     msg = MIMEMultipart("alternative")
-    msg["Subject"] = "Réinitialisation de votre mot de passe"
+    msg["Subject"] = subject
     msg["From"] = org.default_from_email
     msg["To"] = to_email
 
+    # Ordre RFC 2046 : la version préférée (HTML) en dernier
+    msg.attach(MIMEText(text_content or html_to_text(html_content), "plain", "utf-8"))
     msg.attach(MIMEText(html_content, "html", "utf-8"))
+    return msg
+
 
-    try:
-        if org.smtp_use_ssl:
-            server = smtplib.SMTP_SSL(org.smtp_host, org.smtp_port)
-        else:
-            server = smtplib.SMTP(org.smtp_host, org.smtp_port)
-            if org.smtp_use_tls:
-                server.starttls()
-        server.login(org.smtp_user, org.smtp_password)
-        server.send_message(msg)
-        server.quit()
-    except Exception as e:
-        print("❌ Erreur d’envoi de mail:", e)
+def deliver_message(org: Organization, msg):
+    """Envoi bloquant via le pool SMTP : à exécuter dans un thread, jamais sur la boucle d'événements."""
+    smtp_pool.send(org, msg)
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from sqlalchemy.future import select
+from backend.db.database import SessionLocal
+from backend.db.models import EmailOutbox, Organization
+from backend.core.organization import get_cached_organization
+from backend.settings import settings
+from backend.utils.email import outbox_event, build_message, deliver_message
+from backend.utils.smtp_pool import smtp_pool
+
+# Un message terminé (envoyé ou abandonné) ne garde pas son contenu : mots de passe
+# temporaires et liens de réinitialisation ne restent pas lisibles en base
+CLEARED_BODIES = {"html_body": None, "text_body": None}
+
+
+class EmailOutboxWorker:
+    """
+    Vide la table email_outbox par lots en arrière-plan.
+
+    Les échecs sont retentés avec un délai exponentiel (retry_base_seconds * 2^n)
+    jusqu'à max_attempts, puis le message passe en statut "failed". Les lignes sont
+    réservées dans une transaction courte, puis envoyées sans connexion retenue.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        deliver=deliver_message,
+        batch_size: int = settings.email_batch_size,
+        poll_interval: float = settings.email_poll_interval_seconds,
+        max_attempts: int = settings.email_max_attempts,
+        retry_base_seconds: float = settings.email_retry_base_seconds,
+        claim_timeout: float = settings.email_claim_timeout_seconds,
+    ):
+        self.session_factory = session_factory
+        self.deliver = deliver
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.claim_timeout = claim_timeout
+
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.queue_depth = 0
+        self.throughput = 0.0  # messages/s du dernier lot
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    # -- Cycle de vie
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self._stopping = True
+        outbox_event.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                print("❌ Erreur du worker e-mail:", e)
+                processed = 0
+
+            # Lot vide : on ferme les connexions SMTP inactives puis on attend
+            # un nouveau message ou le prochain cycle
+            if processed == 0 and not self._stopping:
+                await asyncio.to_thread(smtp_pool.evict_idle)
+                outbox_event.clear()
+                try:
+                    await asyncio.wait_for(outbox_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    # -- Traitement d'un lot
+
+    async def drain_once(self) -> int:
+        # 1. Réservation : transaction courte, la connexion est rendue au pool avant
+        #    l'envoi SMTP. Les lignes réservées ne redeviennent disponibles qu'après
+        #    claim_timeout (worker arrêté en plein envoi : elles seront renvoyées).
+        async with self.session_factory() as db:
+            now = datetime.utcnow()
+            result = await db.execute(
+                select(EmailOutbox)
+                .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)  # plusieurs workers peuvent tourner en parallèle
+            )
+            rows = result.scalars().all()
+            if rows:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_([row.id for row in rows]))
+                    .values(next_attempt_at=now + timedelta(seconds=self.claim_timeout))
+                    .execution_options(synchronize_session=False)
+                )
+                org = await get_cached_organization(db)
+            await db.commit()
+
+        # 2. Envoi, sans transaction ouverte
+        outcomes = []
+        if rows:
+            if org is None:
+                raise RuntimeError("Aucune organisation configurée pour l'envoi des e-mails")
+            started = time.perf_counter()
+            for row in rows:
+                outcomes.append(await self._deliver_row(org, row))
+            elapsed = time.perf_counter() - started
+            self.throughput = len(rows) / elapsed if elapsed > 0 else 0.0
+
+        # 3. Résultats du lot en une transaction
+        async with self.session_factory() as db:
+            if outcomes:
+                await db.execute(update(EmailOutbox), outcomes)
+            self.queue_depth = (await db.execute(
+                select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status == "pending")
+            )).scalar_one()
+            await db.commit()
+
+        return len(rows)
+
+    async def _deliver_row(self, org: Organization, row: EmailOutbox) -> dict:
+        """Envoie un message ; renvoie les colonnes à mettre à jour (clé : id)."""
+        msg = build_message(org, row.to_email, row.subject, row.html_body, row.text_body)
+        try:
+            await asyncio.to_thread(self.deliver, org, msg)
+        except Exception as e:
+            attempts = row.attempts + 1
+            values = {"id": row.id, "attempts": attempts, "last_error": str(e)[:1000]}
+            if attempts >= self.max_attempts:
+                values.update(status="failed", **CLEARED_BODIES)
+                self.failed += 1
+                print(f"❌ Échec définitif d'envoi à {row.to_email}:", e)
+            else:
+                delay = self.retry_base_seconds * 2 ** (attempts - 1)
+                values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+                self.retried += 1
+            return values
+
+        self.sent += 1
+        return {"id": row.id, "status": "sent", "sent_at": datetime.utcnow(), **CLEARED_BODIES}
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "queue_depth": self.queue_depth,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "throughput_per_second": round(self.throughput, 2),
+            "smtp_pool": smtp_pool.stats(),
+        }
+
+
+email_worker = EmailOutboxWorker()
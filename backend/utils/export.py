@@ -0,0 +1,76 @@
+import csv
+import io
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable
+
+import orjson
+
+
+# ============================
+# 📤 EXPORT EN FLUX (NDJSON / CSV, GZIP À LA VOLÉE)
+# ============================
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def encode_ndjson(rows: Iterable[dict]) -> bytes:
+    # orjson sérialise nativement date/datetime (ISO 8601) et produit directement des bytes UTF-8
+    return b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+
+def encode_csv(rows: Iterable[dict], columns: list[str], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(
+            "|".join(value) if isinstance(value, list)
+            else value.isoformat() if isinstance(value, (date, datetime))
+            else value
+            for value in (row[column] for column in columns)
+        )
+    return buffer.getvalue().encode("utf-8")
+
+
+async def encode_stream(
+    batches: AsyncIterator[list[dict]], export_format: str, columns: list[str]
+) -> AsyncIterator[bytes]:
+    """Transforme des lots de lignes en morceaux NDJSON ou CSV (en-tête inclus)."""
+    first = True
+    async for batch in batches:
+        if export_format == "csv":
+            chunk = encode_csv(batch, columns, header=first)
+        else:
+            chunk = encode_ndjson(batch)
+        first = False
+        if chunk:
+            yield chunk
+
+    # Export vide : le CSV garde au moins son en-tête
+    if first and export_format == "csv":
+        yield encode_csv([], columns, header=True)
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compression gzip à la volée : mémoire constante quelle que soit la taille de l'export."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = en-tête gzip
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "x-gzip"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# ============================
+# 🔖 CURSEURS DE PAGINATION (KEYSET)
+# ============================
+# Le curseur encode la clé de tri de la dernière ligne renvoyée : la page suivante
+# reprend « après » cette clé via l'index, sans OFFSET, quelle que soit la profondeur.
+
+def encode_cursor(*values) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _cursor_value(value, expected: type):
+    # bool est un int pour Python, jamais une valeur de curseur valide
+    if expected is datetime:
+        if not isinstance(value, str):
+            raise TypeError
+        return datetime.fromisoformat(value)
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, expected) or isinstance(value, bool):
+        raise TypeError
+    return value
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """
+    Décode un curseur reçu du client. Avec `types`, vérifie aussi le nombre et le
+    type de chaque valeur (datetime : chaîne ISO 8601) : un curseur altéré donne
+    une 400, jamais une erreur de comparaison en base.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list):
+            raise ValueError
+        if types:
+            if len(values) != len(types):
+                raise ValueError
+            values = [_cursor_value(value, expected) for value, expected in zip(values, types)]
+        return values
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def escape_like(value: str) -> str:
+    """Échappe les jokers LIKE pour une recherche par préfixe littérale."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ============================
+# 🔢 COMPTAGE (EXACT OU ESTIMÉ)
+# ============================
+
+async def count_rows(db: AsyncSession, stmt, estimate: bool = False) -> tuple[int, bool]:
+    """
+    Compte les lignes de `stmt`. En mode estimation sur PostgreSQL, le nombre est
+    lu dans le plan de l'optimiseur (EXPLAIN) au lieu de parcourir la table.
+    Retourne (total, est_une_estimation).
+    """
+    bind = db.get_bind()
+    if estimate and bind.dialect.name == "postgresql":
+        # Requête compilée avec ses paramètres liés : les valeurs saisies ne sont jamais
+        # insérées dans le texte SQL
+        compiled = stmt.compile(dialect=bind.dialect)
+        params = compiled.construct_params()
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        conn = await db.connection()
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"]), True
+
+    result = await db.execute(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    return result.scalar_one(), False
@@ -0,0 +1,91 @@
+from sqlalchemy import and_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.db.migrations import SEARCH_TRGM_INDEX
+from backend.utils.pagination import escape_like
+
+
+# ============================
+# 🔎 RECHERCHE D'UTILISATEURS
+# ============================
+# Deux chemins selon la base :
+#   - « trigram » (PostgreSQL + pg_trgm) : chaque terme est cherché n'importe où
+#     dans « prénom nom email » via l'index GIN, puis toutes les correspondances
+#     sont classées par word_similarity ;
+#   - « prefix » (SQLite, ou PostgreSQL sans pg_trgm) : chaque terme doit préfixer
+#     le prénom, le nom ou l'email, via les index B-tree sur lower(...). Les
+#     résultats sont triés par nom, prénom, id : l'index de tri (SEARCH_SORT_INDEX)
+#     fournit les lignes déjà dans cet ordre, la page s'arrête dès qu'elle est pleine.
+#     Une branche par attribution d'un champ aux EXPANDED_TERMS premiers termes
+#     (3 ** EXPANDED_TERMS branches au plus) ; les termes suivants filtrent.
+# Un terme de moins de TRIGRAM_MIN_LENGTH caractères ne produit aucun trigramme
+# exploitable par l'index : une requête faite uniquement de termes courts passe
+# toujours par les préfixes.
+
+TRIGRAM_MIN_LENGTH = 3
+MAX_TERMS = 5
+EXPANDED_TERMS = 2
+
+_trigram_available: dict[str, bool] = {}
+
+
+def search_terms(q: str) -> list[str]:
+    """Termes en minuscules, sans doublons, dans l'ordre de saisie."""
+    return list(dict.fromkeys(term for term in q.lower().split()))[:MAX_TERMS]
+
+
+async def trigram_search_available(db: AsyncSession) -> bool:
+    """Présence de l'index trigrammes, vérifiée une fois par processus et par moteur."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in _trigram_available:
+        result = await db.execute(
+            text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": SEARCH_TRGM_INDEX}
+        )
+        _trigram_available[key] = result.first() is not None
+    return _trigram_available[key]
+
+
+async def plan_with_values(db: AsyncSession, stmt):
+    """
+    Plan calculé avec les termes de la recherche (PostgreSQL). La requête préparée
+    (asyncpg) a toujours la même forme, mais le bon parcours (index de tri ou index
+    de préfixe) dépend des termes, que le plan générique ignore. SET LOCAL : limité
+    à la transaction, sur la connexion (principale ou réplique) qui exécutera stmt.
+    """
+    if db.sync_session.get_bind(clause=stmt).dialect.name == "postgresql":
+        # Routé comme stmt (RoutingSession choisit la base d'après la clause)
+        await db.execute(text("SET LOCAL plan_cache_mode = force_custom_plan"), bind_arguments={"clause": stmt})
+
+
+def contains_condition(expr, term: str):
+    return expr.like("%" + escape_like(term) + "%", escape="\\")
+
+
+def _next_prefix(term: str) -> str:
+    return term[:-1] + chr(ord(term[-1]) + 1)
+
+
+def prefix_condition(expr, term: str, dialect_name: str):
+    """
+    Préfixe exprimé en intervalle [terme, terme suivant[ : contrairement à LIKE 'x%',
+    l'intervalle reste exploitable par l'index avec un paramètre lié, donc aussi
+    dans le plan générique des requêtes préparées (asyncpg).
+    """
+    upper = _next_prefix(term)
+    if dialect_name == "postgresql":
+        # Opérateurs de l'index text_pattern_ops (comparaison octet par octet)
+        return and_(expr.op("~>=~")(term), expr.op("~<~")(upper))
+    return and_(expr >= term, expr < upper)
+
+
+def byte_order(expr, dialect_name: str):
+    """Ordre octet par octet, celui de l'index de tri (COLLATE "C" ; BINARY sous SQLite)."""
+    return expr.collate("C") if dialect_name == "postgresql" else expr
+
+
+def prefix_range(key, term: str):
+    """Préfixe sur une clé déjà en ordre octet : intervalle parcouru dans l'index de tri."""
+    return and_(key >= term, key < _next_prefix(term))
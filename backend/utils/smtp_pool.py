@@ -0,0 +1,174 @@
+import smtplib
+import time
+from threading import Lock
+from backend.core.metrics import smtp_send_duration
+from backend.db.models import Organization
+from backend.settings import settings
+
+
+def open_smtp_connection(org: Organization) -> smtplib.SMTP:
+    """Ouvre une connexion SMTP authentifiée selon la configuration de l'organisation."""
+    if org.smtp_use_ssl:
+        server = smtplib.SMTP_SSL(org.smtp_host, org.smtp_port)
+    else:
+        server = smtplib.SMTP(org.smtp_host, org.smtp_port)
+        if org.smtp_use_tls:
+            server.starttls()
+    if org.smtp_user:
+        server.login(org.smtp_user, org.smtp_password)
+    return server
+
+
+class _PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+
+
+class SMTPConnectionPool:
+    """
+    Pool de connexions SMTP réutilisables, indexé par la configuration SMTP.
+
+    - une connexion restée inactive plus de `health_check_after` secondes est
+      vérifiée par un NOOP avant réutilisation ;
+    - une connexion est fermée après `max_messages_per_connection` envois
+      (certains serveurs coupent au-delà d'un quota) ;
+    - les connexions inactives depuis plus de `idle_timeout` secondes sont fermées.
+
+    Les envois sont bloquants : à appeler depuis un thread.
+    """
+
+    def __init__(
+        self,
+        max_idle_per_key: int = settings.smtp_pool_max_idle_per_key,
+        max_messages_per_connection: int = settings.smtp_max_messages_per_connection,
+        idle_timeout: float = settings.smtp_idle_timeout_seconds,
+        health_check_after: float = settings.smtp_health_check_after_seconds,
+        connect=open_smtp_connection,
+    ):
+        self.max_idle_per_key = max_idle_per_key
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.connect = connect
+
+        self.opened = 0
+        self.reused = 0
+        self._idle: dict[tuple, list[_PooledConnection]] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(org: Organization) -> tuple:
+        return (
+            org.smtp_host, org.smtp_port, org.smtp_user, org.smtp_password,
+            bool(org.smtp_use_tls), bool(org.smtp_use_ssl),
+        )
+
+    def send(self, org: Organization, msg):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            self._send(org, msg)
+            outcome = "sent"
+        finally:
+            smtp_send_duration.observe(time.perf_counter() - started, outcome)
+
+    def _send(self, org: Organization, msg):
+        key = self._key(org)
+        conn, reused = self._acquire(key, org)
+        try:
+            conn.server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            conn.close()
+            if not reused:
+                raise
+            # Connexion réutilisée fermée côté serveur : une seule nouvelle tentative
+            conn = self._open(org)
+            try:
+                conn.server.send_message(msg)
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+        conn.sent += 1
+        self._release(key, conn)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, conns in list(self._idle.items()):
+                keep = [c for c in conns if now - c.last_used < self.idle_timeout]
+                expired.extend(c for c in conns if now - c.last_used >= self.idle_timeout)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for conn in expired:
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "opened": self.opened,
+            "reused": self.reused,
+            "idle": sum(len(conns) for conns in self._idle.values()),
+        }
+
+    def _open(self, org: Organization) -> _PooledConnection:
+        conn = _PooledConnection(self.connect(org))
+        self.opened += 1
+        return conn
+
+    def _acquire(self, key: tuple, org: Organization) -> tuple[_PooledConnection, bool]:
+        self.evict_idle()
+        while True:
+            with self._lock:
+                conns = self._idle.get(key)
+                conn = conns.pop() if conns else None
+            if conn is None:
+                return self._open(org), False
+
+            if time.monotonic() - conn.last_used >= self.health_check_after:
+                try:
+                    code, _ = conn.server.noop()
+                    if code != 250:
+                        raise smtplib.SMTPServerDisconnected()
+                except Exception:
+                    conn.close()
+                    continue
+
+            self.reused += 1
+            return conn, True
+
+    def _release(self, key: tuple, conn: _PooledConnection):
+        if conn.sent >= self.max_messages_per_connection:
+            conn.close()
+            return
+
+        conn.last_used = time.monotonic()
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.max_idle_per_key:
+                conns.append(conn)
+                return
+        conn.close()
+
+
+smtp_pool = SMTPConnectionPool()
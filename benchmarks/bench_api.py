@@ -0,0 +1,308 @@
+"""
+Benchmark de charge : mélange réaliste de requêtes sur l'API.
+
+Crée N utilisateurs de benchmark (voir benchmarks.seed), une organisation
+pointant vers un SMTP local (aiosmtpd), puis envoie pendant une durée fixe un
+mélange pondéré de requêtes : /auth/login, /me, /auth/me, GET /users/,
+GET /users/{id} et GET /organization. L'application tourne dans le processus
+(ASGI, par défaut) ou sous uvicorn (--server uvicorn, plusieurs workers possibles).
+
+Le résultat (débit, p50/p95/p99 par endpoint et global, commit courant) est
+écrit en JSON ; --baseline compare à un résultat précédent pour suivre
+l'effet d'un changement d'un commit à l'autre. Tout tourne hors ligne :
+PostgreSQL local ou base embarquée (SQLite), SMTP local.
+
+Usage (depuis la racine du dépôt) :
+    DATABASE_URL=sqlite+aiosqlite:///bench.sqlite python -m benchmarks.bench_api --users 10000
+    DATABASE_URL=postgresql+asyncpg://postgres@localhost/bench \\
+        python -m benchmarks.bench_api --users 100000 --concurrency 64 --duration 60 \\
+        --server uvicorn --workers 4 --output after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+from aiosmtpd.controller import Controller
+from sqlalchemy.future import select
+
+# Les rafales de connexions du benchmark dépasseraient la limitation de débit de /auth/login
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from backend.core.organization import invalidate_organization
+from backend.db.database import SessionLocal, engine
+from backend.db.models import User
+from backend.main import app
+from benchmarks.seed import BENCH_DOMAIN, BENCH_PASSWORD, admin_credentials, seed_organization, seed_users
+
+# Poids relatifs de chaque requête dans le mélange
+DEFAULT_MIX = {
+    "login": 2,
+    "me": 25,
+    "auth_me": 20,
+    "list_users": 15,
+    "get_user": 23,
+    "organization": 15,
+}
+
+
+class NullSMTPHandler:
+    """SMTP local qui accepte tout et ne délivre rien."""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Percentile au rang le plus proche, sur une liste déjà triée."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(q / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+def summarize(latencies: list[float], statuses: Counter, elapsed: float) -> dict:
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests": count,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "errors": sum(n for status, n in statuses.items() if status >= 400),
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        "mean_ms": round(sum(latencies) / count, 2) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if count else 0.0,
+    }
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def sample_users(sample_size: int) -> tuple[list[int], list[str]]:
+    """Identifiants et e-mails d'utilisateurs actifs, tirés parmi les utilisateurs de benchmark."""
+    async with SessionLocal() as db:
+        rows = (await db.execute(
+            select(User.id, User.email)
+            .where(User.email.like(f"%@{BENCH_DOMAIN}"), User.is_active.is_(True))
+            .order_by(User.id)
+        )).all()
+    rng = random.Random(7)
+    rows = rng.sample(rows, min(sample_size, len(rows)))
+    return [row.id for row in rows], [row.email for row in rows]
+
+
+async def open_sessions(client: httpx.AsyncClient, emails: list[str], count: int) -> list[dict]:
+    """Jetons de session pour /me et /auth/me (connexions séquentielles : bcrypt est coûteux)."""
+    headers = []
+    for email in emails:
+        if len(headers) >= count:
+            break
+        response = await client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+        if response.status_code == 200:
+            headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+    return headers
+
+
+async def drive(client: httpx.AsyncClient, mix: dict, context: dict, concurrency: int,
+                duration: float, warmup: float) -> dict:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    statuses = {name: Counter() for name in names}
+    admin = context["admin"]
+
+    def request_for(name: str, rng: random.Random):
+        if name == "login":
+            email = rng.choice(context["emails"])
+            return client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+        if name == "me":
+            return client.get("/me", headers=rng.choice(context["sessions"]))
+        if name == "auth_me":
+            return client.get("/auth/me", headers=rng.choice(context["sessions"]))
+        if name == "list_users":
+            return client.get("/users/", params={"limit": 50}, headers=admin)
+        if name == "get_user":
+            return client.get(f"/users/{rng.choice(context['user_ids'])}", headers=admin)
+        return client.get("/organization")
+
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            name = rng.choices(names, weights)[0]
+            try:
+                response = await request_for(name, rng)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 599
+            end = time.perf_counter()
+            # Les requêtes de la période de chauffe ne sont pas comptées
+            if now >= measure_from:
+                latencies[name].append((end - now) * 1000)
+                statuses[name][status] += 1
+
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    all_statuses = sum(statuses.values(), Counter())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total": summarize(all_latencies, all_statuses, elapsed),
+        "endpoints": {name: summarize(latencies[name], statuses[name], elapsed) for name in names},
+    }
+
+
+def start_uvicorn(port: int, workers: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,  # la sortie standard est réservée au résultat JSON
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            await client.get("/organization")
+            return
+        except httpx.HTTPError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Le serveur uvicorn n'a pas démarré à temps")
+
+
+def compare(result: dict, baseline: dict) -> dict:
+    """Écart relatif (en %) du débit et du p95 par rapport à un résultat précédent."""
+    def delta(new, old):
+        return round((new - old) / old * 100, 1) if old else None
+
+    comparison = {}
+    for name, stats in {"total": result["total"], **result["endpoints"]}.items():
+        old = baseline["total"] if name == "total" else baseline.get("endpoints", {}).get(name)
+        if old:
+            comparison[name] = {
+                "throughput_pct": delta(stats["throughput_rps"], old["throughput_rps"]),
+                "p95_pct": delta(stats["p95_ms"], old["p95_ms"]),
+                "p99_pct": delta(stats["p99_ms"], old["p99_ms"]),
+            }
+    return {"baseline_commit": baseline.get("meta", {}).get("commit"), "deltas": comparison}
+
+
+async def run(args) -> dict:
+    smtp_handler = NullSMTPHandler()
+    smtp = Controller(smtp_handler, hostname="127.0.0.1", port=args.smtp_port)
+    smtp.start()
+
+    server = None
+    try:
+        await seed_users(args.users)
+        await seed_organization(smtp_port=args.smtp_port)
+        invalidate_organization()
+        user_ids, emails = await sample_users(args.sample)
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        if args.server == "uvicorn":
+            await engine.dispose()
+            server = start_uvicorn(args.port, args.workers)
+            client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60)
+        else:
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+        async with client:
+            if server is not None:
+                await wait_until_ready(client)
+            response = await client.post("/auth/login", json=admin_credentials())
+            response.raise_for_status()
+            context = {
+                "admin": {"Authorization": f"Bearer {response.json()['access_token']}"},
+                "sessions": await open_sessions(client, emails, args.sessions),
+                "user_ids": user_ids,
+                "emails": emails,
+            }
+            if not context["sessions"]:
+                raise RuntimeError("Aucune session de benchmark n'a pu être ouverte")
+            result = await drive(client, args.mix, context, args.concurrency, args.duration, args.warmup)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        smtp.stop()
+
+    result["meta"] = {
+        "commit": current_commit(),
+        "database": engine.dialect.name,
+        "server": args.server,
+        "workers": args.workers if args.server == "uvicorn" else 1,
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "mix": args.mix,
+        "smtp_messages": smtp_handler.received,
+    }
+    return result
+
+
+def parse_mix(value: str) -> dict:
+    """Format : « login=2,me=25,... » ; les requêtes absentes gardent leur poids par défaut."""
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Requête inconnue : {name}")
+        mix[name] = int(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--sessions", type=int, default=20, help="Nombre de comptes connectés pour /me et /auth/me")
+    parser.add_argument("--sample", type=int, default=1000, help="Utilisateurs tirés pour /users/{id} et /auth/login")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX))
+    parser.add_argument("--server", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--smtp-port", type=int, default=8026)
+    parser.add_argument("--output", help="Fichier JSON où écrire le résultat")
+    parser.add_argument("--baseline", help="Résultat JSON précédent à comparer")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            result["comparison"] = compare(result, json.load(f))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
@@ -0,0 +1,141 @@
+"""
+Benchmark : journal d'audit (tampon en mémoire, écriture par lots).
+
+Compare, pour N événements :
+  - sync : une insertion et un commit par événement, comme le ferait un endpoint
+    qui journalise lui-même ;
+  - journal : des producteurs concurrents appellent AuditJournal.record ; la tâche
+    de fond écrit par lots (COPY sous PostgreSQL, INSERT multi-lignes ailleurs).
+    On mesure la latence côté appelant et le débit jusqu'à écriture complète ;
+  - backpressure : base indisponible et tampon réduit ; l'attente de l'appelant
+    doit rester bornée par audit_backpressure_timeout_ms, le surplus est abandonné.
+
+Usage (depuis la racine du dépôt, base de données accessible via DATABASE_URL) :
+    python -m benchmarks.bench_audit_journal --events 50000 --producers 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, insert
+
+from backend.core.audit import AuditEvent, AuditJournal
+from backend.db.database import engine
+from backend.db.migrations import migrate
+from backend.db.models import audit_log
+
+BENCH_ACTION = "bench.event"
+SCHEDULING_MARGIN_MS = 25
+
+
+def make_event(i: int) -> AuditEvent:
+    return AuditEvent(
+        occurred_at=datetime.utcnow(), actor_id=1, action=BENCH_ACTION, target_type="user",
+        target_id=str(i), ip="127.0.0.1", details={"fields": ["first_name", "email"], "n": i},
+    )
+
+
+def latency_summary(samples: list[float]) -> dict:
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_us": round(cuts[49] * 1e6, 1),
+        "p99_us": round(cuts[98] * 1e6, 1),
+        "max_us": round(max(samples) * 1e6, 1),
+    }
+
+
+async def run_sync(events: int) -> dict:
+    samples = []
+    started = time.perf_counter()
+    for i in range(events):
+        t0 = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.execute(insert(audit_log).values(make_event(i)._asdict()))
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return {"events": events, "events_per_second": round(events / elapsed), "caller": latency_summary(samples)}
+
+
+async def run_journal(events: int, producers: int, batch_size: int) -> dict:
+    journal = AuditJournal(batch_size=batch_size, capacity=max(events, batch_size))
+    journal.start()
+    samples = []
+
+    async def producer(offset: int):
+        for i in range(offset, events, producers):
+            t0 = time.perf_counter()
+            await journal.record(make_event(i))
+            samples.append(time.perf_counter() - t0)
+            if i % 100 == 0:
+                await asyncio.sleep(0)  # laisse la tâche d'écriture progresser
+
+    started = time.perf_counter()
+    await asyncio.gather(*(producer(p) for p in range(producers)))
+    await journal.stop()  # écrit les derniers lots
+    elapsed = time.perf_counter() - started
+    return {
+        "events": events,
+        "producers": producers,
+        "batch_size": batch_size,
+        "events_per_second": round(journal.written / elapsed),
+        "caller": latency_summary(samples),
+        **{key: value for key, value in journal.stats().items() if key in ("written", "dropped", "failed_flushes")},
+    }
+
+
+class UnavailableJournal(AuditJournal):
+    async def _write(self, batch):
+        raise ConnectionError("base indisponible (simulation)")
+
+
+async def run_backpressure(events: int, capacity: int, timeout_ms: float) -> dict:
+    journal = UnavailableJournal(capacity=capacity, backpressure_timeout=timeout_ms / 1000)
+    journal.start()
+    samples = []
+    for i in range(events):
+        t0 = time.perf_counter()
+        await journal.record(make_event(i))
+        samples.append(time.perf_counter() - t0)
+    dropped = journal.dropped
+    journal._task.cancel()
+    await asyncio.gather(journal._task, return_exceptions=True)
+    return {
+        "events": events,
+        "capacity": capacity,
+        "timeout_ms": timeout_ms,
+        "buffered": journal.depth,
+        "dropped": dropped,
+        "max_wait_ms": round(max(samples) * 1000, 1),
+        # Marge pour l'ordonnancement de la boucle d'événements
+        "bounded": max(samples) * 1000 <= timeout_ms + SCHEDULING_MARGIN_MS,
+    }
+
+
+async def run(events: int, producers: int, batch_size: int, sync_events: int) -> dict:
+    await migrate(engine)
+    try:
+        results = {
+            "dialect": engine.dialect.name,
+            # Journal d'abord : il crée les partitions du mois avant les insertions directes
+            "journal": await run_journal(events, producers, batch_size),
+            "sync": await run_sync(sync_events),
+            "backpressure": await run_backpressure(200, capacity=100, timeout_ms=20),
+        }
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(audit_log).where(audit_log.c.action == BENCH_ACTION))
+    results["speedup"] = round(results["journal"]["events_per_second"] / results["sync"]["events_per_second"], 1)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--producers", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sync-events", type=int, default=2_000, help="Événements écrits un par un (référence)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.events, args.producers, args.batch_size, args.sync_events)), indent=2))
@@ -0,0 +1,99 @@
+"""
+Benchmark : débit du worker d'envoi des e-mails (messages/s).
+
+Démarre un serveur SMTP local (aiosmtpd) qui se contente de compter les messages,
+met N e-mails en file dans email_outbox puis laisse le worker vider la file.
+L'organisation doit exister en base : ses paramètres SMTP sont temporairement
+pointés vers le serveur local.
+
+Usage (depuis la racine du dépôt, base de données accessible via DATABASE_URL) :
+    python -m benchmarks.bench_email_outbox --messages 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiosmtpd.controller import Controller
+from sqlalchemy import delete
+from sqlalchemy.future import select
+
+from backend.core.organization import invalidate_organization
+from backend.db.database import SessionLocal
+from backend.db.models import EmailOutbox, Organization
+from backend.utils.email import enqueue_email
+from backend.utils.email_worker import EmailOutboxWorker
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+async def configure_local_smtp(port: int) -> dict:
+    async with SessionLocal() as db:
+        org = (await db.execute(select(Organization).limit(1))).scalar_one()
+        previous = {
+            "smtp_host": org.smtp_host, "smtp_port": org.smtp_port, "smtp_user": org.smtp_user,
+            "smtp_use_ssl": org.smtp_use_ssl, "smtp_use_tls": org.smtp_use_tls,
+        }
+        org.smtp_host, org.smtp_port, org.smtp_user = "127.0.0.1", port, None
+        org.smtp_use_ssl = org.smtp_use_tls = False
+        await db.commit()
+    invalidate_organization()
+    return previous
+
+
+async def restore_smtp(previous: dict):
+    async with SessionLocal() as db:
+        org = (await db.execute(select(Organization).limit(1))).scalar_one()
+        for field, value in previous.items():
+            setattr(org, field, value)
+        await db.commit()
+    invalidate_organization()
+
+
+async def run(messages: int, batch_size: int, port: int):
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    previous = await configure_local_smtp(port)
+
+    try:
+        async with SessionLocal() as db:
+            for i in range(messages):
+                await enqueue_email(db, f"bench{i}@example.com", "Benchmark", "<p>Benchmark</p>")
+
+        worker = EmailOutboxWorker(batch_size=batch_size)
+        started = time.perf_counter()
+        while await worker.drain_once():
+            pass
+        elapsed = time.perf_counter() - started
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(EmailOutbox).where(EmailOutbox.subject == "Benchmark"))
+            await db.commit()
+        await restore_smtp(previous)
+        controller.stop()
+
+    return {
+        "messages": messages,
+        "batch_size": batch_size,
+        "received": handler.received,
+        "elapsed_s": round(elapsed, 3),
+        "messages_per_second": round(messages / elapsed, 2) if elapsed else None,
+        "worker": worker.stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.messages, args.batch_size, args.port)), indent=2))
@@ -0,0 +1,82 @@
+"""
+Benchmark : GET /users/ (pagination par curseur) à grande échelle.
+
+Compare l'ancien chargement complet (joinedload de tous les rôles) aux pages
+par curseur : première page, page profonde, sans rôles, filtrée, avec total estimé.
+
+Usage (depuis la racine du dépôt, base de données accessible via DATABASE_URL) :
+    python -m benchmarks.bench_list_users --users 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from backend.db.database import SessionLocal
+from backend.db.models import User
+from backend.main import app
+from benchmarks.seed import seed_users, admin_credentials
+
+
+async def timed(coro_factory, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"min_ms": round(samples[0], 2), "median_ms": round(samples[len(samples) // 2], 2)}
+
+
+async def legacy_full_load():
+    async with SessionLocal() as db:
+        result = await db.execute(select(User).options(joinedload(User.roles)))
+        return result.unique().scalars().all()
+
+
+async def run(users: int, repeat: int):
+    await seed_users(users)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = (await client.post("/auth/login", json=admin_credentials())).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def get(params):
+            response = await client.get("/users/", params=params, headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        # Curseur situé aux 9/10 du jeu de données pour mesurer une page profonde
+        deep_cursor = None
+        page = await get({"limit": 1000, "fields": "id"})
+        for _ in range(int(users * 0.9) // 1000):
+            if not page["next_cursor"]:
+                break
+            deep_cursor = page["next_cursor"]
+            page = await get({"limit": 1000, "fields": "id", "cursor": deep_cursor})
+
+        results = {
+            "users": users,
+            "first_page_with_roles": await timed(lambda: get({"limit": 100}), repeat),
+            "first_page_no_roles": await timed(lambda: get({"limit": 100, "fields": "id,email,first_name,last_name"}), repeat),
+            "deep_page_with_roles": await timed(lambda: get({"limit": 100, "cursor": deep_cursor}), repeat),
+            "filtered_role_active": await timed(lambda: get({"limit": 100, "role": "manager", "is_active": True}), repeat),
+            "email_prefix": await timed(lambda: get({"limit": 100, "email_prefix": "user00123"}), repeat),
+            "first_page_total_estimate": await timed(lambda: get({"limit": 100, "total": "estimate"}), repeat),
+            "first_page_total_exact": await timed(lambda: get({"limit": 100, "total": "exact"}), repeat),
+            "legacy_full_load": await timed(legacy_full_load, max(1, repeat // 5)),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.users, args.repeat)), indent=2))
@@ -0,0 +1,88 @@
+"""
+Benchmark : latence de GET /me pendant une rafale de connexions.
+
+Mesure le p50/p95/p99 de /me pendant que des clients concurrents appellent
+/auth/login en boucle (bcrypt). Sans pool de hachage, chaque login fige la
+boucle d'événements et la latence de /me explose.
+
+Usage (depuis la racine du dépôt, base de données accessible via DATABASE_URL) :
+    BENCH_EMAIL=admin@admin.com BENCH_PASSWORD=admin123 \\
+        python -m benchmarks.bench_login_contention --logins 8 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+# Les rafales de connexions du benchmark dépasseraient la limitation de débit de /auth/login
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from backend.main import app
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login_loop(client, credentials, stop_at):
+    count = 0
+    while time.perf_counter() < stop_at:
+        await client.post("/auth/login", json=credentials)
+        count += 1
+    return count
+
+
+async def me_loop(client, token, stop_at, latencies):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        response = await client.get("/me", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def run(logins: int, duration: float):
+    credentials = {
+        "email": os.getenv("BENCH_EMAIL", "admin@admin.com"),
+        "password": os.getenv("BENCH_PASSWORD", "admin123"),
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/auth/login", json=credentials)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        latencies: list[float] = []
+        stop_at = time.perf_counter() + duration
+        results = await asyncio.gather(
+            me_loop(client, token, stop_at, latencies),
+            *(login_loop(client, credentials, stop_at) for _ in range(logins)),
+        )
+
+    return {
+        "duration_s": duration,
+        "login_clients": logins,
+        "logins": sum(results[1:]),
+        "me_requests": len(latencies),
+        "me_p50_ms": percentile(latencies, 50),
+        "me_p95_ms": percentile(latencies, 95),
+        "me_p99_ms": percentile(latencies, 99),
+        "me_mean_ms": statistics.fmean(latencies) if latencies else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=8, help="clients de login concurrents")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée en secondes")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.logins, args.duration)), indent=2))
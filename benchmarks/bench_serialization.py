@@ -0,0 +1,86 @@
+"""
+Benchmark : sérialisation JSON d'une liste d'utilisateurs.
+
+Compare, sur des lignes synthétiques (aucune base nécessaire), trois chemins
+de sérialisation pour 1k / 10k / 100k utilisateurs :
+  - pydantic : UserOutWithRoles.from_orm + jsonable_encoder + json (ancien chemin) ;
+  - dicts : dicts construits à la main + jsonable_encoder + json (JSONResponse par défaut) ;
+  - orjson : projection directe des tuples en dicts + orjson (chemin actuel de GET /users/).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from backend.api.routes.users import DEFAULT_USER_LIST_FIELDS, UserOutWithRoles
+
+COLUMNS = [name for name in DEFAULT_USER_LIST_FIELDS if name != "roles"]
+ROLES = [{"id": 1, "name": "employee"}, {"id": 2, "name": "manager"}]
+
+
+def make_rows(size: int) -> list[tuple]:
+    return [
+        (i, f"Prénom{i}", f"Nom{i}", f"user{i:07d}@bench.elstudio", date(1990, 1, 1 + i % 28), i % 10 != 0)
+        for i in range(1, size + 1)
+    ]
+
+
+def via_pydantic(rows: list[tuple]) -> bytes:
+    users = [
+        SimpleNamespace(**dict(zip(COLUMNS, row)), roles=[SimpleNamespace(**role) for role in ROLES])
+        for row in rows
+    ]
+    items = [UserOutWithRoles.from_orm(user) for user in users]
+    return json.dumps(jsonable_encoder(items), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def via_dicts(rows: list[tuple]) -> bytes:
+    items = [{**dict(zip(COLUMNS, row)), "roles": ROLES} for row in rows]
+    return json.dumps(jsonable_encoder(items), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def via_orjson(rows: list[tuple]) -> bytes:
+    return orjson.dumps([{**dict(zip(COLUMNS, row)), "roles": ROLES} for row in rows])
+
+
+def measure(fn, rows: list[tuple], repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(rows)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "best_s": round(best, 4),
+        "rows_per_second": round(len(rows) / best),
+        "bytes": len(body),
+    }
+
+
+def run(sizes: list[int], repeat: int):
+    results = []
+    for size in sizes:
+        rows = make_rows(size)
+        # Les trois chemins doivent produire le même document
+        assert orjson.loads(via_pydantic(rows[:100])) == orjson.loads(via_orjson(rows[:100]))
+        entry = {"rows": size}
+        for name, fn in (("pydantic", via_pydantic), ("dicts", via_dicts), ("orjson", via_orjson)):
+            entry[name] = measure(fn, rows, repeat)
+        entry["speedup_vs_pydantic"] = round(entry["pydantic"]["best_s"] / entry["orjson"]["best_s"], 1)
+        results.append(entry)
+    return {"repeat": repeat, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.repeat), indent=2))
@@ -0,0 +1,80 @@
+"""
+Benchmark : envois SMTP avec et sans pool de connexions.
+
+Démarre un serveur SMTP local (aiosmtpd) et envoie N messages une fois en
+ouvrant une connexion par message (comportement historique), une fois via le
+pool. Aucune base de données n'est nécessaire.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_smtp_pool --messages 500
+"""
+import argparse
+import json
+import time
+from types import SimpleNamespace
+
+from aiosmtpd.controller import Controller
+
+from backend.utils.email import build_message
+from backend.utils.smtp_pool import SMTPConnectionPool
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def send_all(pool: SMTPConnectionPool, org, messages: int) -> float:
+    started = time.perf_counter()
+    for i in range(messages):
+        pool.send(org, build_message(org, f"bench{i}@example.com", "Benchmark", "<p>Benchmark</p>"))
+    elapsed = time.perf_counter() - started
+    pool.close_all()
+    return elapsed
+
+
+def run(messages: int, port: int):
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    org = SimpleNamespace(
+        smtp_host="127.0.0.1", smtp_port=port, smtp_user=None, smtp_password=None,
+        smtp_use_tls=False, smtp_use_ssl=False, default_from_email="bench@example.com",
+    )
+    try:
+        # Une connexion par message : équivalent de l'ancien comportement
+        unpooled = SMTPConnectionPool(max_messages_per_connection=1)
+        unpooled_elapsed = send_all(unpooled, org, messages)
+
+        pooled = SMTPConnectionPool()
+        pooled_elapsed = send_all(pooled, org, messages)
+    finally:
+        controller.stop()
+
+    return {
+        "messages": messages,
+        "received": handler.received,
+        "unpooled": {
+            "elapsed_s": round(unpooled_elapsed, 3),
+            "messages_per_second": round(messages / unpooled_elapsed, 2),
+            "connections": unpooled.opened,
+        },
+        "pooled": {
+            "elapsed_s": round(pooled_elapsed, 3),
+            "messages_per_second": round(messages / pooled_elapsed, 2),
+            "connections": pooled.opened,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8026)
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.port), indent=2))
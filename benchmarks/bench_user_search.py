@@ -0,0 +1,122 @@
+"""
+Benchmark : GET /users/search à grande échelle.
+
+Mesure la latence (p50/p95/p99) de la recherche d'utilisateurs pour plusieurs
+familles de requêtes : fragment d'email, nom complet, nom de famille, début de
+nom, préfixe court, page suivante. Le champ `mode` indique le chemin utilisé
+("trigram" avec pg_trgm, "prefix" sinon) ; le benchmark échoue (code 1) si le
+p95 global dépasse --target-p95-ms.
+
+Usage (depuis la racine du dépôt, base de données accessible via DATABASE_URL) :
+    python -m benchmarks.bench_user_search --users 500000 --repeat 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+from backend.db.database import engine
+from backend.db.migrations import migrate
+from backend.main import app
+from benchmarks.seed import FIRST_NAMES, LAST_NAMES, admin_credentials, seed_users
+
+
+def query_mix(users: int, rng: random.Random) -> dict:
+    """Générateurs de paramètres par famille de requêtes."""
+    return {
+        "email": lambda: {"q": f"user{rng.randrange(users):07d}"},
+        "email_fragment": lambda: {"q": f"{rng.randrange(users):07d}"[2:]},
+        "full_name": lambda: {"q": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"},
+        "last_name": lambda: {"q": rng.choice(LAST_NAMES)},
+        "partial_name": lambda: {"q": rng.choice(LAST_NAMES)[:4]},
+        "short_prefix": lambda: {"q": rng.choice(FIRST_NAMES)[:2]},
+    }
+
+
+def percentiles(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "max_ms": round(samples[-1], 2),
+    }
+
+
+async def run(users: int, repeat: int, limit: int, target_p95_ms: float, seed: int) -> dict:
+    await seed_users(users)
+    await migrate(engine)
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("ANALYZE users")
+
+    rng = random.Random(seed)
+    mix = query_mix(users, rng)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = (await client.post("/auth/login", json=admin_credentials())).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def search(params):
+            started = time.perf_counter()
+            response = await client.get("/users/search", params={"limit": limit, **params}, headers=headers)
+            elapsed = (time.perf_counter() - started) * 1000
+            response.raise_for_status()
+            return elapsed, response.json()
+
+        # Préchauffage : requêtes préparées, cache de détection de pg_trgm
+        for make_params in mix.values():
+            await search(make_params())
+
+        samples = {name: [] for name in list(mix) + ["next_page"]}
+        modes = {}
+        hits = {name: 0 for name in mix}
+        for _ in range(repeat):
+            for name, make_params in mix.items():
+                params = make_params()
+                elapsed, body = await search(params)
+                samples[name].append(elapsed)
+                modes[name] = body["mode"]
+                hits[name] += len(body["items"])
+                if name == "last_name" and body["next_cursor"]:
+                    elapsed, _ = await search({**params, "cursor": body["next_cursor"]})
+                    samples["next_page"].append(elapsed)
+
+    everything = [value for values in samples.values() for value in values]
+    overall = percentiles(everything)
+    return {
+        "users": users,
+        "dialect": engine.dialect.name,
+        "limit": limit,
+        "repeat": repeat,
+        "queries": {
+            name: {
+                **percentiles(values),
+                "mode": modes.get(name, modes.get("last_name")),
+                "avg_results": round(hits[name] / repeat, 1) if name in hits else None,
+            }
+            for name, values in samples.items() if values
+        },
+        "overall": overall,
+        "target_p95_ms": target_p95_ms,
+        "ok": overall["p95_ms"] <= target_p95_ms,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--target-p95-ms", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.users, args.repeat, args.limit, args.target_p95_ms, args.seed))
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["ok"] else 1)
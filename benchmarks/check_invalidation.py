@@ -0,0 +1,192 @@
+"""
+Vérification : convergence des caches entre workers (bus LISTEN/NOTIFY).
+
+Lance plusieurs processus uvicorn indépendants (un par port, comme autant de
+workers ou de nœuds) sur la même base PostgreSQL, remplit leurs caches, puis
+modifie les données via le premier et mesure, sur chacun, le délai avant que
+la modification soit visible :
+  - organization : PUT /organization, puis GET /organization ;
+  - permissions : retrait de users.read à un rôle, puis GET /users/ → 403 ;
+  - revocation : changement de mot de passe par un admin, puis GET /me → 401.
+
+Le script échoue (code 1) si un délai dépasse --bound-ms. Avec --no-bus, le bus
+est désactivé : les caches restent obsolètes, ce qui sert de témoin.
+
+Usage (depuis la racine du dépôt, PostgreSQL accessible via DATABASE_URL) :
+    python -m benchmarks.check_invalidation --workers 3 --bound-ms 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Les connexions répétées du script dépasseraient la limitation de débit de /auth/login
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from backend.db.database import engine
+from backend.db.migrations import migrate
+from benchmarks.seed import BENCH_DOMAIN, BENCH_PASSWORD, admin_credentials, seed_organization, seed_users
+
+POLL_INTERVAL = 0.005
+POLL_TIMEOUT = 10.0
+
+
+def start_workers(ports: list[int], bus: bool) -> list[subprocess.Popen]:
+    env = os.environ.copy()
+    env["INVALIDATION_BUS_ENABLED"] = "true" if bus else "false"
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning", "--no-access-log"],
+            env=env, stdout=subprocess.DEVNULL,
+        )
+        for port in ports
+    ]
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            await client.get("/roles/permissions")
+            return
+        except httpx.HTTPError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Le worker {client.base_url} n'a pas démarré à temps")
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> dict:
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def converge(clients: list[httpx.AsyncClient], started: float, probe) -> list:
+    """Délai (ms) après `started` avant que `probe(client)` soit vrai, pour chaque worker."""
+    async def one(client):
+        deadline = started + POLL_TIMEOUT
+        while time.perf_counter() < deadline:
+            if await probe(client):
+                return round((time.perf_counter() - started) * 1000, 1)
+            await asyncio.sleep(POLL_INTERVAL)
+        return None
+
+    return await asyncio.gather(*(one(client) for client in clients))
+
+
+async def scenario_organization(clients, admin) -> list:
+    for client in clients:
+        (await client.get("/organization")).raise_for_status()
+
+    name = f"ElStudio {time.time_ns()}"
+    started = time.perf_counter()
+    (await clients[0].put("/organization", json={"name": name}, headers=admin)).raise_for_status()
+
+    async def probe(client):
+        return (await client.get("/organization")).json()["name"] == name
+
+    return await converge(clients, started, probe)
+
+
+async def scenario_permissions(clients, admin, user_id: int, email: str) -> list:
+    first = clients[0]
+    role_name = f"bench_reader_{time.time_ns()}"
+    (await first.post("/roles/", json={"name": role_name}, headers=admin)).raise_for_status()
+    role_id = next(role["id"] for role in (await first.get("/roles/")).json() if role["name"] == role_name)
+    (await first.put(f"/roles/{role_id}/permissions", json={"permissions": ["users.read"]}, headers=admin)).raise_for_status()
+    (await first.post(f"/roles/{role_id}/members", json={"user_ids": [user_id]}, headers=admin)).raise_for_status()
+
+    # Nouveau token (l'attribution du rôle révoque les anciens), caches remplis partout
+    headers = await login(first, email, BENCH_PASSWORD)
+    for client in clients:
+        (await client.get("/users/", params={"limit": 1}, headers=headers)).raise_for_status()
+
+    started = time.perf_counter()
+    (await first.put(f"/roles/{role_id}/permissions", json={"permissions": []}, headers=admin)).raise_for_status()
+
+    async def probe(client):
+        return (await client.get("/users/", params={"limit": 1}, headers=headers)).status_code == 403
+
+    delays = await converge(clients, started, probe)
+    await first.delete(f"/roles/{role_id}", headers=admin)
+    return delays
+
+
+async def scenario_revocation(clients, admin, user_id: int, email: str) -> list:
+    first = clients[0]
+    headers = await login(first, email, BENCH_PASSWORD)
+    for client in clients:
+        (await client.get("/me", headers=headers)).raise_for_status()
+
+    started = time.perf_counter()
+    response = await first.put(f"/users/{user_id}", headers=admin, json={
+        "first_name": "Bench", "last_name": "Révocation", "email": email,
+        "password": BENCH_PASSWORD, "roles": ["employee"],
+    })
+    response.raise_for_status()
+
+    async def probe(client):
+        return (await client.get("/me", headers=headers)).status_code == 401
+
+    return await converge(clients, started, probe)
+
+
+async def run(workers: int, base_port: int, bound_ms: float, bus: bool) -> dict:
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Ce script nécessite PostgreSQL (DATABASE_URL)")
+    await migrate(engine)
+    await seed_users(10)
+    await seed_organization()
+    await engine.dispose()
+
+    ports = [base_port + i for i in range(workers)]
+    processes = start_workers(ports, bus)
+    clients = [httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) for port in ports]
+    try:
+        for client in clients:
+            await wait_until_ready(client)
+
+        admin = await login(clients[0], **admin_credentials())
+        email = f"user0000001@{BENCH_DOMAIN}"
+        response = await clients[0].get("/users/", params={"email_prefix": email, "fields": "id"}, headers=admin)
+        user_id = response.json()["items"][0]["id"]
+
+        scenarios = {
+            "organization": await scenario_organization(clients, admin),
+            "permissions": await scenario_permissions(clients, admin, user_id, email),
+            "revocation": await scenario_revocation(clients, admin, user_id, email),
+        }
+    finally:
+        for client in clients:
+            await client.aclose()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+    results = {}
+    ok = True
+    for name, delays in scenarios.items():
+        converged = all(delay is not None for delay in delays)
+        worst = max(delays) if converged else None
+        passed = converged and worst <= bound_ms
+        ok = ok and passed
+        results[name] = {"per_worker_ms": delays, "max_ms": worst, "ok": passed}
+    return {"workers": workers, "bus": bus, "bound_ms": bound_ms, "scenarios": results, "ok": ok}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8770)
+    parser.add_argument("--bound-ms", type=float, default=500)
+    parser.add_argument("--no-bus", action="store_true", help="Témoin : désactive le bus d'invalidation")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.workers, args.base_port, args.bound_ms, not args.no_bus))
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["ok"] else 1)
@@ -0,0 +1,203 @@
+"""
+Vérification : nombre exact de requêtes SQL par endpoint.
+
+Chaque scénario est appelé une première fois (caches froids), puis mesuré cache
+chaud : juste avant la mesure, GET /auth/me remet l'utilisateur courant dans le
+cache des principaux (une écriture sur soi-même l'en évince). Pour chaque appel,
+le script compte les requêtes SQL envoyées (before_cursor_execute) et les
+connexions empruntées au pool (checkout) par toutes les dépendances réunies.
+
+Le script échoue (code 1) si le nombre de requêtes cache chaud diffère de
+EXPECTED, ou si une requête HTTP emprunte plus d'une connexion à un même moteur
+(dépendances résolues avec des sessions différentes).
+
+Usage (depuis la racine du dépôt, base de données accessible via DATABASE_URL) :
+    python -m benchmarks.check_query_counts
+    python -m benchmarks.check_query_counts --verbose   # affiche le SQL de chaque appel
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import uuid
+from collections import Counter
+
+import httpx
+from sqlalchemy import event, insert
+from sqlalchemy.future import select
+
+# Les connexions répétées du script dépasseraient la limitation de débit de /auth/login
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from backend.core.auth import hash_password
+from backend.db.database import SessionLocal, engine, read_engine
+from backend.db.migrations import migrate
+from backend.db.models import Role, User, user_roles
+from backend.main import app
+from benchmarks.seed import BENCH_DOMAIN, BENCH_PASSWORD, admin_credentials, seed_organization, seed_users
+
+# Requêtes SQL attendues par appel, caches chauds (principal, permissions, organisation)
+EXPECTED = {
+    "GET /auth/me": 0,
+    "GET /me": 0,
+    "POST /auth/login": 2,  # utilisateur et rôles + jeton de rafraîchissement
+    "POST /auth/refresh": 3,  # jeton et utilisateur + consommation + nouveau jeton
+    "PUT /auth/change-password-on-first-login": 2,  # UPDATE users + e-mail mis en file
+    "PUT /users/me": 1,  # email inchangé : aucune vérification d'unicité
+    "PUT /users/me (nouvel email)": 2,
+    "GET /users/{id}": 1,
+    "PUT /users/{id} (rôles inchangés)": 2,
+    "PUT /users/{id} (rôles modifiés)": 5,
+    "DELETE /users/{id}": 3,
+    "PUT /users/reactivate/{id}": 1,
+    "GET /organization": 0,
+    "PUT /organization": 2,
+}
+MAX_CONNECTIONS_PER_REQUEST = 1
+
+
+class QueryCounter:
+    """Requêtes SQL et connexions empruntées (par moteur) depuis le dernier reset()."""
+
+    def __init__(self, *engines):
+        self.statements: list[str] = []
+        self.checkouts: Counter = Counter()
+        for async_engine in dict.fromkeys(engines):
+            pool = async_engine.sync_engine.pool
+            event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+            event.listen(pool, "checkout", lambda *args, pool=pool: self.checkouts.update([pool]))
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()))
+
+    @property
+    def connections(self) -> int:
+        # Une réplique configurée peut ajouter sa propre connexion : la limite est par moteur
+        return max(self.checkouts.values(), default=0)
+
+    def reset(self):
+        self.statements = []
+        self.checkouts = Counter()
+
+
+async def create_user(email: str, roles: list[str], must_change_password: bool = False) -> int:
+    async with SessionLocal() as db:
+        role_ids = (await db.execute(select(Role.id).where(Role.name.in_(roles)))).scalars().all()
+        user = User(
+            first_name="Query", last_name="Count", email=email,
+            hashed_password=hash_password(BENCH_PASSWORD),
+            is_active=True, must_change_password=must_change_password,
+        )
+        db.add(user)
+        await db.flush()
+        if role_ids:
+            await db.execute(insert(user_roles), [{"user_id": user.id, "role_id": role_id} for role_id in role_ids])
+        await db.commit()
+        return user.id
+
+
+async def login(client: httpx.AsyncClient, email: str) -> dict:
+    response = await client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run(verbose: bool) -> dict:
+    await seed_users(1)
+    await seed_organization()
+    await migrate(engine)
+
+    run_id = uuid.uuid4().hex[:8]
+    self_email = f"qc-{run_id}-self@{BENCH_DOMAIN}"
+    await create_user(self_email, ["employee"], must_change_password=True)
+    target_email = f"qc-{run_id}-target@{BENCH_DOMAIN}"
+    target_id = await create_user(target_email, ["employee"])
+    counter = QueryCounter(engine, read_engine)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        admin = await login(client, admin_credentials()["email"])
+        user = await login(client, self_email)
+        org = (await client.get("/organization/settings", headers=admin)).json()
+        roles_cycle = iter([["manager"], ["employee"]] * 2)
+        credentials = {"email": self_email, "password": BENCH_PASSWORD}
+        refresh_tokens = iter([(await client.post("/auth/login", json=credentials)).json()["refresh_token"]
+                               for _ in range(2)])
+        new_emails = iter(f"qc-{run_id}-self{i}@{BENCH_DOMAIN}" for i in range(2))
+        profile = {"first_name": "Query", "last_name": "Count", "email": self_email}
+        target = {"first_name": "Query", "last_name": "Count", "email": target_email}
+        # Chaque appel modifie réellement une valeur (sinon aucun UPDATE n'est émis)
+        first_names = iter(["Requête", "Query"] * 4)
+
+        def changed_email():
+            return {"json": {**profile, "email": next(new_emails)}}
+
+        def renamed(fields: dict):
+            return {**fields, "first_name": next(first_names)}
+
+        async def fresh_target():
+            return await create_user(f"qc-{run_id}-{uuid.uuid4().hex[:8]}@{BENCH_DOMAIN}", ["employee"])
+
+        # nom -> (en-têtes, méthode, URL, construction des arguments de la requête)
+        scenarios = {
+            "GET /auth/me": (user, "GET", "/auth/me", None),
+            "GET /me": (user, "GET", "/me", None),
+            "POST /auth/login": (None, "POST", "/auth/login", lambda: {"json": credentials}),
+            "POST /auth/refresh": (None, "POST", "/auth/refresh", lambda: {
+                "json": {"refresh_token": next(refresh_tokens)}}),
+            "PUT /auth/change-password-on-first-login": (user, "PUT", "/auth/change-password-on-first-login",
+                                                         lambda: {"json": {"new_password": BENCH_PASSWORD}}),
+            "PUT /users/me": (user, "PUT", "/users/me", lambda: {"json": renamed(profile)}),
+            "PUT /users/me (nouvel email)": (user, "PUT", "/users/me", changed_email),
+            "GET /users/{id}": (admin, "GET", f"/users/{target_id}", None),
+            "PUT /users/{id} (rôles inchangés)": (admin, "PUT", f"/users/{target_id}", lambda: {
+                "json": {**renamed(target), "roles": ["employee"]}}),
+            "PUT /users/{id} (rôles modifiés)": (admin, "PUT", f"/users/{target_id}", lambda: {
+                "json": {**target, "roles": next(roles_cycle)}}),
+            "DELETE /users/{id}": (admin, "DELETE", "/users/{target}", None),
+            "PUT /users/reactivate/{id}": (admin, "PUT", f"/users/reactivate/{target_id}", None),
+            "GET /organization": (user, "GET", "/organization", None),
+            "PUT /organization": (admin, "PUT", "/organization", lambda: {
+                "json": {"name": f"{org['name']} {next(first_names)}"}}),
+        }
+
+        results = {}
+        for name, (headers, method, url, build) in scenarios.items():
+            measures = []
+            for attempt in ("cold", "warm"):
+                kwargs = build() if build else {}
+                # Cible supprimée : une nouvelle à chaque appel, créée hors mesure
+                request_url = url.format(target=await fresh_target()) if "{target}" in url else url
+                if attempt == "warm" and headers is not None:
+                    (await client.get("/auth/me", headers=headers)).raise_for_status()
+                counter.reset()
+                response = await client.request(method, request_url, headers=headers, **kwargs)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{name} : {response.status_code} {response.text}")
+                measures.append({"statements": len(counter.statements), "connections": counter.connections,
+                                 **({"sql": list(counter.statements)} if verbose else {})})
+            cold, warm = measures
+            results[name] = {
+                "cold": cold,
+                "warm": warm,
+                "expected": EXPECTED[name],
+                "ok": warm["statements"] == EXPECTED[name]
+                and max(cold["connections"], warm["connections"]) <= MAX_CONNECTIONS_PER_REQUEST,
+            }
+
+    return {
+        "dialect": engine.dialect.name,
+        "replica": read_engine is not engine,
+        "endpoints": results,
+        "ok": all(result["ok"] for result in results.values()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--verbose", action="store_true", help="Inclut le SQL exécuté par chaque appel")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.verbose))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    sys.exit(0 if result["ok"] else 1)
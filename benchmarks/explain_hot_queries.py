@@ -0,0 +1,94 @@
+"""
+Vérification EXPLAIN : les requêtes les plus fréquentes utilisent bien leurs index.
+
+Chaque requête est expliquée avec `enable_seqscan = off` : si le plan contient
+encore un parcours séquentiel de la table, aucun index ne peut la servir et le
+script échoue (code de sortie 1). PostgreSQL uniquement.
+
+Usage (depuis la racine du dépôt, migrations appliquées) :
+    python -m benchmarks.explain_hot_queries --users 20000
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.future import select
+
+from backend.db.database import engine
+from backend.db.models import User, Role, user_roles
+from benchmarks.seed import seed_users, BENCH_DOMAIN
+
+HOT_QUERIES = {
+    # « Tous les utilisateurs ayant le rôle X » (filtre role=, membres d'un rôle)
+    "users_by_role": (
+        select(user_roles.c.user_id).where(user_roles.c.role_id == 1),
+        "ix_user_roles_role_id",
+    ),
+    # Rôles d'une page d'utilisateurs (list_users, get_current_user)
+    "roles_of_users": (
+        select(user_roles.c.role_id).where(user_roles.c.user_id.in_([1, 2, 3])),
+        "user_roles_pkey",
+    ),
+    # Résolution des rôles par nom (register, update_user, import)
+    "roles_by_name": (
+        select(Role.id).where(Role.name.in_(["employee", "manager"])),
+        "roles_name_key",
+    ),
+    # Unicité / recherche d'email insensible à la casse (import)
+    "email_lower_lookup": (
+        select(User.id).where(func.lower(User.email) == f"user0000042@{BENCH_DOMAIN}"),
+        "ux_users_email_lower",
+    ),
+    # Filtre par préfixe d'email (GET /users/?email_prefix=)
+    "email_prefix": (
+        select(User.id).where(func.lower(User.email).like("user00001%")),
+        "ux_users_email_lower",
+    ),
+    # Pagination par curseur sur created_at (GET /users/?sort=created_at)
+    "keyset_created_at": (
+        select(User.id)
+        .where(tuple_(User.created_at, User.id) > tuple_(func.now() - text("interval '1 year'"), 0))
+        .order_by(User.created_at, User.id)
+        .limit(100),
+        "ix_users_created_at_id",
+    ),
+}
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, stmt) -> dict:
+    compiled = stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    plan = result.scalar_one()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+async def run(users: int) -> bool:
+    await seed_users(users)
+    ok = True
+    async with engine.connect() as conn:
+        for table in ("users", "user_roles", "roles"):
+            await conn.execute(text(f"ANALYZE {table}"))
+        await conn.execute(text("SET enable_seqscan = off"))
+        for name, (stmt, expected_index) in HOT_QUERIES.items():
+            nodes = list(plan_nodes(await explain(conn, stmt)))
+            indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+            seq_scans = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+            passed = expected_index in indexes and not seq_scans
+            ok &= passed
+            print(f"{'✔' if passed else '✘'} {name}: index={sorted(indexes)} seq_scan={seq_scans}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20_000)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args.users)) else 1)
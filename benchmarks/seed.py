@@ -0,0 +1,119 @@
+"""
+Jeu de données de benchmark : N utilisateurs et quelques rôles.
+
+Les utilisateurs générés ont une adresse en « @bench.elstudio » et partagent le
+même hash de mot de passe (BENCH_PASSWORD), calculé une seule fois.
+
+Usage (depuis la racine du dépôt, base de données accessible via DATABASE_URL) :
+    python -m benchmarks.seed --users 100000
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.future import select
+
+from backend.core.auth import hash_password
+from backend.db.database import engine, SessionLocal
+from backend.db.models import Base, User, Role, Organization, user_roles
+
+BENCH_DOMAIN = "bench.elstudio"
+BENCH_PASSWORD = "bench-password"
+BENCH_ROLES = ["employee", "manager", "hr", "accounting", "super_admin"]
+FIRST_NAMES = ["Alice", "Bruno", "Chloé", "David", "Emma", "Félix", "Gaëlle", "Hugo", "Inès", "Jules"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau"]
+
+
+async def ensure_roles(db) -> dict[str, int]:
+    existing = dict((await db.execute(select(Role.name, Role.id))).all())
+    missing = [name for name in BENCH_ROLES if name not in existing]
+    if missing:
+        await db.execute(insert(Role), [{"name": name} for name in missing])
+        await db.commit()
+        existing = dict((await db.execute(select(Role.name, Role.id))).all())
+    return existing
+
+
+async def seed_users(count: int, chunk_size: int = 5000, seed: int = 42) -> int:
+    """Crée les utilisateurs de benchmark manquants ; retourne le nombre total présent."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    rng = random.Random(seed)
+    hashed = hash_password(BENCH_PASSWORD)
+    start_date = datetime(2020, 1, 1)
+
+    async with SessionLocal() as db:
+        roles = await ensure_roles(db)
+        present = (await db.execute(
+            select(func.count()).select_from(User).where(User.email.like(f"%@{BENCH_DOMAIN}"))
+        )).scalar_one()
+
+        for offset in range(present, count, chunk_size):
+            rows = []
+            for i in range(offset, min(offset + chunk_size, count)):
+                rows.append({
+                    "first_name": rng.choice(FIRST_NAMES),
+                    "last_name": rng.choice(LAST_NAMES),
+                    "email": f"user{i:07d}@{BENCH_DOMAIN}",
+                    "hashed_password": hashed,
+                    "created_at": start_date + timedelta(minutes=i),
+                    "is_active": rng.random() > 0.1,
+                    "must_change_password": False,
+                })
+            result = await db.execute(insert(User).returning(User.id), rows)
+            user_ids = result.scalars().all()
+
+            links = [{"user_id": user_id, "role_id": roles["employee"]} for user_id in user_ids]
+            links += [
+                {"user_id": user_id, "role_id": roles[rng.choice(BENCH_ROLES[1:4])]}
+                for user_id in user_ids if rng.random() < 0.2
+            ]
+            await db.execute(insert(user_roles), links)
+            await db.commit()
+
+        # Un super_admin connu pour s'authentifier pendant les benchmarks
+        admin = (await db.execute(
+            select(User).where(User.email == f"user0000000@{BENCH_DOMAIN}")
+        )).scalar_one_or_none()
+        if admin is not None:
+            await db.execute(
+                delete(user_roles).where(
+                    user_roles.c.user_id == admin.id, user_roles.c.role_id == roles["super_admin"]
+                )
+            )
+            await db.execute(insert(user_roles), [{"user_id": admin.id, "role_id": roles["super_admin"]}])
+            admin.is_active = True
+            await db.commit()
+
+        return max(present, count)
+
+
+async def seed_organization(smtp_host: str = "127.0.0.1", smtp_port: int = 8025) -> None:
+    """Organisation de benchmark, avec un SMTP local (aucun envoi ne sort de la machine)."""
+    async with SessionLocal() as db:
+        org = (await db.execute(select(Organization).limit(1))).scalar_one_or_none()
+        if org is None:
+            org = Organization(name="ElStudio Bench")
+            db.add(org)
+        org.smtp_host = smtp_host
+        org.smtp_port = smtp_port
+        org.smtp_user = None
+        org.smtp_password = None
+        org.smtp_use_tls = False
+        org.smtp_use_ssl = False
+        org.default_from_email = f"noreply@{BENCH_DOMAIN}"
+        await db.commit()
+
+
+def admin_credentials() -> dict:
+    return {"email": f"user0000000@{BENCH_DOMAIN}", "password": BENCH_PASSWORD}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+    print(f"✔ {asyncio.run(seed_users(args.users))} utilisateurs de benchmark")
@@ -19,7 +19,10 @@ function Register() {
   const [error, setError] = useState(null)
 
   useEffect(() => {
-    axios.get("http://localhost:8000/roles").then((res) => {
+    const token = localStorage.getItem("token")
+    axios.get("http://localhost:8000/roles", {
+      headers: { Authorization: `Bearer ${token}` },
+    }).then((res) => {
       setAllRoles(res.data)
     })
   }, [])
@@ -10,10 +10,18 @@ function Employee() {
     const fetchUsers = async () => {
       const token = localStorage.getItem("token")
       try {
-        const res = await axios.get("http://localhost:8000/users", {
-          headers: { Authorization: `Bearer ${token}` },
-        })
-        setUsers(res.data.filter(user => user.is_active))
+        // Filtrage côté serveur, pages successives via le curseur
+        let all = []
+        let cursor = null
+        do {
+          const res = await axios.get("http://localhost:8000/users", {
+            headers: { Authorization: `Bearer ${token}` },
+            params: { is_active: true, limit: 500, cursor },
+          })
+          all = all.concat(res.data.items)
+          cursor = res.data.next_cursor
+        } while (cursor)
+        setUsers(all)
       } catch (err) {
         console.error("Erreur chargement employés", err)
       }
@@ -63,8 +63,11 @@ function Profile() {
   useEffect(() => {
     const fetchOrg = async () => {
       try {
-        const res = await axios.get("http://localhost:8000/organization")
-        setOrg(res.data)
+        const token = localStorage.getItem("token")
+        const res = await axios.get("http://localhost:8000/organization/settings", {
+          headers: { Authorization: `Bearer ${token}` },
+        })
+        setOrg({ ...res.data, smtp_password: "" })
       } catch (err) {
         console.error("Erreur chargement organisation", err)
       }
@@ -93,7 +96,9 @@ function Profile() {
   const handleOrgUpdate = async () => {
     const token = localStorage.getItem("token")
     try {
-      await axios.put("http://localhost:8000/organization", org, {
+      // Mot de passe SMTP laissé vide : on conserve celui déjà enregistré
+      const { smtp_password, ...rest } = org
+      await axios.put("http://localhost:8000/organization", smtp_password ? org : rest, {
         headers: { Authorization: `Bearer ${token}` }
       })
       setMessage("✅ Organisation mise à jour avec succès")
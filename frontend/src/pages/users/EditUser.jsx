@@ -38,7 +38,10 @@ function EditUser() {
     }
 
     const fetchRoles = async () => {
-      const res = await axios.get("http://localhost:8000/roles")
+      const token = localStorage.getItem("token")
+      const res = await axios.get("http://localhost:8000/roles", {
+        headers: { Authorization: `Bearer ${token}` },
+      })
       setAvailableRoles(res.data)
     }
 